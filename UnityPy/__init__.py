@@ -1,6 +1,6 @@
 __version__ = "1.10.14"
 
-from .environment import Environment
+from .environment import Environment, iter_objects
 from .helpers.ArchiveStorageManager import set_assetbundle_decrypt_key
 
 
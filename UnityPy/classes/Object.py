@@ -3,7 +3,10 @@ from ..enums import BuildTarget
 from ..helpers import TypeTreeHelper
 from ..streams import EndianBinaryWriter
 from ..files import ObjectReader
+import keyword
 import types
+from functools import lru_cache
+from typing import Callable
 from ..exceptions import TypeTreeError as TypeTreeError
 
 
@@ -47,26 +50,52 @@ class Object(object):
         return self.type_tree if wrap else tree
 
     def save_typetree(self, nodes: list = None, writer: EndianBinaryWriter = None):
-        def class_to_dict(value):
-            if isinstance(value, list):
-                return [class_to_dict(val) for val in value]
-            elif isinstance(value, dict):
-                return {key: class_to_dict(val) for key, val in value.items()}
-            elif hasattr(value, "__dict__"):
-                if isinstance(value, PPtr):
-                    return {"m_PathID": value.path_id, "m_FileID": value.file_id}
-                return {
-                    key: class_to_dict(val)
-                    for key, val in value.__dict__.items()
-                    if not isinstance(value, (types.FunctionType, types.MethodType))
-                    and not key in ["type_tree", "assets_file"]
-                }
-            else:
-                return value
-
-        obj = class_to_dict(self if not self.type_tree else self.type_tree)
+        tree = self.type_tree
+        if nodes is None and writer is None and isinstance(tree, NodeHelper):
+            return self.save_typetree_changes(tree)
+        obj = class_to_dict(self if not tree else tree)
         return self.reader.save_typetree(obj, nodes, writer)
 
+    def save_typetree_changes(self, tree: "NodeHelper") -> bytes:
+        """Serializes only the fields of the typetree that were changed,
+        the data of the other fields is copied from the current data of the object.
+
+        The data isn't replaced if nothing was changed.
+        """
+        reader = self.reader
+        plan = reader.get_typetree_read_plan()
+        data = reader.data or reader.get_raw_data()
+        changed = getattr(tree, "_changed", None) or ()
+        writer = EndianBinaryWriter(endian=reader.endian)
+        ranges = []
+        modified = False
+        for i, start, end in reader.get_field_ranges():
+            name = plan.program[i][1]
+            value = getattr(tree, name)
+            pos = writer.Position
+            # the copied data has to keep its alignment
+            if name in changed or has_changes(value) or (pos - start) % 4:
+                TypeTreeHelper.write_typetree(
+                    {name: class_to_dict(value)},
+                    plan.nodes[:1] + TypeTreeHelper.get_nodes(plan.nodes, i),
+                    writer,
+                )
+                object.__setattr__(tree, name, clear_changes(value))
+                modified = True
+            else:
+                writer.write(data[start:end])
+            ranges.append((i, pos, writer.Position))
+        if not modified:
+            return data
+        # the old padding of the root doesn't fit the new size
+        if plan.program[0][2]:
+            writer.align_stream(4)
+        data = writer.bytes
+        reader.set_raw_data(data)
+        reader.set_field_ranges(ranges)
+        object.__setattr__(tree, "_changed", None)
+        return data
+
     def get_raw_data(self) -> bytes:
         return self.reader.get_raw_data()
 
@@ -103,6 +132,19 @@ class Object(object):
             return lambda: self
         return getattr(self.type_tree, name)
 
+    def __setattr__(self, name, value):
+        tree = self.__dict__.get("type_tree")
+        if (
+            isinstance(tree, NodeHelper)
+            and name not in self.__dict__
+            and name in type(tree)._fields
+        ):
+            # the fields of the typetree are read from it via __getattr__,
+            # so they are changed in it as well, which tracks the change for the saving
+            setattr(tree, name, value)
+        else:
+            object.__setattr__(self, name, value)
+
     def get(self, key, default=None):
         return getattr(self, key, default)
 
@@ -121,39 +163,48 @@ class Object(object):
 
 
 class NodeHelper:
-    def __init__(self, data, assets_file):
-        if "m_PathID" in data and "m_FileID" in data:
-            # used to make pointers directly useable
-            self.path_id = data["m_PathID"]
-            self.file_id = data["m_FileID"]
-            self.index = data.get("m_Index", -2)
-            self.assets_file = assets_file
-            self._obj = None
-            self.__class__ = PPtr
-        else:
-            self.__dict__ = {
-                key: NodeHelper(val, assets_file) for key, val in data.items()
-            }
+    """Attribute access to the structs of a typetree.
+
+    One subclass with __slots__ is generated per distinct struct,
+    see create_struct_factory, so the instances don't need a __dict__.
+    The names of the assigned fields are tracked in _changed.
+    """
+
+    __slots__ = ("_changed",)
+    _fields = ()
 
     def __new__(cls, data, assets_file):
         if isinstance(data, dict):
-            return super(NodeHelper, cls).__new__(cls)
+            return get_node_factory(tuple(data))(
+                assets_file, *(NodeHelper(val, assets_file) for val in data.values())
+            )
         elif isinstance(data, list):
-            return [NodeHelper(x, assets_file) for x in data]
+            return NodeList(NodeHelper(x, assets_file) for x in data)
         elif isinstance(data, tuple):
             return tuple(NodeHelper(x, assets_file) for x in data)
         return data
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        # the changed fields are serialized again by Object.save_typetree
+        changed = getattr(self, "_changed", None)
+        if changed is None:
+            object.__setattr__(self, "_changed", {name})
+        else:
+            changed.add(name)
+
     def __getitem__(self, item):
         return getattr(self, item)
 
     def to_dict(self):
         def dump(val):
             return (
-                val.to_dict()
+                NodeHelper.to_dict(val)
                 if isinstance(val, NodeHelper)
                 else [dump(item) for item in val]
                 if isinstance(val, list)
+                else tuple(dump(item) for item in val)
+                if isinstance(val, tuple)
                 else {"m_PathID": val.path_id, "m_FileID": val.file_id}
                 if isinstance(val, PPtr)
                 else [x for x in val]
@@ -161,16 +212,16 @@ class NodeHelper:
                 else val
             )
 
-        return {key: dump(val) for key, val in self.__dict__.items()}
+        return {key: dump(val) for key, val in NodeHelper.items(self)}
 
     def items(self):
-        return self.__dict__.items()
+        return [(key, getattr(self, key)) for key in type(self)._fields]
 
     def values(self):
-        return self.__dict__.values()
+        return [getattr(self, key) for key in type(self)._fields]
 
     def keys(self):
-        return self.__dict__.keys()
+        return list(type(self)._fields)
 
     def __repr__(self):
         name = getattr(self, "m_Name", None)
@@ -178,3 +229,227 @@ class NodeHelper:
             return f"<NodeHelper name={name}>"
         else:
             return "<NodeHelper>"
+
+
+class NodeList(list):
+    """The vectors of a typetree, tracks if they were changed in place."""
+
+    __slots__ = ("_changed",)
+
+
+def _track_list_change(name: str) -> Callable:
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        self._changed = True
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in (
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "sort",
+    "reverse",
+):
+    setattr(NodeList, _name, _track_list_change(_name))
+
+
+def has_changes(value) -> bool:
+    """Checks if a value of a typetree was changed since it was read or saved.
+
+    Parameters
+    ----------
+    value : Any
+        The value of a typetree field
+
+    Returns
+    -------
+    bool
+        If the value or one of its items was changed,
+        lists that weren't created from the typetree count as changed
+    """
+    if isinstance(value, NodeHelper):
+        return bool(getattr(value, "_changed", None)) or any(
+            has_changes(val) for val in NodeHelper.values(value)
+        )
+    elif isinstance(value, list):
+        if not isinstance(value, NodeList) or getattr(value, "_changed", False):
+            return True
+        # the items are of the same type, primitives can't be changed in place
+        return (
+            len(value) > 0
+            and isinstance(value[0], (NodeHelper, PPtr, list, tuple))
+            and any(has_changes(val) for val in value)
+        )
+    elif isinstance(value, tuple):
+        return any(has_changes(val) for val in value)
+    elif isinstance(value, PPtr):
+        return value.__dict__.get("_saved_ids") != (value.path_id, value.file_id)
+    return False
+
+
+def clear_changes(value):
+    """Resets the tracked changes of a value of a typetree after it was saved.
+
+    Parameters
+    ----------
+    value : Any
+        The value of a typetree field
+
+    Returns
+    -------
+    Any
+        The value, lists are replaced by NodeLists to track their changes
+    """
+    if isinstance(value, NodeHelper):
+        object.__setattr__(value, "_changed", None)
+        for key, val in NodeHelper.items(value):
+            new = clear_changes(val)
+            if new is not val:
+                object.__setattr__(value, key, new)
+    elif isinstance(value, list):
+        if not isinstance(value, NodeList):
+            value = NodeList(value)
+        value._changed = False
+        if len(value) > 0 and isinstance(value[0], (NodeHelper, PPtr, list, tuple)):
+            for i, val in enumerate(value):
+                new = clear_changes(val)
+                if new is not val:
+                    list.__setitem__(value, i, new)
+    elif isinstance(value, tuple):
+        return tuple(clear_changes(val) for val in value)
+    elif isinstance(value, PPtr):
+        value._saved_ids = (value.path_id, value.file_id)
+    return value
+
+
+def class_to_dict(value):
+    if isinstance(value, list):
+        return [class_to_dict(val) for val in value]
+    elif isinstance(value, tuple):
+        return tuple(class_to_dict(val) for val in value)
+    elif isinstance(value, dict):
+        return {key: class_to_dict(val) for key, val in value.items()}
+    elif isinstance(value, NodeHelper):
+        return {key: class_to_dict(val) for key, val in NodeHelper.items(value)}
+    elif hasattr(value, "__dict__"):
+        if isinstance(value, PPtr):
+            return {"m_PathID": value.path_id, "m_FileID": value.file_id}
+        return {
+            key: class_to_dict(val)
+            for key, val in value.__dict__.items()
+            if not isinstance(value, (types.FunctionType, types.MethodType))
+            and not key in ["type_tree", "assets_file"]
+        }
+    else:
+        return value
+
+
+def create_struct_factory(fields: tuple) -> Callable:
+    """Creates the factory of the typetree structs with the given field names.
+
+    Parameters
+    ----------
+    fields : tuple
+        The names of the fields of the struct, in order
+
+    Returns
+    -------
+    Callable
+        factory(assets_file, *values) creating the struct,
+        a PPtr for pointer structs, otherwise an instance of a generated NodeHelper subclass
+    """
+    if "m_PathID" in fields and "m_FileID" in fields:
+        return create_pptr_factory(fields)
+    return create_node_factory(fields)
+
+
+# the factories of the recently used structs, shared by the read plans and NodeHelper,
+# bounded as the plans keep the factories of their structs anyway
+get_node_factory = lru_cache(maxsize=1024)(create_struct_factory)
+
+
+def get_node_factories(plan: TypeTreeHelper.TypeTreeReadPlan) -> tuple:
+    """Returns the node factories of the structs of a read plan,
+    one per instruction, None for the instructions that aren't structs.
+
+    The factories are kept by the plan, so they are released together with it.
+    """
+    if plan.node_factories is None:
+        program = plan.program
+        factories = [None] * len(program)
+        for i, (op, _, _, end) in enumerate(program):
+            if op == TypeTreeHelper.OP_CLASS:
+                fields = []
+                j = i + 1
+                while j < end:
+                    fields.append(program[j][1])
+                    j = program[j][3]
+                factories[i] = get_node_factory(tuple(fields))
+        plan.node_factories = tuple(factories)
+    return plan.node_factories
+
+
+def create_pptr_factory(fields: tuple) -> Callable:
+    def create_pptr(assets_file, *values):
+        # used to make pointers directly useable
+        data = dict(zip(fields, values))
+        ptr = PPtr.__new__(PPtr)
+        ptr.path_id = data["m_PathID"]
+        ptr.file_id = data["m_FileID"]
+        ptr.index = data.get("m_Index", -2)
+        ptr.assets_file = assets_file
+        ptr._obj = None
+        # to track if the pointer was changed, see has_changes
+        ptr._saved_ids = (ptr.path_id, ptr.file_id)
+        return ptr
+
+    return create_pptr
+
+
+def create_node_factory(fields: tuple) -> Callable:
+    if len(set(fields)) == len(fields) and all(
+        field.isidentifier()
+        and not keyword.iskeyword(field)
+        and not field.startswith("__")
+        and field not in ("_fields", "_changed")
+        for field in fields
+    ):
+        cls = type("NodeHelper", (NodeHelper,), {"__slots__": fields, "_fields": fields})
+        # the slots are assigned as an instance of a subclass without the change tracking,
+        # the class of the node is switched afterwards
+        init_cls = type(
+            "NodeHelper", (cls,), {"__slots__": (), "__setattr__": object.__setattr__}
+        )
+        # assigning the slots in generated code is much faster than via setattr
+        args = "".join(f", _{i}" for i in range(len(fields)))
+        body = "".join(f"    node.{field} = _{i}\n" for i, field in enumerate(fields))
+        namespace = {"new": object.__new__, "cls": cls, "init_cls": init_cls}
+        exec(
+            f"def create_node(assets_file{args}):\n"
+            f"    node = new(init_cls)\n{body}"
+            f"    node.__class__ = cls\n    return node\n",
+            namespace,
+        )
+        return namespace["create_node"]
+
+    # names that can't be slots, so the fields are stored in the __dict__
+    cls = type("NodeHelper", (NodeHelper,), {"_fields": tuple(dict.fromkeys(fields))})
+
+    def create_node(assets_file, *values):
+        node = object.__new__(cls)
+        node.__dict__.update(zip(fields, values))
+        return node
+
+    return create_node
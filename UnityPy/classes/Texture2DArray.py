@@ -18,7 +18,7 @@ class GLTextureSettings:
     m_WrapW: Optional[int] = None
 
     def __init__(self, reader):
-        self.__dict__.update(**self.read_typetree(wrap=True).__dict__)
+        self.__dict__.update(self.read_typetree(wrap=True).items())
 
 
 class Texture2DArray(Texture):
@@ -44,8 +44,10 @@ class Texture2DArray(Texture):
 
     def __init__(self, reader):
         super().__init__(reader=reader)
-        self.__dict__.update(**reader.read_typetree(wrap=True).__dict__)
-        self.m_TextureSettings.__class__ = GLTextureSettings
+        self.__dict__.update(reader.read_typetree(wrap=True).items())
+        settings = GLTextureSettings.__new__(GLTextureSettings)
+        settings.__dict__.update(self.m_TextureSettings.items())
+        self.m_TextureSettings = settings
         self.m_Format = GraphicsFormat(self.m_Format)
 
     @property
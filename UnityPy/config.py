@@ -4,6 +4,35 @@ FALLBACK_UNITY_VERSION = "2.5.0f5"
 # disabling this will reduce the load time by a lot (half of the time is spend on parsing the typetrees)
 #  but it will also prevent saving an edited file
 SERIALIZED_FILE_PARSE_TYPETREE = True
+# determines if the blocks of UnityFS bundles are only decompressed when their data is read
+# enabling this will reduce the memory usage for big bundles of which only a few objects are used
+BUNDLE_FILE_LAZY_DECOMPRESSION = False
+# the number of decompressed blocks that are kept in memory per bundle for the lazy decompression
+BUNDLE_FILE_BLOCK_CACHE_SIZE = 16
+# the number of threads used to decompress the blocks of UnityFS bundles
+# 1 decompresses the blocks sequentially,
+# e.g. set it to os.cpu_count() to speed up the loading of big bundles
+BUNDLE_FILE_DECOMPRESSION_WORKERS = 1
+# the uncompressed size of the blocks into which the data of UnityFS bundles is split on saving
+BUNDLE_FILE_BLOCK_SIZE = 0x20000
+# the number of threads used to compress the blocks of UnityFS bundles on saving
+# 1 compresses the blocks sequentially,
+# e.g. set it to os.cpu_count() to speed up the saving of big bundles
+BUNDLE_FILE_COMPRESSION_WORKERS = 1
+# determines if local files are memory-mapped instead of being read into memory
+# the data of uncompressed files is then parsed directly from the os page cache
+# note: the loaded files must not be overwritten while the Environment is in use
+ENVIRONMENT_USE_MMAP = False
+# path of a SQLite database in which the parsed metadata of loaded local files is cached
+# (bundle block & directory infos, types, object tables and the containers if they were already read),
+# so that loading the same file again only has to check its size and modification time
+# None disables the cache
+METADATA_CACHE_PATH = None
+# path of a SQLite database in which the typetree nodes generated from the bundled tpk
+# are cached per (class_id, version), used for files without typetrees,
+# so that new processes don't have to parse the whole tpk again
+# None disables the cache
+TPK_NODES_CACHE_PATH = None
 
 # GLOBAL WARNING SUPPRESSION
 FALLBACK_VERSION_WARNED = False  # for FALLBACK_UNITY_VERSION
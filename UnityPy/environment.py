@@ -1,8 +1,10 @@
 import io
+import mmap
 import os
 import ntpath
 import re
-from typing import List, Callable, Dict, Union
+from collections import OrderedDict
+from typing import List, Callable, Dict, Iterable, Iterator, Set, Union
 from zipfile import ZipFile
 
 from fsspec import AbstractFileSystem
@@ -10,9 +12,11 @@ from fsspec.implementations.local import LocalFileSystem
 
 
 from .files import File, ObjectReader, SerializedFile
-from .enums import FileType
+from .enums import ClassIDType, FileType
 from .helpers import ImportHelper
+from .helpers.MetadataCache import MetadataCache
 from .streams import EndianBinaryReader
+from . import config
 
 reSplit = re.compile(r"(.*?([^\/\\]+?))\.split\d+")
 
@@ -23,14 +27,35 @@ class Environment:
     path: str
     local_files: List[str]
     local_files_simple: List[str]
+    metadata_cache: MetadataCache
+    only_types: Union[Set[int], None]
+    type_registry: Dict[tuple, tuple]
 
-    def __init__(self, *args, fs: AbstractFileSystem = None):
+    def __init__(
+        self,
+        *args,
+        fs: AbstractFileSystem = None,
+        only_types: Iterable[Union[ClassIDType, int]] = None,
+    ):
         self.files = {}
         self.cabs = {}
         self.path = None
         self.fs = fs or LocalFileSystem()
         self.local_files = []
         self.local_files_simple = []
+        # restricts the objects to the given types,
+        # the readers of the other objects are only created if they are referenced
+        self.only_types = (
+            {int(typ) for typ in only_types} if only_types is not None else None
+        )
+        # the typetrees shared by the serialized files,
+        # see SerializedFile.read_shared_type_tree_blob
+        self.type_registry = {}
+        self.metadata_cache = (
+            MetadataCache(config.METADATA_CACHE_PATH)
+            if config.METADATA_CACHE_PATH
+            else None
+        )
 
         if args:
             for arg in args:
@@ -59,7 +84,10 @@ class Environment:
 
     def load_files(self, files: List[str]):
         """Loads all files (list) into the Environment and merges .split files for common usage."""
-        self.load_assets(files, lambda x: open(x, "rb"))
+        if config.ENVIRONMENT_USE_MMAP:
+            self.load_assets(files, ImportHelper.open_mmap, local=True)
+        else:
+            self.load_assets(files, lambda x: open(x, "rb"), local=True)
 
     def load_folder(self, path: str):
         """Loads all files in the given path and its subdirs into the Environment."""
@@ -87,6 +115,7 @@ class Environment:
         parent: Union["Environment", File] = None,
         name: str = None,
         is_dependency: bool = False,
+        cache_path: str = None,
     ):
         if not parent:
             parent = self
@@ -117,7 +146,20 @@ class Environment:
                     # nonexistent files might be packaging errors or references to Unity's global Library/
                     if file is None:
                         return
-                file = self.fs.open(file, "rb")
+                if isinstance(self.fs, LocalFileSystem):
+                    cache_path = file
+                if config.ENVIRONMENT_USE_MMAP and isinstance(
+                    self.fs, LocalFileSystem
+                ):
+                    file = ImportHelper.open_mmap(file)
+                else:
+                    file = self.fs.open(file, "rb")
+
+        metadata = None
+        if self.metadata_cache is None:
+            cache_path = None
+        elif cache_path:
+            metadata = self.metadata_cache.get(cache_path)
 
         typ, reader = ImportHelper.check_file_type(file)
 
@@ -135,9 +177,16 @@ class Environment:
             f = self.load_zip_file(file)
         else:
             f = ImportHelper.parse_file(
-                reader, self, name=stream_name, typ=typ, is_dependency=is_dependency
+                reader,
+                self,
+                name=stream_name,
+                typ=typ,
+                is_dependency=is_dependency,
+                metadata=metadata,
             )
-        
+            if cache_path and metadata is None and isinstance(f, File):
+                self.metadata_cache.set(cache_path, f.get_metadata())
+
         if isinstance(f, (SerializedFile, EndianBinaryReader)):
             self.register_cab(stream_name, f)
 
@@ -167,7 +216,8 @@ class Environment:
                 with open(
                     self.fs.sep.join([out_path, ntpath.basename(fname)]), "wb"
                 ) as out:
-                    out.write(fitem.save(packer=pack))
+                    # the files are written directly, without keeping them in memory
+                    fitem.save_to(out, packer=pack)
 
     @property
     def objects(self) -> List[ObjectReader]:
@@ -179,7 +229,7 @@ class Environment:
                 # serialized file
                 if getattr(item, "is_dependency", False):
                     return []
-                return [val for val in item.objects.values()]
+                return list(item.get_objects())
 
             elif getattr(item, "files", None):  # WebBundle and BundleFile
                 # bundle
@@ -251,7 +301,12 @@ class Environment:
         """
         return self.cabs.get(simplify_name(name), None)
 
-    def load_assets(self, assets: List[str], open_f: Callable[[str], io.IOBase]):
+    def load_assets(
+        self,
+        assets: List[str],
+        open_f: Callable[[str], io.IOBase],
+        local: bool = False,
+    ):
         """
         Load all assets from a list of files via the given open_f function.
 
@@ -262,6 +317,9 @@ class Environment:
         open_f : Callable[[str], io.IOBase]
             Function to open the files.
             The function takes a file path and returns an io.IOBase object.
+        local : bool
+            Whether the files are local files,
+            which allows to cache their metadata in the MetadataCache.
         """
         split_files = []
         for path in assets:
@@ -284,8 +342,15 @@ class Environment:
                 data = b"".join(data)
                 path = basepath
             else:
-                data = open_f(path).read()
-            self.load_file(data, name=path)
+                data = open_f(path)
+                # memory-mapped files are parsed directly
+                if not isinstance(data, mmap.mmap):
+                    data = data.read()
+            self.load_file(
+                data,
+                name=path,
+                cache_path=path if local and not splitMatch else None,
+            )
 
     def find_file(self, name: str, is_dependency: bool = True) -> Union[File, None]:
         """
@@ -324,6 +389,92 @@ class Environment:
         return f
 
 
+def iter_objects(
+    path: str,
+    types: Iterable[Union[ClassIDType, int]] = None,
+    fs: AbstractFileSystem = None,
+    cache_size: int = 0,
+) -> Iterator[ObjectReader]:
+    """Iterates over the objects of the given file or folder
+    without loading all files at once.
+
+    The files are loaded one after another,
+    and a file is released after all of its objects were yielded.
+
+    Parameters
+    ----------
+    path : str
+        Path of a file or a folder.
+    types : Iterable[ClassIDType | int]
+        The types of the objects to yield, defaults to all types.
+        The objects are filtered before their readers are created.
+    fs : AbstractFileSystem
+        The filesystem of the path, defaults to the local filesystem.
+    cache_size : int
+        Number of released files that are kept loaded,
+        so that pointers of the following files to their objects
+        can be resolved without loading them again.
+
+    Yields
+    ------
+    ObjectReader
+        The objects of the non-dependency SerializedFiles.
+    """
+    env = Environment(fs=fs, only_types=types)
+
+    if env.fs.isdir(path):
+        env.path = path
+        paths = sorted(
+            env.fs.sep.join([root, f])
+            for root, dirs, files in env.fs.walk(path)
+            for f in files
+        )
+    else:
+        env.path = ntpath.dirname(path) or os.getcwd()
+        paths = [path]
+
+    # parts of split files are loaded together via their first part
+    groups = {}
+    for fp in paths:
+        split_match = reSplit.match(fp)
+        groups.setdefault(split_match[1] if split_match else fp, fp)
+
+    # loaded files that are kept for the pointer resolution
+    cache = OrderedDict()
+    for fp in groups.values():
+        loaded = set(env.files)
+        env.load_file(fp)
+        for name in [name for name in env.files if name not in loaded]:
+            for assets_file in get_assets_files(env.files[name]):
+                yield from assets_file.get_objects()
+
+        # release the file and the dependencies that were loaded for it
+        for name in list(env.files.keys() - cache.keys()):
+            cache[name] = env.files[name]
+        while len(cache) > cache_size:
+            name, f = cache.popitem(last=False)
+            del env.files[name]
+            sub_files = {id(sub_file) for sub_file in iter_files(f)}
+            for cab_name, cab in list(env.cabs.items()):
+                if id(cab) in sub_files:
+                    del env.cabs[cab_name]
+
+
+def iter_files(f: Union[File, EndianBinaryReader]) -> Iterator:
+    """Yields the file and all of its sub-files."""
+    yield f
+    if isinstance(f, File) and not isinstance(f, SerializedFile):
+        for sub_file in f.files.values():
+            yield from iter_files(sub_file)
+
+
+def get_assets_files(f: Union[File, EndianBinaryReader]) -> Iterator[SerializedFile]:
+    """Yields the non-dependency SerializedFiles of the file."""
+    for sub_file in iter_files(f):
+        if isinstance(sub_file, SerializedFile) and not sub_file.is_dependency:
+            yield sub_file
+
+
 def simplify_name(name: str) -> str:
     """Simplifies a name by:
     - removing the extension
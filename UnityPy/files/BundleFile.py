@@ -1,18 +1,158 @@
 # TODO: implement encryption for saving files
-from collections import namedtuple
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import io
 import re
-from typing import Tuple, Union
+import shutil
+import tempfile
+from typing import List, Tuple, Union
 
-from . import File
+from . import File, SerializedFile
 from ..enums import ArchiveFlags, ArchiveFlagsOld, CompressionFlags
 from ..helpers import ArchiveStorageManager, CompressionHelper
-from ..streams import EndianBinaryReader, EndianBinaryWriter
+from ..streams import EndianBinaryReader, EndianBinaryWriter, BlockStorage, BlockStream
 
 from .. import config
 
 BlockInfo = namedtuple("BlockInfo", "uncompressedSize compressedSize flags")
 DirectoryInfoFS = namedtuple("DirectoryInfoFS", "offset size flags path")
 reVersion = re.compile(r"(\d+)\.(\d+)\.(\d+)\w.+")
+# the compressed data of a saved bundle is kept in memory up to this size
+# until its block info is written, bigger data is moved to a temporary file
+BUNDLE_FILE_SPOOL_SIZE = 0x1000000
+
+
+class BlockWriter:
+    """Splits the data written to it into blocks,
+    which are compressed and written to the stream one after another.
+
+    The blocks have the size set in UnityPy.config.BUNDLE_FILE_BLOCK_SIZE
+    and are compressed in parallel, if more than one worker is set in
+    UnityPy.config.BUNDLE_FILE_COMPRESSION_WORKERS.
+    LZMA compressed data is written as one block, like Unity does.
+
+    Should be used as context manager, so that the threads
+    are shut down as well if the writing fails.
+    """
+
+    def __init__(self, stream, flags: int):
+        self.stream = stream
+        self.flags = flags
+        self.blocks_info = []
+        # the uncompressed size of the data written so far
+        self.size = 0
+        self.buffer = bytearray()
+        self.block_size = config.BUNDLE_FILE_BLOCK_SIZE
+        self.compress = None
+        self.lzma = None
+        self.executor = None
+        # (uncompressed size, future) of the blocks that are being compressed
+        self.pending = deque()
+
+        switch = flags & 0x3F
+        if switch == 1:  # LZMA
+            self.lzma = CompressionHelper.create_lzma_compressor()
+            self.compressed_size = len(CompressionHelper.LZMA_PROPERTIES)
+            stream.write(CompressionHelper.LZMA_PROPERTIES)
+        elif switch in [2, 3]:  # LZ4, LZ4HC
+            self.compress = CompressionHelper.compress_lz4
+            self.workers = config.BUNDLE_FILE_COMPRESSION_WORKERS
+            if self.workers > 1:
+                self.executor = ThreadPoolExecutor(self.workers)
+        elif switch == 4:  # LZHAM
+            raise NotImplementedError
+        # else no compression - data stays the same
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def write(self, data: bytes) -> int:
+        view = memoryview(data).cast("B")
+        size = len(view)
+        self.size += size
+        if self.lzma:
+            self.write_compressed(self.lzma.compress(view))
+            return size
+
+        if self.buffer:
+            fill = self.block_size - len(self.buffer)
+            self.buffer += view[:fill]
+            view = view[fill:]
+            if len(self.buffer) < self.block_size:
+                return size
+            self.add_block(bytes(self.buffer))
+            self.buffer = bytearray()
+        while len(view) >= self.block_size:
+            self.add_block(view[: self.block_size])
+            view = view[self.block_size :]
+        self.buffer += view
+        return size
+
+    def can_copy(self, flags: int) -> bool:
+        """Checks if an existing block with the given flags can be written as it is."""
+        return self.lzma is None and (flags & 0x3F) == (self.flags & 0x3F)
+
+    def write_block(self, data: bytes, block_info: BlockInfo):
+        """Writes an already compressed block, see can_copy."""
+        # the buffered data is written as a smaller block in front of it
+        if self.buffer:
+            self.add_block(bytes(self.buffer))
+            self.buffer = bytearray()
+        while self.pending:
+            self.write_pending_block()
+        self.stream.write(data)
+        self.blocks_info.append(block_info)
+        self.size += block_info.uncompressedSize
+
+    def write_compressed(self, data: bytes):
+        self.stream.write(data)
+        self.compressed_size += len(data)
+
+    def add_block(self, data: bytes):
+        if self.executor:
+            # lz4 releases the GIL, so threads are sufficient
+            self.pending.append((len(data), self.executor.submit(self.compress, data)))
+            # limits the blocks kept in memory
+            while len(self.pending) > self.workers * 2:
+                self.write_pending_block()
+            return
+        block = self.compress(data) if self.compress else data
+        self.stream.write(block)
+        self.blocks_info.append(BlockInfo(len(data), len(block), self.flags))
+
+    def write_pending_block(self):
+        size, future = self.pending.popleft()
+        block = future.result()
+        self.stream.write(block)
+        self.blocks_info.append(BlockInfo(size, len(block), self.flags))
+
+    def close(self) -> List[BlockInfo]:
+        """Writes the remaining data and returns the info of the written blocks."""
+        if self.lzma:
+            self.write_compressed(self.lzma.flush())
+            self.lzma = None
+            self.blocks_info = [BlockInfo(self.size, self.compressed_size, self.flags)]
+            return self.blocks_info
+
+        if self.buffer or not (self.blocks_info or self.pending):
+            self.add_block(bytes(self.buffer))
+            self.buffer = bytearray()
+        while self.pending:
+            self.write_pending_block()
+        self.shutdown()
+        return self.blocks_info
+
+    def shutdown(self):
+        """Shuts down the threads, the blocks that weren't written yet are dropped."""
+        for _, future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        if self.executor:
+            self.executor.shutdown()
+            self.executor = None
 
 
 class BundleFile(File.File):
@@ -44,6 +184,8 @@ class BundleFile(File.File):
             raise NotImplementedError(f"Unknown Bundle signature: {signature}")
 
         self.read_files(blocksReader, m_DirectoryInfo)
+        # the read files, to detect unchanged files for the incremental saving
+        self._read_files = dict(self.files)
 
     def read_web_raw(self, reader: EndianBinaryReader):
         # def read_header_and_blocks_info(self, reader:EndianBinaryReader):
@@ -87,27 +229,54 @@ class BundleFile(File.File):
         return m_DirectoryInfo, blocksReader
 
     def read_fs(self, reader: EndianBinaryReader):
+        if "fs" in self._metadata:
+            m_BlocksInfo, m_DirectoryInfo, blocks_offset = self.read_fs_metadata(
+                reader, self._metadata["fs"]
+            )
+        else:
+            m_BlocksInfo, m_DirectoryInfo, blocks_offset = self.read_fs_header(reader)
+        # kept for get_metadata and the incremental saving
+        self._fs_info = (m_BlocksInfo, m_DirectoryInfo, reader.Position, blocks_offset)
+        self._fs_reader = reader
+
+        if config.BUNDLE_FILE_LAZY_DECOMPRESSION or getattr(
+            self.environment, "only_types", None
+        ):
+            # the blocks are only decompressed once their data is read
+            # if only some types are loaded, the blocks of the other objects are skipped
+            storage = BlockStorage(
+                reader,
+                m_BlocksInfo,
+                reader.Position,
+                self.decompress_data,
+                config.BUNDLE_FILE_BLOCK_CACHE_SIZE,
+            )
+            return m_DirectoryInfo, EndianBinaryReader(
+                BlockStream(storage), offset=blocks_offset
+            )
+
+        blocksReader = EndianBinaryReader(
+            self.decompress_blocks(reader, m_BlocksInfo),
+            offset=blocks_offset,
+        )
+
+        return m_DirectoryInfo, blocksReader
+
+    def read_fs_header(self, reader: EndianBinaryReader) -> tuple:
+        """Reads the header, the block infos and the directory infos of an UnityFS bundle.
+
+        Returns
+        -------
+        tuple
+            (blocks_info, directory_info, blocks_offset),
+            the reader is set to the start of the first block.
+        """
         size = reader.read_long()
 
         # header
         compressedSize = reader.read_u_int()
         uncompressedSize = reader.read_u_int()
-        self.dataflags = reader.read_u_int()
-
-        version = self.get_version_tuple()
-        # https://issuetracker.unity3d.com/issues/files-within-assetbundles-do-not-start-on-aligned-boundaries-breaking-patching-on-nintendo-switch
-        # Unity CN introduced encryption before the alignment fix was introduced.
-        # Unity CN used the same flag for the encryption as later on the alignment fix,
-        # so we have to check the version to determine the correct flag set.
-        if (
-            version < (2020,)
-            or (version[0] == 2020 and version < (2020, 3, 34))
-            or (version[0] == 2021 and version < (2021, 3, 2))
-            or (version[0] == 2022 and version < (2022, 1, 1))
-        ):
-            self.dataflags = ArchiveFlagsOld(self.dataflags)
-        else:
-            self.dataflags = ArchiveFlags(self.dataflags)
+        self.dataflags = self.parse_dataflags(reader.read_u_int())
 
         if self.dataflags & self.dataflags.UsesAssetBundleEncryption:
             self.decryptor = ArchiveStorageManager.ArchiveStorageDecryptor(reader)
@@ -118,7 +287,7 @@ class BundleFile(File.File):
         if self.version >= 7:
             reader.align_stream(16)
             self._uses_block_alignment = True
-        elif version >= (2019, 4):
+        elif self.get_version_tuple() >= (2019, 4):
             pre_align = reader.Position
             align_data = reader.read((16 - pre_align % 16) % 16)
             if any(align_data):
@@ -173,22 +342,106 @@ class BundleFile(File.File):
         ):
             reader.align_stream(16)
 
-        blocksReader = EndianBinaryReader(
-            b"".join(
-                self.decompress_data(
-                    reader.read_bytes(blockInfo.compressedSize),
-                    blockInfo.uncompressedSize,
-                    blockInfo.flags,
-                    i,
-                )
-                for i, blockInfo in enumerate(m_BlocksInfo)
-            ),
-            offset=(blocksInfoReader.real_offset()),
+        return m_BlocksInfo, m_DirectoryInfo, blocksInfoReader.real_offset()
+
+    def read_fs_metadata(self, reader: EndianBinaryReader, metadata: dict) -> tuple:
+        """Restores the header, the block infos and the directory infos
+        of an UnityFS bundle from the cached metadata instead of parsing them.
+
+        Returns
+        -------
+        tuple
+            (blocks_info, directory_info, blocks_offset),
+            the reader is set to the start of the first block.
+        """
+        self.dataflags = self.parse_dataflags(metadata["dataflags"])
+        self._uses_block_alignment = metadata["uses_block_alignment"]
+        if metadata["block_info_flags"] is not None:
+            self._block_info_flags = metadata["block_info_flags"]
+        reader.Position = metadata["data_offset"]
+        return (
+            [BlockInfo(*block_info) for block_info in metadata["blocks_info"]],
+            [DirectoryInfoFS(*node) for node in metadata["directory_info"]],
+            metadata["blocks_offset"],
         )
 
-        return m_DirectoryInfo, blocksReader
+    def parse_dataflags(self, value: int) -> Union[ArchiveFlags, ArchiveFlagsOld]:
+        version = self.get_version_tuple()
+        # https://issuetracker.unity3d.com/issues/files-within-assetbundles-do-not-start-on-aligned-boundaries-breaking-patching-on-nintendo-switch
+        # Unity CN introduced encryption before the alignment fix was introduced.
+        # Unity CN used the same flag for the encryption as later on the alignment fix,
+        # so we have to check the version to determine the correct flag set.
+        if (
+            version < (2020,)
+            or (version[0] == 2020 and version < (2020, 3, 34))
+            or (version[0] == 2021 and version < (2021, 3, 2))
+            or (version[0] == 2022 and version < (2022, 1, 1))
+        ):
+            return ArchiveFlagsOld(value)
+        return ArchiveFlags(value)
+
+    def get_metadata(self) -> dict:
+        metadata = super().get_metadata()
+        fs_info = getattr(self, "_fs_info", None)
+        # encrypted bundles are parsed again to set up the decryptor
+        if fs_info and self.decryptor is None:
+            blocks_info, directory_info, data_offset, blocks_offset = fs_info
+            metadata["fs"] = {
+                "dataflags": int(self.dataflags),
+                "uses_block_alignment": self._uses_block_alignment,
+                "block_info_flags": getattr(self, "_block_info_flags", None),
+                "blocks_info": [tuple(block_info) for block_info in blocks_info],
+                "directory_info": [tuple(node) for node in directory_info],
+                "data_offset": data_offset,
+                "blocks_offset": blocks_offset,
+            }
+        return metadata
+
+    def decompress_blocks(
+        self, reader: EndianBinaryReader, blocks_info: List[BlockInfo]
+    ) -> bytes:
+        """Decompresses all blocks that follow at the position of the reader.
+
+        The blocks are decompressed in parallel, if more than one worker is set in
+        UnityPy.config.BUNDLE_FILE_DECOMPRESSION_WORKERS.
+
+        Parameters
+        ----------
+        reader : EndianBinaryReader
+            The reader, set to the start of the first block.
+        blocks_info : List[BlockInfo]
+            The info of the blocks.
 
-    def save(self, packer=None):
+        Returns
+        -------
+        bytes
+            The decompressed data of all blocks."""
+        tasks = [
+            (i, block_info, reader.read_bytes(block_info.compressedSize))
+            for i, block_info in enumerate(blocks_info)
+        ]
+
+        def decompress_block(task):
+            i, block_info, compressed_data = task
+            data = self.decompress_data(
+                compressed_data, block_info.uncompressedSize, block_info.flags, i
+            )
+            if len(data) != block_info.uncompressedSize:
+                raise ValueError(
+                    f"The size of block {i} doesn't match its block info ({len(data)} != {block_info.uncompressedSize})"
+                )
+            return data
+
+        # the result is immutable bytes,
+        # so the data read from it is hashable and can't be changed via the readers
+        workers = config.BUNDLE_FILE_DECOMPRESSION_WORKERS
+        if workers > 1 and len(tasks) > 1:
+            # lz4 and lzma release the GIL, so threads are sufficient
+            with ThreadPoolExecutor(min(workers, len(tasks))) as executor:
+                return b"".join(executor.map(decompress_block, tasks))
+        return b"".join(map(decompress_block, tasks))
+
+    def save(self, packer=None, incremental: bool = False):
         """
         Rewrites the BundleFile and returns it as bytes object.
 
@@ -199,13 +452,34 @@ class BundleFile(File.File):
                 none - no compression, default, safest bet
                 lz4 - lz4 compression
                 original - uses the original flags
+        incremental:
+            if the data of unchanged files is copied from the bundle
+            instead of being serialized again,
+            its original blocks are copied as they are if they use the same compression
+        """
+        stream = io.BytesIO()
+        self.save_to(stream, packer, incremental)
+        return stream.getvalue()
+
+    def save_to(self, stream: io.IOBase, packer=None, incremental: bool = False) -> int:
+        """
+        Rewrites the BundleFile into the stream, starting at its current position,
+        e.g. into an opened file.
+        The data is written block by block, so that the bundle isn't kept in memory,
+        the stream has to be seekable to write the sizes into the header at the end.
+
+        packer, incremental:
+            see save
+
+        Returns the size of the written bundle.
         """
         # file_header
         #     signature    (string_to_null)
         #     format        (int)
         #     version_player    (string_to_null)
         #     version_engine    (string_to_null)
-        writer = EndianBinaryWriter()
+        writer = EndianBinaryWriter(stream)
+        start = writer.Position
 
         writer.write_string_to_null(self.signature)
         writer.write_u_int(self.version)
@@ -221,22 +495,37 @@ class BundleFile(File.File):
             # self.save_web_raw(writer)
         elif self.signature == "UnityFS":
             if not packer or packer == "none":
-                self.save_fs(writer, 64, 64)
+                self.save_fs(writer, 64, 64, start, incremental)
             elif packer == "original":
                 self.save_fs(
                     writer,
                     data_flag=self.dataflags,
                     block_info_flag=self._block_info_flags,
+                    start=start,
+                    incremental=incremental,
                 )
             elif packer == "lz4":
-                self.save_fs(writer, data_flag=194, block_info_flag=2)
+                self.save_fs(
+                    writer,
+                    data_flag=194,
+                    block_info_flag=2,
+                    start=start,
+                    incremental=incremental,
+                )
             elif isinstance(packer, tuple):
-                self.save_fs(writer, *packer)
+                self.save_fs(writer, *packer, start=start, incremental=incremental)
             else:
                 raise NotImplementedError("UnityFS - Packer:", packer)
-        return writer.bytes
+        return writer.Position - start
 
-    def save_fs(self, writer: EndianBinaryWriter, data_flag: int, block_info_flag: int):
+    def save_fs(
+        self,
+        writer: EndianBinaryWriter,
+        data_flag: int,
+        block_info_flag: int,
+        start: int = 0,
+        incremental: bool = False,
+    ):
         # header
         # compressed blockinfo (block details & directionary)
         # compressed assets
@@ -258,8 +547,8 @@ class BundleFile(File.File):
         #     uncompressed_size    (int)
         #     flag                (int)
         #     ?padding?            (bool)
-        #   This will be written at the end,
-        #   because the size can only be calculated after the data compression,
+        #   The sizes will be written at the end,
+        #   because they can only be calculated after the data compression,
 
         # block_info:
         #     *flag & 0x80 ? at the end : right after header
@@ -283,65 +572,113 @@ class BundleFile(File.File):
         #         flag        (int)
         #         name        (string_to_null)
         #     )
-
-        # file list & file data
-        # prep nodes and build up block data
-        data_writer = EndianBinaryWriter()
-        files = [
-            (
-                name,
-                f.flags,
-                data_writer.write_bytes(
-                    f.bytes
-                    if isinstance(f, (EndianBinaryReader, EndianBinaryWriter))
-                    else f.save()
-                ),
+        if not data_flag & 0x40:
+            raise NotImplementedError(
+                "UnityPy always writes DirectoryInfo, so data_flag must include 0x40"
             )
-            for name, f in self.files.items()
-        ]
 
-        file_data = data_writer.bytes
-        data_writer.dispose()
-        uncompressed_data_size = len(file_data)
+        def align_stream(alignment: int):
+            # the alignment is relative to the start of the bundle
+            writer.write(b"\x00" * ((alignment - (writer.Position - start) % alignment) % alignment))
 
-        # compress the data
-        switch = block_info_flag & 0x3F
-        if switch == 1:  # LZMA
-            file_data = CompressionHelper.compress_lzma(file_data)
-        elif switch in [2, 3]:  # LZ4, LZ4HC
-            file_data = CompressionHelper.compress_lz4(file_data)
-        elif switch == 4:  # LZHAM
-            raise NotImplementedError
-        # else no compression - data stays the same
-        compressed_data_size = len(file_data)
+        # write the header info
+        ## sizes - 0 for now, will be set at the end
+        writer_header_pos = writer.Position
+        # file size
+        writer.write_long(0)
+        # compressed blockInfoBytes size
+        writer.write_u_int(0)
+        # uncompressed size
+        writer.write_u_int(0)
+        # compression and file layout flag
+        writer.write_u_int(data_flag)
+
+        if self._uses_block_alignment:
+            # UnityFS\x00 - 8
+            # size 8
+            # comp sizes 4+4
+            # flag 4
+            # sum : 28 -> +8 alignment
+            align_stream(16)
+
+        if data_flag & 0x80:  # at end of file
+            if data_flag & 0x200:
+                align_stream(16)
+            # the blocks can be written directly
+            blocks_stream = writer
+        else:
+            # the blocks are kept until the block info in front of them is written
+            blocks_stream = tempfile.SpooledTemporaryFile(BUNDLE_FILE_SPOOL_SIZE)
+
+        # file list & file data
+        # the data of the files is compressed in blocks while it's written
+        files = []
+        nodes = {}
+        if incremental and getattr(self, "_fs_info", None):
+            nodes = {node.path: node for node in self._fs_info[1]}
+        # the last decompressed original block, as blocks can span multiple files
+        decompressed = {}
+        # [start, end) of the original data of the unchanged files that follow each other,
+        # written together so that the blocks spanning these files can be copied as well
+        original_range = None
+        with BlockWriter(blocks_stream, block_info_flag) as block_writer:
+            for name, f in self.files.items():
+                node = nodes.get(name)
+                if (
+                    node is not None
+                    and self._read_files.get(name) is f
+                    and not getattr(f, "is_changed", False)
+                ):
+                    if original_range and original_range[1] == node.offset:
+                        offset = block_writer.size + original_range[1] - original_range[0]
+                        original_range[1] += node.size
+                    else:
+                        if original_range:
+                            self.write_original_data(block_writer, *original_range, decompressed)
+                        offset = block_writer.size
+                        original_range = [node.offset, node.offset + node.size]
+                    files.append((name, f.flags, offset, node.size))
+                    continue
+
+                if original_range:
+                    self.write_original_data(block_writer, *original_range, decompressed)
+                    original_range = None
+                offset = block_writer.size
+                if isinstance(f, SerializedFile.SerializedFile):
+                    f.save_to(block_writer)
+                else:
+                    block_writer.write(
+                        f.bytes
+                        if isinstance(f, (EndianBinaryReader, EndianBinaryWriter))
+                        else f.save()
+                    )
+                files.append((name, f.flags, offset, block_writer.size - offset))
+            if original_range:
+                self.write_original_data(block_writer, *original_range, decompressed)
+            blocks_info = block_writer.close()
 
         # write the block_info
         # uncompressedDataHash
         block_writer = EndianBinaryWriter(b"\x00" * 0x10)
         # data block info
         # block count
-        block_writer.write_int(1)
-        # uncompressed size
-        block_writer.write_u_int(uncompressed_data_size)
-        # compressed size
-        block_writer.write_u_int(compressed_data_size)
-        # flag
-        block_writer.write_u_short(block_info_flag)
+        block_writer.write_int(len(blocks_info))
+        for block_info in blocks_info:
+            # uncompressed size
+            block_writer.write_u_int(block_info.uncompressedSize)
+            # compressed size
+            block_writer.write_u_int(block_info.compressedSize)
+            # flag
+            block_writer.write_u_short(block_info.flags)
 
         # file block info
-        if not data_flag & 0x40:
-            raise NotImplementedError(
-                "UnityPy always writes DirectoryInfo, so data_flag must include 0x40"
-            )
         # file count
         block_writer.write_int(len(files))
-        offset = 0
-        for f_name, f_flag, f_len in files:
+        for f_name, f_flag, f_offset, f_len in files:
             # offset
-            block_writer.write_long(offset)
+            block_writer.write_long(f_offset)
             # size
             block_writer.write_long(f_len)
-            offset += f_len
             # flag
             block_writer.write_u_int(f_flag)
             # name
@@ -363,42 +700,83 @@ class BundleFile(File.File):
 
         compressed_block_data_size = len(block_data)
 
-        # write the header info
-        ## file size - 0 for now, will be set at the end
-        writer_header_pos = writer.Position
-        writer.write_long(0)
-        # compressed blockInfoBytes size
-        writer.write_u_int(compressed_block_data_size)
-        # uncompressed size
-        writer.write_u_int(uncompressed_block_data_size)
-        # compression and file layout flag
-        writer.write_u_int(data_flag)
-
-        if self._uses_block_alignment:
-            # UnityFS\x00 - 8
-            # size 8
-            # comp sizes 4+4
-            # flag 4
-            # sum : 28 -> +8 alignment
-            writer.align_stream(16)
-
-        if data_flag & 0x80:  # at end of file
-            if data_flag & 0x200:
-                writer.align_stream(16)
-            writer.write(file_data)
-            writer.write(block_data)
-        else:
-            writer.write(block_data)
+        writer.write(block_data)
+        if not data_flag & 0x80:
             if data_flag & 0x200:
-                writer.align_stream(16)
-            writer.write(file_data)
+                align_stream(16)
+            blocks_stream.seek(0)
+            shutil.copyfileobj(blocks_stream, writer, config.BUNDLE_FILE_BLOCK_SIZE)
+            blocks_stream.close()
 
         writer_end_pos = writer.Position
         writer.Position = writer_header_pos
-        # correct file size
-        writer.write_long(writer_end_pos)
+        # correct sizes
+        writer.write_long(writer_end_pos - start)
+        writer.write_u_int(compressed_block_data_size)
+        writer.write_u_int(uncompressed_block_data_size)
         writer.Position = writer_end_pos
 
+    def write_original_data(
+        self, block_writer: BlockWriter, start: int, end: int, decompressed: dict
+    ):
+        """Writes a range of the original uncompressed data of the bundle.
+
+        The original blocks that are completely within the range are copied as they are,
+        if their compression matches the one of the block writer,
+        the other blocks are decompressed.
+
+        Parameters
+        ----------
+        block_writer : BlockWriter
+            The writer of the blocks of the saved bundle.
+        start : int
+            The start of the range in the original uncompressed data.
+        end : int
+            The end of the range in the original uncompressed data.
+        decompressed : dict
+            index -> data of the last decompressed block,
+            kept between the calls for the blocks that span multiple files."""
+        blocks_info, _, data_offset, _ = self._fs_info
+        reader = self._fs_reader
+
+        block_start = 0
+        compressed_offset = data_offset
+        for i, block_info in enumerate(blocks_info):
+            block_end = block_start + block_info.uncompressedSize
+            if block_end > start and block_start < end:
+                if (
+                    block_start >= start
+                    and block_end <= end
+                    and self.decryptor is None
+                    and block_writer.can_copy(block_info.flags)
+                ):
+                    reader.Position = compressed_offset
+                    block_writer.write_block(
+                        reader.read_bytes(block_info.compressedSize), block_info
+                    )
+                else:
+                    data = decompressed.get(i)
+                    if data is None:
+                        reader.Position = compressed_offset
+                        data = self.decompress_data(
+                            reader.read_bytes(block_info.compressedSize),
+                            block_info.uncompressedSize,
+                            block_info.flags,
+                            i,
+                        )
+                        decompressed.clear()
+                        decompressed[i] = data
+                    block_writer.write(
+                        memoryview(data)[
+                            max(start, block_start) - block_start : min(end, block_end)
+                            - block_start
+                        ]
+                    )
+            elif block_start >= end:
+                break
+            block_start = block_end
+            compressed_offset += block_info.compressedSize
+
     def decompress_data(
         self,
         compressed_data: bytes,
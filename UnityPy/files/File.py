@@ -1,6 +1,7 @@
 from ..enums import FileType
 from ..helpers import ImportHelper
-from ..streams import EndianBinaryReader, EndianBinaryWriter
+from ..streams import EndianBinaryReader, EndianBinaryWriter, BlockStream
+from ..streams.EndianBinaryReader import EndianBinaryReader_Streamable
 
 from collections import namedtuple
 from os.path import basename
@@ -21,7 +22,13 @@ class File(object):
     # parent: File
     # environment: Environment
 
-    def __init__(self, parent=None, name: str = None, is_dependency: bool = False):
+    def __init__(
+        self,
+        parent=None,
+        name: str = None,
+        is_dependency: bool = False,
+        metadata: dict = None,
+    ):
         self.files = {}
         self.is_changed = False
         self.cab_file = "CAB-UnityPy_Mod.resS"
@@ -31,6 +38,8 @@ class File(object):
         )
         self.name = basename(name) if isinstance(name, str) else ""
         self.is_dependency = is_dependency
+        # cached metadata of a previous parse, see get_metadata
+        self._metadata = metadata or {}
 
     def get_assets(self):
         if isinstance(self, SerializedFile.SerializedFile):
@@ -45,38 +54,42 @@ class File(object):
 
     def get_filtered_objects(self, obj_types=[]):
         if len(obj_types) == 0:
-            return self.get_objects()
+            yield from self.get_objects()
+            return
         for f in self.files.values():
-            if isinstance(f, (BundleFile.BundleFile, WebFile.WebFile)):
-                for obj in f.objects:
-                    if obj.type in obj_types:
-                        yield obj
-            elif isinstance(f, SerializedFile.SerializedFile):
-                for obj in f.objects.values():
-                    if obj.type in obj_types:
-                        yield obj
+            if isinstance(f, File):
+                yield from f.get_filtered_objects(obj_types)
 
     def get_objects(self):
         for f in self.files.values():
-            if isinstance(f, (BundleFile.BundleFile, WebFile.WebFile)):
-                for obj in f.objects:
-                    yield obj
-            elif isinstance(f, SerializedFile.SerializedFile):
-                for obj in f.objects.values():
-                    yield obj
+            if isinstance(f, File):
+                yield from f.get_objects()
             elif isinstance(f, ObjectReader.ObjectReader):
                 yield f
 
     def read_files(self, reader: EndianBinaryReader, files: list):
         # read file data and convert it
         for node in files:
-            reader.Position = node.offset
             name = node.path
-            node_reader = EndianBinaryReader(
-                reader.read(node.size), offset=(reader.BaseOffset + node.offset)
-            )
+            if isinstance(reader, EndianBinaryReader_Streamable) and isinstance(
+                reader.stream, BlockStream
+            ):
+                # lazy block decompression - only the read parts are decompressed
+                node_reader = EndianBinaryReader(
+                    reader.stream.window(node.offset, node.size),
+                    offset=(reader.BaseOffset + node.offset),
+                )
+            else:
+                reader.Position = node.offset
+                node_reader = EndianBinaryReader(
+                    reader.read(node.size), offset=(reader.BaseOffset + node.offset)
+                )
             f = ImportHelper.parse_file(
-                node_reader, self, name, is_dependency=self.is_dependency
+                node_reader,
+                self,
+                name,
+                is_dependency=self.is_dependency,
+                metadata=self._metadata.get("files", {}).get(name),
             )
 
             if isinstance(f, (EndianBinaryReader, SerializedFile.SerializedFile)):
@@ -87,6 +100,18 @@ class File(object):
             f.flags = getattr(node, "flags", 0)
             self.files[name] = f
 
+    def get_metadata(self) -> dict:
+        """Returns the parsed metadata of the file and its sub-files
+        for the MetadataCache.
+        The metadata only consists of builtin types."""
+        return {
+            "files": {
+                name: f.get_metadata()
+                for name, f in self.files.items()
+                if isinstance(f, File)
+            }
+        }
+
     def get_writeable_cab(self, name: str = None):
         """
         Creates a new cab file in the bundle that contains the given data.
@@ -147,6 +172,13 @@ class File(object):
     def __repr__(self):
         return f"<{self.__class__.__name__}>"
 
+    def save_to(self, stream, packer: str = None) -> int:
+        """Writes the file into the stream, e.g. an opened file,
+        returns the size of the written file."""
+        data = self.save(packer=packer)
+        stream.write(data)
+        return len(data)
+
     def mark_changed(self):
         if isinstance(self.parent, File):
             self.parent.mark_changed()
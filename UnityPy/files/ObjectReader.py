@@ -1,21 +1,31 @@
+from typing import Any, Dict, List, Tuple
+
 from ..enums import ClassIDType
 
 from . import SerializedFile
 from .. import classes
-from ..classes.Object import NodeHelper
+from ..classes.Object import NodeHelper, get_node_factories
 from ..streams import EndianBinaryReader, EndianBinaryWriter
 from ..helpers import TypeTreeHelper
-from ..helpers.Tpk import get_typetree_nodes
+from ..helpers.Tpk import get_typetree_nodes, get_typetree_read_plan
 from ..exceptions import TypeTreeError
 
 
 class ObjectReader:
-    byte_start: int
-    byte_size: int
-    type_id: int
-    class_id: int
-    type: ClassIDType
-    path_id: int
+    """A lightweight view on a row of the object info table of a SerializedFile.
+
+    The fields of the object info, e.g. path_id, are read from and written to the row.
+    """
+
+    __slots__ = (
+        "assets_file",
+        "row",
+        "serialized_type",
+        "data",
+        "_read_until",
+        "_field_offsets",
+        "_field_ranges",
+    )
     # serialized_type: SerializedType
     _read_until: int
 
@@ -23,81 +33,140 @@ class ObjectReader:
     # in case that not all data is read
     # and the obj.data is changed, the unknown data can be added again
 
-    def __init__(self, assets_file, reader: EndianBinaryReader):
+    def __init__(self, assets_file, row: int):
+        """Creates the reader for the given row of the object info table
+        of the SerializedFile."""
         self.assets_file = assets_file
-        self.reader = reader
+        self.row = row
         self.data = b""
-        self.version = assets_file.version
-        self.version2 = assets_file.header.version
-        self.platform = assets_file.target_platform
-        self.build_type = assets_file.build_type
+        # path -> (offset, type) of the fields, see get_field_offsets
+        self._field_offsets = None
+        # (index, start, end) of the fields of the root, see get_field_ranges
+        self._field_ranges = None
+        self.serialized_type = assets_file.get_serialized_type(
+            assets_file._object_info.type_id[row]
+        )
 
-        header = assets_file.header
-        types = assets_file.types
+    @property
+    def reader(self) -> EndianBinaryReader:
+        return self.assets_file.reader
 
-        # AssetStudio ObjectInfo init
-        if assets_file.big_id_enabled:
-            self.path_id = reader.read_long()
-        elif header.version < 14:
-            self.path_id = reader.read_int()
-        else:
-            reader.align_stream()
-            self.path_id = reader.read_long()
+    @property
+    def version(self) -> tuple:
+        return self.assets_file.version
 
-        if header.version >= 22:
-            self.byte_start_offset = (self.reader.real_offset(), 8)
-            self.byte_start = reader.read_long()
-        else:
-            self.byte_start_offset = (self.reader.real_offset(), 4)
-            self.byte_start = reader.read_u_int()
+    @property
+    def version2(self) -> int:
+        return self.assets_file.header.version
 
-        self.byte_start += header.data_offset
-        self.byte_header_offset = header.data_offset
-        self.byte_base_offset = self.reader.BaseOffset
+    @property
+    def platform(self):
+        return self.assets_file.target_platform
 
-        self.byte_size_offset = (self.reader.real_offset(), 4)
-        self.byte_size = reader.read_u_int()
+    @property
+    def build_type(self):
+        return self.assets_file.build_type
 
-        self.type_id = reader.read_int()
+    # AssetStudio ObjectInfo
+    @property
+    def path_id(self) -> int:
+        return self.assets_file._object_info.path_id[self.row]
 
-        if header.version < 16:
-            self.class_id = reader.read_u_short()
-            self.serialized_type = None
-            for typ in types:
-                if typ.class_id == self.type_id:
-                    self.serialized_type = typ
-                    break
-        else:
-            typ = types[self.type_id]
-            self.serialized_type = typ
-            self.class_id = typ.class_id
+    @path_id.setter
+    def path_id(self, value: int):
+        self.assets_file._object_info.path_id[self.row] = value
 
-        self.type = ClassIDType(self.class_id)
+    @property
+    def byte_start(self) -> int:
+        return (
+            self.assets_file._object_info.byte_start[self.row]
+            + self.assets_file.header.data_offset
+        )
+
+    @byte_start.setter
+    def byte_start(self, value: int):
+        self.assets_file._object_info.byte_start[self.row] = (
+            value - self.assets_file.header.data_offset
+        )
 
-        if header.version < 11:
-            self.is_destroyed = reader.read_u_short()
+    @property
+    def byte_size(self) -> int:
+        return self.assets_file._object_info.byte_size[self.row]
 
-        if 11 <= header.version < 17:
-            script_type_index = reader.read_short()
-            if self.serialized_type:
-                self.serialized_type.script_type_index = script_type_index
+    @byte_size.setter
+    def byte_size(self, value: int):
+        self.assets_file._object_info.byte_size[self.row] = value
 
-        if header.version == 15 or header.version == 16:
-            self.stripped = reader.read_byte()
+    @property
+    def type_id(self) -> int:
+        return self.assets_file._object_info.type_id[self.row]
+
+    @type_id.setter
+    def type_id(self, value: int):
+        self.assets_file._object_info.type_id[self.row] = value
+
+    @property
+    def class_id(self) -> int:
+        return self.assets_file._object_info.class_id[self.row]
+
+    @class_id.setter
+    def class_id(self, value: int):
+        self.assets_file._object_info.class_id[self.row] = value
+
+    @property
+    def type(self) -> ClassIDType:
+        return ClassIDType(self.class_id)
+
+    @property
+    def is_destroyed(self) -> int:
+        # version < 11
+        return self.assets_file._object_info.is_destroyed[self.row]
+
+    @is_destroyed.setter
+    def is_destroyed(self, value: int):
+        self.assets_file._object_info.is_destroyed[self.row] = value
+
+    @property
+    def stripped(self) -> int:
+        # version 15 & 16
+        return self.assets_file._object_info.stripped[self.row]
+
+    @stripped.setter
+    def stripped(self, value: int):
+        self.assets_file._object_info.stripped[self.row] = value
+
+    @property
+    def byte_start_offset(self) -> tuple:
+        return (
+            self.assets_file._object_info.get_field_offset(self.row, "byte_start"),
+            8 if self.assets_file.header.version >= 22 else 4,
+        )
+
+    @property
+    def byte_size_offset(self) -> tuple:
+        return (
+            self.assets_file._object_info.get_field_offset(self.row, "byte_size"),
+            4,
+        )
+
+    @property
+    def byte_header_offset(self) -> int:
+        return self.assets_file.header.data_offset
+
+    @property
+    def byte_base_offset(self) -> int:
+        return self.reader.BaseOffset
 
     def write(
         self, header, writer: EndianBinaryWriter, data_writer: EndianBinaryWriter
     ):
-        if self.assets_file.big_id_enabled:
-            writer.write_long(self.path_id)
-        elif header.version < 14:
-            writer.write_int(self.path_id)
-        else:
-            writer.align_stream()
-            writer.write_long(self.path_id)
+        data = self.get_data()
+        self.write_info(header, writer, data_writer.Position, len(data))
+        data_writer.write(data)
 
+    def get_data(self) -> bytes:
+        """Returns the current data of the object, the changed data if it was set."""
         if self.data:
-            data = self.data
             # in some cases the parser doesn't read all of the object data
             # games might still require the missing data
             # so following code appends the missing data back to edited objects
@@ -107,17 +176,32 @@ class ObjectReader:
             #     if self._read_until and self._read_until != end_pos:
             #         self.reader.Position = self._read_until
             #         data += self.reader.read_bytes(end_pos - self._read_until)
+            return self.data
+        self.reset()
+        return self.reader.read(self.byte_size)
+
+    @property
+    def data_size(self) -> int:
+        """The size of the current data of the object."""
+        return len(self.data) if self.data else self.byte_size
+
+    def write_info(self, header, writer: EndianBinaryWriter, offset: int, size: int):
+        """Writes the entry of the object info table,
+        offset and size are the position of the object's data in the data section."""
+        if self.assets_file.big_id_enabled:
+            writer.write_long(self.path_id)
+        elif header.version < 14:
+            writer.write_int(self.path_id)
         else:
-            self.reset()
-            data = self.reader.read(self.byte_size)
+            writer.align_stream()
+            writer.write_long(self.path_id)
 
         if header.version >= 22:
-            writer.write_long(data_writer.Position)
+            writer.write_long(offset)
         else:
-            writer.write_u_int(data_writer.Position)
+            writer.write_u_int(offset)
 
-        writer.write_u_int(len(data))
-        data_writer.write(data)
+        writer.write_u_int(size)
 
         writer.write_int(self.type_id)
 
@@ -139,7 +223,7 @@ class ObjectReader:
 
     @property
     def container(self):
-        return self.assets_file._container.path_dict.get(self.path_id)
+        return self.assets_file.container.path_dict.get(self.path_id)
 
     @property
     def Position(self):
@@ -175,6 +259,9 @@ class ObjectReader:
         return getattr(self, key, default)
 
     def __getattr__(self, item: str):
+        if item == "assets_file":
+            # not set yet, avoids a recursion via self.reader
+            raise AttributeError(item)
         if hasattr(self.reader, item):
             return getattr(self.reader, item)
 
@@ -190,8 +277,8 @@ class ObjectReader:
     def dump_typetree(self, nodes: list = None) -> str:
         self.reset()
         sb = []
-        nodes = self.get_typetree(nodes)
-        TypeTreeHelper.read_typetree_str(sb, nodes, self)
+        plan = self.get_typetree_read_plan(nodes)
+        TypeTreeHelper.read_typetree_str(sb, plan.nodes, self, plan)
         return "".join(sb)
 
     def dump_typetree_structure(self) -> str:
@@ -209,19 +296,55 @@ class ObjectReader:
             raise TypeTreeError("There are no TypeTree nodes for this object.")
         return nodes
 
-    def read_typetree(self, nodes: list = None, wrap: bool = False) -> dict:
+    def get_typetree_read_plan(
+        self, nodes: list = None
+    ) -> TypeTreeHelper.TypeTreeReadPlan:
+        if nodes:
+            return TypeTreeHelper.TypeTreeReadPlan(nodes)
+
+        # the plans of the types are compiled once and cached
+        if self.serialized_type and self.serialized_type.nodes:
+            return self.serialized_type.read_plan
+        return get_typetree_read_plan(self.class_id, self.version)
+
+    def read_typetree(
+        self,
+        nodes: list = None,
+        wrap: bool = False,
+        fields: list = None,
+        as_numpy: bool = False,
+    ) -> dict:
+        """Reads the typetree of the object.
+
+        fields can be a list of field paths, e.g. ["m_Name", "data.items"],
+        to only read these fields and skip all others.
+        as_numpy returns vectors of primitive types as NumPy arrays,
+        or as typed memoryviews if NumPy isn't available.
+        """
         self.reset()
-        nodes = self.get_typetree_nodes(nodes)
-        res = TypeTreeHelper.read_typetree(nodes, self)
-        return NodeHelper(res, self.assets_file) if wrap else res
+        plan = self.get_typetree_read_plan(nodes)
+        if not wrap:
+            return TypeTreeHelper.read_typetree(plan.nodes, self, plan, fields, as_numpy)
+        # the structs are created directly as NodeHelpers by the reader
+        res = TypeTreeHelper.read_typetree(
+            plan.nodes,
+            self,
+            plan,
+            fields,
+            as_numpy,
+            get_node_factories(plan),
+            self.assets_file,
+        )
+        # the projected structs are returned as dicts
+        return NodeHelper(res, self.assets_file) if fields is not None else res
 
     def save_typetree(
         self, tree: dict, nodes: list = None, writer: EndianBinaryWriter = None
     ):
-        nodes = self.get_typetree_nodes(nodes)
+        plan = self.get_typetree_read_plan(nodes)
         if not writer:
             writer = EndianBinaryWriter(endian=self.reader.endian)
-        writer = TypeTreeHelper.write_typetree(tree, nodes, writer)
+        writer = TypeTreeHelper.write_typetree(tree, plan.nodes, writer, plan)
         data = writer.bytes
         self.set_raw_data(data)
         return data
@@ -235,5 +358,56 @@ class ObjectReader:
 
     def set_raw_data(self, data):
         self.data = data
+        self._field_offsets = None
+        self._field_ranges = None
         if self.assets_file:
             self.assets_file.mark_changed()
+
+    def get_field_offsets(self) -> Dict[str, Tuple[int, str]]:
+        """Returns path -> (offset, type) of the fields of the object's data,
+        e.g. {"m_Name": (0, "string"), "data.items[3].x": (20, "float")}.
+        The elements of primitive vectors are stored once as "path[]" -> (offset, type, count),
+        e.g. {"m_Floats[]": (40, "float", 1000)}, see TypeTreeHelper.get_field_offset.
+
+        The map is determined once and cached until the data is replaced.
+        """
+        if self._field_offsets is None:
+            plan = self.get_typetree_read_plan()
+            self._field_offsets = TypeTreeHelper.get_field_offsets(
+                plan.nodes, self.data or self.get_raw_data(), self.reader.endian, plan
+            )
+        return self._field_offsets
+
+    def get_field_ranges(self) -> List[Tuple[int, int, int]]:
+        """Returns (index, start, end) of the fields of the root struct of the object's data,
+        index is the index of the field's node, start and end are the byte range of its data.
+
+        The ranges are determined once and cached until the data is replaced.
+        """
+        if self._field_ranges is None:
+            plan = self.get_typetree_read_plan()
+            self._field_ranges = TypeTreeHelper.get_field_ranges(
+                plan.nodes, self.data or self.get_raw_data(), self.reader.endian, plan
+            )
+        return self._field_ranges
+
+    def set_field_ranges(self, ranges: List[Tuple[int, int, int]]):
+        """Sets the field ranges of the current data, if they are already known."""
+        self._field_ranges = ranges
+
+    def patch_fields(self, values: Dict[str, Any]) -> bytes:
+        """Overwrites fixed-size primitive fields of the object's data in place,
+        without reading and writing the whole typetree.
+
+        values maps the paths of the fields, see get_field_offsets, to their new values.
+        """
+        offsets = self.get_field_offsets()
+        ranges = self._field_ranges
+        data = TypeTreeHelper.patch_fields(
+            self.data or self.get_raw_data(), self.reader.endian, offsets, values
+        )
+        self.set_raw_data(data)
+        # the layout of the data didn't change
+        self._field_offsets = offsets
+        self._field_ranges = ranges
+        return data
@@ -1,15 +1,26 @@
 ﻿from ntpath import basename
+import hashlib
+import io
 import re
 
 from . import File, ObjectReader, BundleFile
 from ..enums import BuildTarget, ClassIDType, CommonString
 from ..streams import EndianBinaryReader, EndianBinaryWriter
-from ..helpers.TypeTreeHelper import TypeTreeNode
+from ..helpers.TypeTreeHelper import TypeTreeNode, TypeTreeReadPlan
+from ..classes.Object import NodeHelper
 
+from array import array
+from collections.abc import MutableMapping
 from struct import Struct
+from typing import Container, Iterator, List, Optional, Tuple
 
 from .. import config
 
+try:
+    from ..UnityPyBoost import read_typetree_legacy as read_typetree_legacy_c
+except ImportError:
+    read_typetree_legacy_c = None
+
 
 class SerializedFileHeader:
     metadata_size: int
@@ -94,6 +105,36 @@ class BuildType:
         return self.build_type == "p"
 
 
+# attributes of the SerializedType that are stored by get_metadata
+METADATA_KEYS = (
+    "class_id",
+    "is_stripped_type",
+    "script_type_index",
+    "script_id",
+    "old_type_hash",
+    "string_data",
+    "m_ClassName",
+    "m_NameSpace",
+    "m_AssemblyName",
+    "type_dependencies",
+)
+# attributes of the TypeTreeNodes that are stored by get_metadata
+NODE_KEYS = (
+    "m_Version",
+    "m_Level",
+    "m_TypeFlags",
+    "m_ByteSize",
+    "m_Index",
+    "m_MetaFlag",
+    "m_Type",
+    "m_Name",
+    "m_TypeStrOffset",
+    "m_NameStrOffset",
+    "m_RefTypeHash",
+    "m_VariableCount",
+)
+
+
 class SerializedType:
     class_id: int
     is_stripped_type: bool
@@ -101,6 +142,7 @@ class SerializedType:
     nodes: list = []  # TypeTreeNode
     script_id: bytes  # Hash128
     old_type_hash: bytes  # Hash128}
+    _read_plan: TypeTreeReadPlan = None
 
     def __init__(self, reader, serialized_file, is_ref_type: bool):
         version = serialized_file.header.version
@@ -123,7 +165,18 @@ class SerializedType:
 
         if serialized_file._enable_type_tree:
             if version >= 12 or version == 10:
-                self.nodes, self.string_data = serialized_file.read_type_tree_blob()
+                # identical types of the environment share their nodes and read plan
+                (
+                    self.nodes,
+                    self.string_data,
+                    self._read_plan,
+                ) = serialized_file.read_shared_type_tree_blob(
+                    tuple(
+                        bytes(getattr(self, key))
+                        for key in ("script_id", "old_type_hash")
+                        if hasattr(self, key)
+                    )
+                )
             else:
                 self.nodes = serialized_file.read_type_tree()
 
@@ -168,6 +221,292 @@ class SerializedType:
                 else:
                     writer.write_int_array(self.type_dependencies)
 
+    @property
+    def read_plan(self) -> TypeTreeReadPlan:
+        """The nodes compiled for the typetree readers, compiled on first use."""
+        if self._read_plan is None or self._read_plan.nodes is not self.nodes:
+            self._read_plan = TypeTreeReadPlan(self.nodes)
+        return self._read_plan
+
+    def get_metadata(self) -> dict:
+        metadata = {
+            key: value for key, value in vars(self).items() if key in METADATA_KEYS
+        }
+        if "nodes" in vars(self):
+            metadata["nodes"] = [
+                tuple(getattr(node, key, None) for key in NODE_KEYS)
+                for node in self.nodes
+            ]
+        return metadata
+
+    @classmethod
+    def from_metadata(cls, metadata: dict) -> "SerializedType":
+        typ = cls.__new__(cls)
+        typ.__dict__.update(metadata)
+        if "nodes" in metadata:
+            typ.nodes = [
+                TypeTreeNode(
+                    **{
+                        key: value
+                        for key, value in zip(NODE_KEYS, node)
+                        if value is not None
+                    }
+                )
+                for node in metadata["nodes"]
+            ]
+        return typ
+
+
+class ObjectInfoTable:
+    """The object info table of a SerializedFile.
+
+    The entries are stored column-wise,
+    each column is an array with one value per object.
+    The ObjectReaders are lightweight views on a row of this table.
+    """
+
+    TYPECODES = {
+        "path_id": "q",
+        "byte_start": "q",
+        "byte_size": "I",
+        "type_id": "i",
+        "class_id": "i",
+        "is_destroyed": "H",
+        "script_type_index": "h",
+        "stripped": "b",
+    }
+
+    fields: tuple
+    stride: int
+    field_offsets: dict
+    index: dict  # path_id -> row
+    offset: int  # real offset of the first entry
+    # columns
+    path_id: array
+    byte_start: array
+    byte_size: array
+    type_id: array
+    class_id: array
+    is_destroyed: array  # version < 11
+    script_type_index: array  # 11 <= version < 17
+    stripped: array  # version 15 & 16
+
+    def __init__(self, serialized_file, reader: EndianBinaryReader, count: int):
+        version = serialized_file.header.version
+        fmt, fields = self.get_format(serialized_file)
+
+        self.fields = tuple(fields)
+        self.field_offsets = {
+            field: Struct(f"<{fmt[:i]}").size for i, field in enumerate(fields)
+        }
+        size = Struct(f"<{fmt}").size
+        self.stride = size
+        if version >= 14:
+            # each entry starts 4-aligned
+            if count:
+                reader.align_stream()
+            self.stride += (4 - self.stride % 4) % 4
+
+        self.offset = reader.real_offset()
+        # the padding of the last entry isn't part of the table
+        data_size = self.stride * count - (self.stride - size) if count else 0
+        data = bytes(reader.read_bytes(data_size)) + b"\0" * (self.stride - size)
+
+        data = data[: self.stride * count]
+
+        # decode column by column to avoid a tuple per entry
+        for i, field in enumerate(fields):
+            offset = self.field_offsets[field]
+            padding = self.stride - offset - Struct(f"<{fmt[i]}").size
+            field_struct = Struct(f"{reader.endian}{offset}x{fmt[i]}{padding}x")
+            column = array(
+                self.TYPECODES[field],
+                (value for (value,) in field_struct.iter_unpack(data)),
+            )
+            setattr(self, field, column)
+
+        if "class_id" not in fields:
+            types = serialized_file.types
+            self.class_id = array(
+                self.TYPECODES["class_id"],
+                (types[type_id].class_id for type_id in self.type_id),
+            )
+
+        self.index = {path_id: i for i, path_id in enumerate(self.path_id)}
+
+    def __len__(self) -> int:
+        return len(self.path_id)
+
+    @staticmethod
+    def get_format(serialized_file) -> Tuple[str, List[str]]:
+        """Returns the struct format and the fields of an entry of the table."""
+        version = serialized_file.header.version
+        fields = ["path_id", "byte_start", "byte_size", "type_id"]
+        if serialized_file.big_id_enabled:
+            fmt = "qIIi"
+        elif version < 14:
+            fmt = "iIIi"
+        else:
+            fmt = "qIIi"
+        if version >= 22:
+            fmt = fmt[0] + "q" + fmt[2:]
+        if version < 16:
+            fmt += "H"
+            fields.append("class_id")
+        if version < 11:
+            fmt += "H"
+            fields.append("is_destroyed")
+        if 11 <= version < 17:
+            fmt += "h"
+            fields.append("script_type_index")
+        if version == 15 or version == 16:
+            fmt += "b"
+            fields.append("stripped")
+        return fmt, fields
+
+    @classmethod
+    def pack(
+        cls, serialized_file, objects: List["ObjectReader"], position: int
+    ) -> Tuple[bytearray, int]:
+        """Packs the entries of the objects into a new table for saving.
+
+        The data of the objects is placed one after another, each aligned to 8.
+        position is the position of the table in the metadata,
+        as the entries are aligned to 4 since version 14.
+        Returns the packed table and the size of the data of the objects.
+        """
+        version = serialized_file.header.version
+        fmt, fields = cls.get_format(serialized_file)
+        entry = Struct(serialized_file.header.endian + fmt)
+        stride = entry.size
+        offset = 0
+        if version >= 14:
+            stride += (4 - stride % 4) % 4
+            if objects:
+                offset = (4 - position % 4) % 4
+        # the padding of the last entry isn't part of the table
+        table = bytearray(
+            offset + stride * len(objects) - (stride - entry.size) if objects else 0
+        )
+
+        getters = {
+            "class_id": lambda obj: obj.class_id,
+            "is_destroyed": lambda obj: obj.is_destroyed,
+            "script_type_index": lambda obj: obj.serialized_type.script_type_index,
+            "stripped": lambda obj: obj.stripped,
+        }
+        getters = [getters[field] for field in fields[4:]]
+        pack_into = entry.pack_into
+        data_size = 0
+        for obj in objects:
+            size = obj.data_size
+            pack_into(
+                table,
+                offset,
+                obj.path_id,
+                data_size,
+                size,
+                obj.type_id,
+                *[get(obj) for get in getters],
+            )
+            offset += stride
+            data_size += size + (8 - size % 8) % 8
+        return table, data_size
+
+    def get_metadata(self, reader: EndianBinaryReader) -> dict:
+        return {
+            "fields": self.fields,
+            "stride": self.stride,
+            "field_offsets": self.field_offsets,
+            # relative to the reader, as the base offset depends on how it's loaded
+            "position": self.offset - reader.BaseOffset,
+            "columns": {
+                field: getattr(self, field).tobytes()
+                for field in self.fields + ("class_id",)
+            },
+        }
+
+    @classmethod
+    def from_metadata(
+        cls, reader: EndianBinaryReader, metadata: dict
+    ) -> "ObjectInfoTable":
+        table = cls.__new__(cls)
+        table.fields = tuple(metadata["fields"])
+        table.stride = metadata["stride"]
+        table.field_offsets = metadata["field_offsets"]
+        table.offset = reader.BaseOffset + metadata["position"]
+        for field, data in metadata["columns"].items():
+            column = array(cls.TYPECODES[field])
+            column.frombytes(data)
+            setattr(table, field, column)
+        table.index = {path_id: i for i, path_id in enumerate(table.path_id)}
+        return table
+
+    def get(self, row: int) -> dict:
+        """Returns the entry of the given row as dict."""
+        return {field: getattr(self, field)[row] for field in self.fields}
+
+    def get_field_offset(self, row: int, field: str) -> int:
+        """Returns the real offset of the field of the given row."""
+        return self.offset + row * self.stride + self.field_offsets[field]
+
+
+class ObjectDict(MutableMapping):
+    """A dict of path_id -> ObjectReader for the objects of a SerializedFile.
+
+    The ObjectReaders are only created on first access.
+    """
+
+    def __init__(self, assets_file: "SerializedFile", table: ObjectInfoTable):
+        self.assets_file = assets_file
+        self.table = table
+        # path_id -> row in the table, None for added objects
+        self._rows = dict(table.index)
+        self._items = {}
+
+    def __getitem__(self, path_id: int) -> "ObjectReader":
+        obj = self._items.get(path_id)
+        if obj is None:
+            row = self._rows[path_id]
+            obj = ObjectReader.ObjectReader(self.assets_file, row)
+            self._items[path_id] = obj
+        return obj
+
+    def __setitem__(self, path_id: int, obj: "ObjectReader"):
+        if path_id not in self._rows:
+            self._rows[path_id] = None
+        self._items[path_id] = obj
+
+    def __delitem__(self, path_id: int):
+        del self._rows[path_id]
+        self._items.pop(path_id, None)
+
+    def __contains__(self, path_id) -> bool:
+        return path_id in self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def filter(self, class_ids: Container[int]) -> Iterator["ObjectReader"]:
+        """Yields the objects of the given class ids.
+
+        The class ids are looked up in the object info table,
+        so only the readers of matching objects are created."""
+        table_class_ids = self.table.class_id
+        for path_id, row in self._rows.items():
+            if row is None:
+                obj = self._items[path_id]
+                if obj.class_id in class_ids:
+                    yield obj
+            elif table_class_ids[row] in class_ids:
+                yield self[path_id]
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}({len(self)} objects)>"
+
 
 class SerializedFile(File.File):
     reader: EndianBinaryReader
@@ -214,6 +553,19 @@ class SerializedFile(File.File):
         # used by: Sprite (Texture2D (with alpha) cached),
         self._cache = {}
         self.unknown = 0
+        # the class ids of the objects that are of interest, None for all
+        self.only_types = getattr(self.environment, "only_types", None)
+        # the AssetBundle and the container are only read on first access
+        self._assetbundle = None
+        self._container = None
+
+        if (
+            self._metadata
+            and self._metadata["parse_typetree"] == config.SERIALIZED_FILE_PARSE_TYPETREE
+        ):
+            # the metadata was parsed before, so it's restored from the cache
+            self.load_metadata(self._metadata)
+            return
 
         # ReadHeader
         header = SerializedFileHeader(reader)
@@ -253,11 +605,12 @@ class SerializedFile(File.File):
             self.big_id_enabled = reader.read_int()
 
         # ReadObjects
+        # the object infos are kept packed, the readers are created on access
         object_count = reader.read_int()
-        self.objects = {}
-        for _ in range(object_count):
-            obj = ObjectReader.ObjectReader(self, reader)
-            self.objects[obj.path_id] = obj
+        self._object_info = ObjectInfoTable(self, reader, object_count)
+        self.objects = ObjectDict(self, self._object_info)
+        if 11 <= header.version < 17:
+            self._apply_script_type_indices()
 
         # Read Scripts
         if header.version >= 11:
@@ -285,18 +638,155 @@ class SerializedFile(File.File):
         if header.version >= 5:
             self.userInformation = reader.read_string_to_null()
 
+    def get_metadata(self) -> dict:
+        header = self.header
+        return {
+            "parse_typetree": config.SERIALIZED_FILE_PARSE_TYPETREE,
+            "header": vars(header),
+            "unity_version": self.unity_version if header.version >= 7 else None,
+            "target_platform": getattr(self, "_m_target_platform", None),
+            "enable_type_tree": self._enable_type_tree,
+            "big_id_enabled": self.big_id_enabled,
+            "unknown": self.unknown,
+            "types": [typ.get_metadata() for typ in self.types],
+            "ref_types": [typ.get_metadata() for typ in getattr(self, "ref_types", [])],
+            "objects": self._object_info.get_metadata(self.reader),
+            "script_types": [vars(script_type) for script_type in self.script_types],
+            "externals": [vars(external) for external in self.externals],
+            "user_information": getattr(self, "userInformation", None),
+            # only stored if it was already read,
+            # as reading it requires the parsing of the AssetBundle
+            "container": None
+            if self._container is None
+            else [
+                (
+                    key,
+                    getattr(value, "preloadIndex", 0),
+                    getattr(value, "preloadSize", 0),
+                    value.asset.file_id,
+                    value.asset.path_id,
+                )
+                for key, value in self._container.container
+            ],
+        }
+
+    def load_metadata(self, metadata: dict):
+        """Restores the state after the parsing of the metadata
+        from the data returned by get_metadata."""
+        self.header = header = SerializedFileHeader.__new__(SerializedFileHeader)
+        header.__dict__.update(metadata["header"])
+        self.reader.endian = header.endian
+
+        if metadata["unity_version"] is not None:
+            self.set_version(metadata["unity_version"])
+        if metadata["target_platform"] is not None:
+            self._m_target_platform = metadata["target_platform"]
+            self.target_platform = BuildTarget(self._m_target_platform)
+        self._enable_type_tree = metadata["enable_type_tree"]
+        self.big_id_enabled = metadata["big_id_enabled"]
+        self.unknown = metadata["unknown"]
+
+        self.types = [SerializedType.from_metadata(typ) for typ in metadata["types"]]
+        if header.version >= 20:
+            self.ref_types = [
+                SerializedType.from_metadata(typ) for typ in metadata["ref_types"]
+            ]
+
+        self._object_info = ObjectInfoTable.from_metadata(
+            self.reader, metadata["objects"]
+        )
+        self.objects = ObjectDict(self, self._object_info)
+
+        self.script_types = []
+        for values in metadata["script_types"]:
+            script_type = LocalSerializedObjectIdentifier.__new__(
+                LocalSerializedObjectIdentifier
+            )
+            script_type.__dict__.update(values)
+            self.script_types.append(script_type)
+
+        self.externals = []
+        for values in metadata["externals"]:
+            external = FileIdentifier.__new__(FileIdentifier)
+            external.__dict__.update(values)
+            self.externals.append(external)
+
+        if metadata["user_information"] is not None:
+            self.userInformation = metadata["user_information"]
+
+        if metadata["container"] is not None:
+            self._container = ContainerHelper(
+                [
+                    (
+                        key,
+                        NodeHelper(
+                            {
+                                "preloadIndex": preload_index,
+                                "preloadSize": preload_size,
+                                "asset": {"m_FileID": file_id, "m_PathID": path_id},
+                            },
+                            self,
+                        ),
+                    )
+                    for key, preload_index, preload_size, file_id, path_id in metadata[
+                        "container"
+                    ]
+                ]
+            )
+
+    def _apply_script_type_indices(self):
+        # the script type index of the object is stored in its type
+        table = self._object_info
+        for type_id, script_type_index in zip(table.type_id, table.script_type_index):
+            typ = self.get_serialized_type(type_id)
+            if typ:
+                typ.script_type_index = script_type_index
+
+    def get_serialized_type(self, type_id: int) -> SerializedType:
+        """Returns the SerializedType of the given object type id."""
+        if self.header.version >= 16:
+            return self.types[type_id]
+        for typ in self.types:
+            if typ.class_id == type_id:
+                return typ
+        return None
+
+    def get_objects(self) -> Iterator[ObjectReader.ObjectReader]:
+        """Yields the objects of the file.
+        If the Environment was loaded with only_types,
+        only the objects of these types are yielded
+        and the readers of the other objects aren't created."""
+        if self.only_types is None:
+            yield from self.objects.values()
+        else:
+            yield from self.objects.filter(self.only_types)
+
+    def get_filtered_objects(self, obj_types=[]):
+        if len(obj_types) == 0:
+            yield from self.get_objects()
+        else:
+            yield from self.objects.filter({int(obj_type) for obj_type in obj_types})
+
+    def _read_container(self):
         # read the asset_bundles to get the containers
-        for obj in self.objects.values():
-            if obj.type == ClassIDType.AssetBundle:
-                self.assetbundle = obj.read_typetree(wrap=True)
-                self._container = ContainerHelper(self.assetbundle.m_Container)
-                break
+        for obj in self.objects.filter({ClassIDType.AssetBundle}):
+            self._assetbundle = obj.read_typetree(wrap=True)
+            self._container = ContainerHelper(self._assetbundle.m_Container)
+            break
         else:
-            self.assetbundle = None
             self._container = ContainerHelper({})
 
+    @property
+    def assetbundle(self):
+        # the container might be restored from the cache without the AssetBundle
+        if self._assetbundle is None:
+            self._read_container()
+        return self._assetbundle
+
     @property
     def container(self):
+        if self._container is None:
+            self._read_container()
         return self._container
 
     def load_dependencies(self, possible_dependencies: list = []):
@@ -331,6 +821,9 @@ class SerializedFile(File.File):
         self.version = tuple(int(x) for x in version_split[:4])
 
     def read_type_tree(self):
+        if read_typetree_legacy_c:
+            return self.read_type_tree_c()
+
         type_tree = []
         level_stack = [[0, 1]]
         while level_stack:
@@ -364,7 +857,41 @@ class SerializedFile(File.File):
                 level_stack.append([level + 1, children_count])
         return type_tree
 
+    def read_type_tree_c(self):
+        # the size of the typetree isn't known beforehand,
+        # so the data is read in growing chunks until it contains the whole typetree
+        reader = self.reader
+        start = reader.Position
+        chunk_size = 0x10000
+        while True:
+            reader.Position = start
+            data = reader.read(chunk_size)
+            result = read_typetree_legacy_c(data, reader.endian, self.header.version)
+            if result is not None:
+                break
+            if len(data) < chunk_size:
+                raise ValueError("The typetree ends after the end of the file")
+            chunk_size *= 4
+        type_tree, size = result
+        reader.Position = start + size
+        return type_tree
+
     def read_type_tree_blob(self):
+        nodes, string_data, _ = self.read_shared_type_tree_blob()
+        return nodes, string_data
+
+    def read_shared_type_tree_blob(
+        self, type_hash: tuple = None
+    ) -> Tuple[List[TypeTreeNode], bytes, Optional[TypeTreeReadPlan]]:
+        """Reads a typetree blob via the type registry of the environment.
+
+        The blobs are keyed by the type hash and a hash of their content,
+        so identical types are only parsed once per environment
+        and share their nodes, string data and read plan.
+
+        Returns the nodes, the string data and the shared read plan,
+        the plan is None if the blob isn't shared.
+        """
         reader = self.reader
         number_of_nodes = self.reader.read_int()
         string_buffer_size = self.reader.read_int()
@@ -386,13 +913,22 @@ class SerializedFile(File.File):
 
         node_struct = Struct(type)
         struct_data = reader.read(node_struct.size * number_of_nodes)
-        string_buffer_reader = EndianBinaryReader(
-            reader.read(string_buffer_size), reader.endian
-        )
+        string_data = reader.read(string_buffer_size)
 
         if not config.SERIALIZED_FILE_PARSE_TYPETREE:
-            return [], string_buffer_reader.bytes
-
+            return [], string_data, None
+
+        registry = getattr(self.environment, "type_registry", None)
+        if registry is not None:
+            content_hash = hashlib.blake2b(struct_data, digest_size=16)
+            content_hash.update(string_data)
+            key = (type_hash, type, content_hash.digest())
+            shared = registry.get(key)
+            if shared is not None:
+                plan, string_data = shared
+                return plan.nodes, string_data, plan
+
+        string_buffer_reader = EndianBinaryReader(string_data, reader.endian)
         type_tree = [
             TypeTreeNode(
                 **dict(zip(keys, raw_node)),
@@ -402,7 +938,13 @@ class SerializedFile(File.File):
             for i, raw_node in enumerate(node_struct.iter_unpack(struct_data))
         ]
 
-        return type_tree, string_buffer_reader.bytes
+        if registry is None or not type_tree:
+            return type_tree, string_data, None
+        plan = TypeTreeReadPlan(type_tree)
+        # copied, as the data might be a view on the file
+        string_data = bytes(string_data)
+        registry[key] = (plan, string_data)
+        return type_tree, string_data, plan
 
     def get_writeable_cab(self, name: str = "CAB-UnityPy_Mod.resS"):
         """
@@ -434,13 +976,34 @@ class SerializedFile(File.File):
         return cab
 
     def save(self, packer: str = None) -> bytes:
-        # 1. header -> has to be delayed until the very end
+        # the parts are joined into one buffer of the final size
+        return b"".join(self.iter_save_parts())
+
+    def save_to(self, stream: io.IOBase, packer: str = None) -> int:
+        """Writes the SerializedFile into the stream, e.g. an opened file.
+
+        The layout of the data is calculated from the sizes of the objects,
+        so that their data can be written one after another without collecting it first.
+        Returns the size of the written file.
+        """
+        size = 0
+        for part in self.iter_save_parts():
+            stream.write(part)
+            size += len(part)
+        return size
+
+    def iter_save_parts(self) -> Iterator[bytes]:
+        """Yields the parts of the saved SerializedFile in order.
+
+        The data of unchanged objects is yielded as memoryview of the loaded data
+        if the file is in memory, so it's not copied until it's written.
+        """
+        # 1. header -> has to be delayed until the metadata is written
         # 2. data -> types, objects, scripts, ...
 
-        # so write the data first
+        # so write the metadata first
         header = self.header
         meta_writer = EndianBinaryWriter(endian=header.endian)
-        data_writer = EndianBinaryWriter(endian=header.endian)
 
         if header.version >= 7:
             meta_writer.write_string_to_null(self.unity_version)
@@ -460,10 +1023,10 @@ class SerializedFile(File.File):
             meta_writer.write_int(self.big_id_enabled)
 
         # ReadObjects
-        meta_writer.write_int(len(self.objects))
-        for obj in self.objects.values():
-            obj.write(header, meta_writer, data_writer)
-            data_writer.align_stream(8)
+        objects = list(self.objects.values())
+        meta_writer.write_int(len(objects))
+        object_info, data_size = ObjectInfoTable.pack(self, objects, meta_writer.Position)
+        meta_writer.write(object_info)
 
         # Read Scripts
         if header.version >= 11:
@@ -484,11 +1047,19 @@ class SerializedFile(File.File):
         if header.version >= 5:
             meta_writer.write_string_to_null(self.userInformation)
 
+        def iter_data():
+            # the data of the objects is aligned to 8
+            padding = memoryview(bytes(8))
+            for obj in objects:
+                data = obj.get_data()
+                yield data
+                if len(data) % 8:
+                    yield padding[len(data) % 8 :]
+
         # prepare header
         writer = EndianBinaryWriter()
         header_size = 16  # 4*4
         metadata_size = meta_writer.Length
-        data_size = data_writer.Length
         if header.version >= 9:
             # 1 bool + 3 reserved + extra header 4 + 3*8
             header_size += 4 if header.version < 22 else 4 + 28
@@ -520,7 +1091,8 @@ class SerializedFile(File.File):
 
             writer.write_bytes(meta_writer.bytes)
             writer.align_stream(16)
-            writer.write_bytes(data_writer.bytes)
+            yield writer.bytes
+            yield from iter_data()
 
         else:
             metadata_size += 1  # endian boolean
@@ -531,11 +1103,12 @@ class SerializedFile(File.File):
             # reader.Position = header.file_size - header.metadata_size
             # so data follows right after this header -> after 32
             writer.write_u_int(32)
-            writer.write_bytes(data_writer.bytes)
+            yield writer.bytes
+            yield from iter_data()
+            writer = EndianBinaryWriter()
             writer.write_boolean(">" == header.endian)
             writer.write_bytes(meta_writer.bytes)
-
-        return writer.bytes
+            yield writer.bytes
 
     def save_serialized_type(
         self,
@@ -39,6 +39,25 @@ def decompress_lzma(data: bytes) -> bytes:
     return dec.decompress(data[5:])
 
 
+# the properties header of the lzma data written by compress_lzma
+LZMA_PROPERTIES: bytes = b"]\x00\x00\x08\x00"
+
+
+def create_lzma_compressor() -> lzma.LZMACompressor:
+    """creates the lzma compressor used by compress_lzma,
+    so that data can be compressed incrementally
+
+    :return: the compressor, its output has to be prefixed with LZMA_PROPERTIES
+    :rtype: lzma.LZMACompressor
+    """
+    return lzma.LZMACompressor(
+        format=lzma.FORMAT_RAW,
+        filters=[
+            {"id": lzma.FILTER_LZMA1, "dict_size": 524288, "lc": 3, "lp": 0, "pb": 2, }
+        ],
+    )
+
+
 def compress_lzma(data: bytes) -> bytes:
     """compresses data via lzma (unity specific)
     The current static settings may not be the best solution,
@@ -49,14 +68,8 @@ def compress_lzma(data: bytes) -> bytes:
     :return: compressed data
     :rtype: bytes
     """
-    ec = lzma.LZMACompressor(
-        format=lzma.FORMAT_RAW,
-        filters=[
-            {"id": lzma.FILTER_LZMA1, "dict_size": 524288, "lc": 3, "lp": 0, "pb": 2, }
-        ],
-    )
-    ec.compress(data)
-    return b"]\x00\x00\x08\x00" + ec.flush()
+    ec = create_lzma_compressor()
+    return LZMA_PROPERTIES + ec.compress(data) + ec.flush()
 
 
 # LZ4
@@ -1,4 +1,6 @@
 from __future__ import annotations
+import io
+import mmap
 import os
 from typing import Union, List
 from .CompressionHelper import BROTLI_MAGIC, GZIP_MAGIC
@@ -41,6 +43,30 @@ def find_all_files(directory: str, search_str: str) -> List[str]:
     ]
 
 
+def open_mmap(path: str) -> Union[mmap.mmap, io.BufferedReader]:
+    """Memory-maps the given local file as read-only.
+
+    Parameters
+    ----------
+    path : str
+        Path of the local file.
+
+    Returns
+    -------
+    mmap | BufferedReader
+        The memory-mapped file,
+        or the opened file if it can't be memory-mapped (e.g. empty files).
+    """
+    f = open(path, "rb")
+    try:
+        m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        return f
+    # the mapping stays valid after closing the file
+    f.close()
+    return m
+
+
 def check_file_type(input_) -> Union[FileType, EndianBinaryReader]:
     if isinstance(input_, str) and os.path.isfile(input_):
         reader = EndianBinaryReader(open(input_, "rb"))
@@ -128,17 +154,24 @@ def parse_file(
     name: str,
     typ: FileType = None,
     is_dependency=False,
+    metadata: dict = None,
 ) -> Union[files.File, EndianBinaryReader]:
     if typ is None:
         typ, _ = check_file_type(reader)
     if typ == FileType.AssetsFile and not name.endswith(
         (".resS", ".resource", ".config", ".xml", ".dat")
     ):
-        f = files.SerializedFile(reader, parent, name=name, is_dependency=is_dependency)
+        f = files.SerializedFile(
+            reader, parent, name=name, is_dependency=is_dependency, metadata=metadata
+        )
     elif typ == FileType.BundleFile:
-        f = files.BundleFile(reader, parent, name=name, is_dependency=is_dependency)
+        f = files.BundleFile(
+            reader, parent, name=name, is_dependency=is_dependency, metadata=metadata
+        )
     elif typ == FileType.WebFile:
-        f = files.WebFile(reader, parent, name=name, is_dependency=is_dependency)
+        f = files.WebFile(
+            reader, parent, name=name, is_dependency=is_dependency, metadata=metadata
+        )
     else:
         f = reader
     return f
@@ -0,0 +1,132 @@
+import marshal
+import os
+import sqlite3
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Union
+
+# bump if the layout of the stored metadata changes
+CACHE_VERSION = 1
+
+
+def get_file_stamp(path: str) -> str:
+    """Returns a stamp of the size and modification time of the given file."""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class MarshalStore:
+    """A table of a SQLite database that stores values serialized via marshal.
+
+    Each value is stored with a stamp, e.g. the one of the file it was generated from,
+    and is only returned while the stamp and the version still match.
+    A connection to the database is only opened for each operation,
+    so the store doesn't have to be closed.
+    """
+
+    path: str
+    table: str
+    version: int
+
+    def __init__(self, path: str, table: str, version: int = 1):
+        """
+        Parameters
+        ----------
+        path : str
+            Path of the SQLite database, it's created if it doesn't exist.
+        table : str
+            Name of the table, it's created if it doesn't exist.
+        version : int
+            Version of the layout of the stored values,
+            values stored with another version are ignored.
+        """
+        self.path = path
+        self.table = table
+        self.version = version
+        self._lock = Lock()
+        with self.connect() as connection:
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, stamp TEXT, data BLOB)"
+            )
+
+    @contextmanager
+    def connect(self):
+        """Opens a connection to the database, which is committed and closed on exit."""
+        with self._lock:
+            connection = sqlite3.connect(self.path)
+            try:
+                with connection:
+                    yield connection
+            finally:
+                connection.close()
+
+    def get(self, key: str, stamp: str) -> Any:
+        """Returns the stored value of the key,
+        or None if there is no valid entry for it."""
+        with self.connect() as connection:
+            row = connection.execute(
+                f"SELECT stamp, data FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[0] != stamp:
+            return None
+        try:
+            data = marshal.loads(row[1])
+        except (EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(data, tuple) or len(data) != 2 or data[0] != self.version:
+            return None
+        return data[1]
+
+    def set(self, key: str, stamp: str, value: Any):
+        """Stores the value of the key, it may only consist of builtin types."""
+        data = marshal.dumps((self.version, value))
+        with self.connect() as connection:
+            connection.execute(
+                f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?)",
+                (key, stamp, data),
+            )
+
+    def clear(self):
+        """Removes all entries."""
+        with self.connect() as connection:
+            connection.execute(f"DELETE FROM {self.table}")
+
+
+class MetadataCache:
+    """A persistent cache of the parsed metadata of local files.
+
+    The metadata of a file is stored in a SQLite database,
+    keyed by the absolute path of the file.
+    An entry is only used if the size and modification time of the file
+    still match the ones at the time it was stored.
+
+    The stored metadata only consists of builtin types and is serialized via marshal.
+    """
+
+    path: str
+    store: MarshalStore
+
+    def __init__(self, path: str):
+        """
+        Parameters
+        ----------
+        path : str
+            Path of the SQLite database, it's created if it doesn't exist.
+        """
+        self.path = path
+        self.store = MarshalStore(path, "metadata", CACHE_VERSION)
+
+    def get(self, path: str) -> Union[dict, None]:
+        """Returns the stored metadata of the given file,
+        or None if there is no valid entry for it."""
+        metadata = self.store.get(os.path.abspath(path), get_file_stamp(path))
+        return metadata if isinstance(metadata, dict) else None
+
+    def set(self, path: str, metadata: dict):
+        """Stores the metadata of the given file."""
+        self.store.set(os.path.abspath(path), get_file_stamp(path), metadata)
+
+    def clear(self):
+        """Removes all entries."""
+        self.store.clear()
@@ -1,5 +1,6 @@
 import ntpath
 from ..streams import EndianBinaryReader
+from ..streams.EndianBinaryReader import EndianBinaryReader_Memoryview
 from ..files import File
 
 
@@ -47,5 +48,9 @@ def get_resource_data(*args):
     else:
         raise TypeError(f"3 or 4 arguments required, but only {len(args)} given")
 
+    if isinstance(reader, EndianBinaryReader_Memoryview):
+        # zero-copy slice, without touching the position of the shared reader
+        return reader.view[offset : offset + size]
+
     reader.Position = offset
     return reader.read_bytes(size)
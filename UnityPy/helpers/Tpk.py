@@ -2,64 +2,165 @@ from __future__ import annotations
 from enum import IntEnum, IntFlag
 from struct import Struct
 from io import BytesIO
-from typing import List, Tuple, Any, Dict
-from .TypeTreeHelper import TypeTreeNode
-
+from threading import Lock
+from typing import List, Tuple, Any, Dict, Optional
+import os
+from .MetadataCache import MarshalStore, get_file_stamp
+from .TypeTreeHelper import TypeTreeNode, TypeTreeReadPlan
+from .. import config
+
+TPK_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "resources", "uncompressed.tpk"
+)
 TPKTYPETREE: TpkTypeTreeBlob = None
+TPK_LOCK = Lock()
 NODES_CACHE: dict = {}
+READ_PLAN_CACHE: dict = {}
+# the attributes of the TypeTreeNodes stored in the TpkNodesCache
+NODE_KEYS = ("m_ByteSize", "m_Index", "m_Version", "m_MetaFlag", "m_Level", "m_Type", "m_Name")
 
 
 def init():
-    import os
-
-    with open(
-        os.path.join(os.path.dirname(os.path.dirname(__file__)), "resources", "uncompressed.tpk"), "rb"
-    ) as f:
+    with open(TPK_PATH, "rb") as f:
         global TPKTYPETREE
         TPKTYPETREE = TpkFile(f).GetDataBlob()
 
 
+def get_tpk_typetree() -> TpkTypeTreeBlob:
+    """Returns the typetree database of the tpk, it's loaded on first use."""
+    if TPKTYPETREE is None:
+        with TPK_LOCK:
+            if TPKTYPETREE is None:
+                init()
+    return TPKTYPETREE
+
+
 def get_typetree_nodes(class_id: int, version: tuple):
     global NODES_CACHE
     key = (class_id, version)
     if key in NODES_CACHE:
         return NODES_CACHE[key]
 
-    class_info = TPKTYPETREE.ClassInformation[class_id].getVersionedClass(
-        UnityVersion.fromList(*version)
-    )
-    if class_info is None:
-        raise ValueError("Could not find class info for class id {}".format(class_id))
+    nodes_cache = get_nodes_cache()
+    nodes = nodes_cache.get(class_id, version) if nodes_cache else None
+    if nodes is None:
+        tpk_typetree = get_tpk_typetree()
+        class_info = tpk_typetree.ClassInformation[class_id].getVersionedClass(
+            UnityVersion.fromList(*version)
+        )
+        if class_info is None:
+            raise ValueError("Could not find class info for class id {}".format(class_id))
+
+        nodes = generate_flat_nodes(class_info, tpk_typetree)
+        if nodes_cache:
+            nodes_cache.set(class_id, version, nodes)
 
-    nodes = generate_flat_nodes(class_info)
     NODES_CACHE[key] = nodes
     return nodes
 
 
-def generate_flat_nodes(class_info: TpkUnityClass) -> List[TypeTreeNode]:
+def get_typetree_read_plan(class_id: int, version: tuple) -> TypeTreeReadPlan:
+    key = (class_id, version)
+    if key not in READ_PLAN_CACHE:
+        READ_PLAN_CACHE[key] = TypeTreeReadPlan(get_typetree_nodes(class_id, version))
+    return READ_PLAN_CACHE[key]
+
+
+def generate_flat_nodes(
+    class_info: TpkUnityClass, tpk_typetree: TpkTypeTreeBlob = None
+) -> List[TypeTreeNode]:
+    if tpk_typetree is None:
+        tpk_typetree = get_tpk_typetree()
     nodes = []
-    NODES = TPKTYPETREE.NodeBuffer.Nodes
+    NODES = tpk_typetree.NodeBuffer.Nodes
+    STRINGS = tpk_typetree.StringBuffer.Strings
+    # depth-first, the sub-nodes are pushed in reverse so that the first one is popped next
     stack = [(class_info.ReleaseRootNode, 0)]
-    index = 0
     while stack:
-        node_id, level = stack.pop(0)
+        node_id, level = stack.pop()
         node: TpkUnityNode = NODES[node_id]
         nodes.append(
             TypeTreeNode(
                 m_ByteSize=node.ByteSize,
-                m_Index=index,
+                m_Index=len(nodes),
                 m_Version=node.Version,
                 m_MetaFlag=node.MetaFlag,
                 m_Level=level,
-                m_Type=TPKTYPETREE.StringBuffer.Strings[node.TypeName],
-                m_Name=TPKTYPETREE.StringBuffer.Strings[node.Name],
+                m_Type=STRINGS[node.TypeName],
+                m_Name=STRINGS[node.Name],
             )
         )
-        stack = [(node_id, level + 1) for node_id in node.SubNodes] + stack
-        index += 1
+        stack.extend((sub_node, level + 1) for sub_node in reversed(node.SubNodes))
     return nodes
 
 
+######################################################################################
+#
+#   Node Cache
+#
+######################################################################################
+
+
+class TpkNodesCache:
+    """A persistent cache of the flattened node lists of the tpk.
+
+    The node lists are stored in a SQLite database, keyed by (class_id, version),
+    so that processes which only need a few types don't have to parse the whole tpk.
+    The entries are only used if the size and modification time of the tpk
+    still match the ones at the time they were stored.
+    """
+
+    path: str
+    store: MarshalStore
+
+    def __init__(self, path: str):
+        """
+        Parameters
+        ----------
+        path : str
+            Path of the SQLite database, it's created if it doesn't exist.
+        """
+        self.path = path
+        self.tpk_stamp = get_file_stamp(TPK_PATH)
+        self.store = MarshalStore(path, "tpk_nodes")
+
+    def get(self, class_id: int, version: tuple) -> Optional[List[TypeTreeNode]]:
+        """Returns the stored nodes of the class,
+        or None if there is no valid entry for it."""
+        data = self.store.get(self.get_key(class_id, version), self.tpk_stamp)
+        if data is None:
+            return None
+        return [TypeTreeNode(**dict(zip(NODE_KEYS, node))) for node in data]
+
+    def set(self, class_id: int, version: tuple, nodes: List[TypeTreeNode]):
+        """Stores the nodes of the class."""
+        self.store.set(
+            self.get_key(class_id, version),
+            self.tpk_stamp,
+            [tuple(getattr(node, key) for key in NODE_KEYS) for node in nodes],
+        )
+
+    @staticmethod
+    def get_key(class_id: int, version: tuple) -> str:
+        return f"{class_id}:{'.'.join(map(str, version))}"
+
+
+NODES_DB: TpkNodesCache = None
+
+
+def get_nodes_cache() -> Optional[TpkNodesCache]:
+    """Returns the node cache at config.TPK_NODES_CACHE_PATH, None if it's disabled."""
+    global NODES_DB
+    path = config.TPK_NODES_CACHE_PATH
+    if not path:
+        return None
+    if NODES_DB is None or NODES_DB.path != path:
+        with TPK_LOCK:
+            if NODES_DB is None or NODES_DB.path != path:
+                NODES_DB = TpkNodesCache(path)
+    return NODES_DB
+
+
 ######################################################################################
 #
 #   Enums
@@ -506,6 +607,3 @@ def get_item_for_version(
     if ret:
         return ret
     raise ValueError("Could not find exact version")
-
-
-init()
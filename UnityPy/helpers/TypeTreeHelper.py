@@ -1,6 +1,9 @@
-﻿from typing import Any, Dict, List, Union, Iterable, Tuple
+﻿from typing import Any, Callable, Dict, List, Optional, Union, Iterable, Sequence, Tuple
 from ..streams import EndianBinaryReader, EndianBinaryWriter
+from array import array
 from ctypes import c_uint32
+from struct import pack_into
+import sys
 import tabulate
 from ..exceptions import TypeTreeError as TypeTreeError
 
@@ -51,9 +54,23 @@ class TypeTreeNode(object):
 
 
 try:
-    from ..UnityPyBoost import TypeTreeNode, read_typetree as read_typetree_c
+    from ..UnityPyBoost import (
+        TypeTreeNode,
+        compile_typetree as compile_typetree_c,
+        read_typetree as read_typetree_c,
+        read_typetree_str as read_typetree_str_c,
+        write_typetree as write_typetree_c,
+    )
 except:
+    compile_typetree_c = None
     read_typetree_c = None
+    read_typetree_str_c = None
+    write_typetree_c = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 def node_dict_to_node_cls(nodes: List[dict]) -> List[TypeTreeNode]:
@@ -131,8 +148,297 @@ def get_nodes(nodes: List[TypeTreeNode], index: int) -> list:
     return nodes[index:]
 
 
+# opcodes of the compiled node list,
+# the primitive ones are the indices of their read functions
+(
+    OP_SINT8,
+    OP_UINT8,
+    OP_SINT16,
+    OP_UINT16,
+    OP_SINT32,
+    OP_UINT32,
+    OP_SINT64,
+    OP_UINT64,
+    OP_FLOAT,
+    OP_DOUBLE,
+    OP_BOOL,
+    OP_STRING,
+    OP_TYPELESSDATA,
+    OP_VECTOR,
+    OP_MAP,
+    OP_CLASS,
+) = range(16)
+
+OPCODES = {
+    "SInt8": OP_SINT8,
+    "UInt8": OP_UINT8,
+    "char": OP_UINT8,
+    "short": OP_SINT16,
+    "SInt16": OP_SINT16,
+    "UInt16": OP_UINT16,
+    "unsigned short": OP_UINT16,
+    "int": OP_SINT32,
+    "SInt32": OP_SINT32,
+    "UInt32": OP_UINT32,
+    "unsigned int": OP_UINT32,
+    "Type*": OP_UINT32,
+    "long long": OP_SINT64,
+    "SInt64": OP_SINT64,
+    "UInt64": OP_UINT64,
+    "unsigned long long": OP_UINT64,
+    "FileSize": OP_UINT64,
+    "float": OP_FLOAT,
+    "double": OP_DOUBLE,
+    "bool": OP_BOOL,
+    "string": OP_STRING,
+    "TypelessData": OP_TYPELESSDATA,
+    "map": OP_MAP,
+}
+
+# reader functions of the primitive opcodes
+READ_FUNCTIONS = (
+    "read_byte",
+    "read_u_byte",
+    "read_short",
+    "read_u_short",
+    "read_int",
+    "read_u_int",
+    "read_long",
+    "read_u_long",
+    "read_float",
+    "read_double",
+    "read_boolean",
+    "read_aligned_string",
+    "read_byte_array",
+)
+
+# byte sizes of the fixed-size primitive opcodes
+PRIMITIVE_SIZES = (1, 1, 2, 2, 4, 4, 8, 8, 4, 8, 1)
+# array typecodes of the fixed-size primitive opcodes
+ARRAY_TYPECODES = ("b", "B", "h", "H", "i", "I", "q", "Q", "f", "d", "?")
+
+
+def compile_nodes(nodes: List[TypeTreeNode]) -> List[Tuple[int, str, bool, int]]:
+    """Compiles the node list into a flat program for read_program_value.
+
+    Each node is compiled into an (opcode, name, align, end) instruction,
+    whereby end is the index after the last sub-node of the node.
+    So the sub-nodes don't have to be searched and copied on every read.
+
+    Parameters
+    ----------
+    nodes : list
+        List of nodes/nodes
+
+    Returns
+    -------
+    list
+        The instructions, one per node
+    """
+    count = len(nodes)
+    ends = [count] * count
+    # nodes whose sub-nodes aren't closed yet
+    stack = []
+    for i, node in enumerate(nodes):
+        while stack and nodes[stack[-1]].m_Level >= node.m_Level:
+            ends[stack.pop()] = i
+        stack.append(i)
+
+    program = []
+    for i, node in enumerate(nodes):
+        op = OPCODES.get(node.m_Type)
+        align = (node.m_MetaFlag & kAlignBytes) != 0
+        if op == OP_MAP or (
+            op is None and i < count - 1 and nodes[i + 1].m_Type == "Array"
+        ):
+            if op is None:
+                op = OP_VECTOR
+            if (nodes[i + 1].m_MetaFlag & kAlignBytes) != 0:
+                align = True
+        elif op is None:
+            op = OP_CLASS
+        program.append((op, node.m_Name, align, ends[i]))
+    return program
+
+
+def compile_sizes(program: List[Tuple[int, str, bool, int]]) -> List[int]:
+    """Determines the byte size of the instructions with a fixed size,
+    so that they can be skipped without reading them.
+
+    The size excludes the alignment of the instruction itself,
+    sub-instructions with an alignment make the size variable.
+
+    Parameters
+    ----------
+    program : list
+        The compiled nodes
+
+    Returns
+    -------
+    list
+        The size of each instruction, -1 if it isn't fixed
+    """
+    sizes = [-1] * len(program)
+    for i in range(len(program) - 1, -1, -1):
+        op, _, _, end = program[i]
+        if op < OP_STRING:
+            sizes[i] = PRIMITIVE_SIZES[op]
+        elif op == OP_CLASS:
+            size = 0
+            j = i + 1
+            while j < end:
+                if sizes[j] < 0 or program[j][2]:
+                    size = -1
+                    break
+                size += sizes[j]
+                j = program[j][3]
+            sizes[i] = size
+    return sizes
+
+
+def parse_fields(fields: Iterable[str]) -> dict:
+    """Parses the field paths of a projected read into a tree.
+
+    Parameters
+    ----------
+    fields : Iterable[str]
+        The paths of the fields, with nested fields separated by dots,
+        e.g. ["m_Name", "m_Script", "data.items"]
+
+    Returns
+    -------
+    dict
+        name -> dict of the nested fields, or None if the whole field is requested
+    """
+    tree = {}
+    for field in fields:
+        node = tree
+        *parents, name = field.split(".")
+        for parent in parents:
+            sub = node.setdefault(parent, {})
+            if sub is None:
+                # the whole parent is already requested
+                break
+            node = sub
+        else:
+            node[name] = None
+    return tree
+
+
+class TypeTreeReadPlan:
+    """The node list of a typetree compiled for the readers.
+
+    The plans are cached by the owners of the node lists,
+    e.g. SerializedType.read_plan, so that the compilation is only done once per type.
+    """
+
+    __slots__ = ("nodes", "_program", "_sizes", "_program_c", "node_factories")
+    nodes: List[TypeTreeNode]
+    # set by classes.Object.get_node_factories
+    node_factories: Optional[tuple]
+
+    def __init__(self, nodes: List[Union[dict, TypeTreeNode]]):
+        self.nodes = check_nodes(nodes)
+        self._program = None
+        self._sizes = None
+        self._program_c = None
+        self.node_factories = None
+
+    @property
+    def program(self) -> List[Tuple[int, str, bool, int]]:
+        if self._program is None:
+            self._program = compile_nodes(self.nodes)
+        return self._program
+
+    @property
+    def sizes(self) -> List[int]:
+        if self._sizes is None:
+            self._sizes = compile_sizes(self.program)
+        return self._sizes
+
+    @property
+    def program_c(self):
+        if self._program_c is None:
+            self._program_c = compile_typetree_c(self.nodes)
+        return self._program_c
+
+
+def get_array_converter(endian: str) -> Callable[[bytes, int], Any]:
+    """Returns a function that converts the data of a primitive vector
+    into a NumPy array, or a typed memoryview if NumPy isn't available.
+
+    The result is a read-only view on the data if its endianness is the native one,
+    otherwise a byteswapped copy.
+    The view is read-only, as the data may be shared with other objects.
+
+    Parameters
+    ----------
+    endian : str
+        The endianness of the data, "<" or ">"
+
+    Returns
+    -------
+    Callable[[bytes, int], Any]
+        (data, opcode of the elements) -> array
+    """
+    swap = (endian == "<") != (sys.byteorder == "little")
+
+    def convert(data: bytes, op: int):
+        code = ARRAY_TYPECODES[op]
+        data = memoryview(data).toreadonly()
+        if np is not None:
+            values = np.frombuffer(data, dtype=np.dtype(code).newbyteorder(endian))
+            return values.astype(values.dtype.newbyteorder("=")) if swap else values
+        if swap and PRIMITIVE_SIZES[op] > 1:
+            values = array(code)
+            values.frombytes(data)
+            values.byteswap()
+            return memoryview(values)
+        return memoryview(data).cast(code)
+
+    return convert
+
+
+def pack_array(value: Any, node: TypeTreeNode, endian: str) -> Optional[bytes]:
+    """Packs a NumPy array or typed memoryview of a primitive vector at once.
+
+    Parameters
+    ----------
+    value : Any
+        The elements of the vector
+    node : TypeTreeNode
+        The node of the elements
+    endian : str
+        The endianness of the data, "<" or ">"
+
+    Returns
+    -------
+    Optional[bytes]
+        The packed elements, or None if they have to be written one by one
+    """
+    op = OPCODES.get(node.m_Type)
+    if op is None or op > OP_BOOL or (node.m_MetaFlag & kAlignBytes) != 0:
+        return None
+    code = ARRAY_TYPECODES[op]
+    if np is not None and isinstance(value, np.ndarray):
+        return value.astype(np.dtype(code).newbyteorder(endian), copy=False).tobytes()
+    if not isinstance(value, memoryview) or value.format != code:
+        return None
+    if PRIMITIVE_SIZES[op] > 1 and (endian == "<") != (sys.byteorder == "little"):
+        values = array(code, value.tobytes())
+        values.byteswap()
+        return values.tobytes()
+    return value.tobytes()
+
+
 def read_typetree(
-    nodes: List[Union[dict, TypeTreeNode]], reader: EndianBinaryReader
+    nodes: List[Union[dict, TypeTreeNode]],
+    reader: EndianBinaryReader,
+    plan: TypeTreeReadPlan = None,
+    fields: Iterable[str] = None,
+    as_numpy: bool = False,
+    node_factories: Sequence[Optional[Callable]] = None,
+    context: Any = None,
 ) -> dict:
     """Reads the typetree of the object contained in the reader via the node list.
 
@@ -142,6 +448,20 @@ def read_typetree(
         List of nodes/nodes
     reader : EndianBinaryReader
         Reader of the object to be parsed
+    plan : TypeTreeReadPlan, optional
+        The compiled nodes, compiled on the fly if not given
+    fields : Iterable[str], optional
+        Paths of the fields to read, e.g. ["m_Name", "data.items"],
+        all other fields are skipped and not included in the result
+    as_numpy : bool, optional
+        If vectors of primitive types are returned as NumPy arrays,
+        or as typed memoryviews if NumPy isn't available,
+        instead of lists
+    node_factories : Sequence[Optional[Callable]], optional
+        The factories of the structs, one per instruction of the plan,
+        the structs are created via factory(context, *values) instead of as dicts
+    context : Any, optional
+        The first argument passed to the node factories
 
     Returns
     -------
@@ -150,97 +470,414 @@ def read_typetree(
     """
     reader.reset()
 
-    nodes = check_nodes(nodes)
+    if plan is None:
+        plan = TypeTreeReadPlan(nodes)
+    if fields is not None:
+        fields = parse_fields(fields)
+
+    as_array = get_array_converter(reader.endian) if as_numpy else None
 
     if read_typetree_c:
         return read_typetree_c(
-            nodes, reader.read_bytes(reader.byte_size), reader.endian
+            plan.program_c,
+            reader.read_bytes(reader.byte_size),
+            reader.endian,
+            fields,
+            as_array,
+            node_factories,
+            context,
         )
 
-    obj = read_value(nodes, reader, c_uint32(0))
+    funcs = [getattr(reader, name) for name in READ_FUNCTIONS]
+    # the data may be shared with other objects, so views on it are read-only
+    read_byte_array = funcs[OP_TYPELESSDATA]
+
+    def read_typeless_data():
+        value = read_byte_array()
+        return value.toreadonly() if isinstance(value, memoryview) else value
+
+    funcs[OP_TYPELESSDATA] = read_typeless_data
+    # the reader of primitive vectors as arrays
+    if as_array:
+        read_bytes = reader.read_bytes
+        funcs.append(
+            lambda size, op: as_array(read_bytes(size * PRIMITIVE_SIZES[op]), op)
+        )
+    else:
+        funcs.append(None)
+    funcs.append(None)  # maps
+    # the builder of the structs
+    if node_factories:
+        funcs.append(lambda i, values: node_factories[i](context, *values))
+    else:
+        funcs.append(None)
+    if fields is not None and plan.program[0][0] == OP_CLASS:
+        # the rest of the object doesn't have to be read
+        return read_program_fields(
+            plan.program, plan.sizes, 0, reader, funcs, fields, True
+        )
+    obj = read_program_value(plan.program, 0, reader, funcs)
 
     read = reader.Position - reader.byte_start
     if read != reader.byte_size:
         raise TypeTreeError(
             f"Error while read type, read {read} bytes but expected {reader.byte_size} bytes",
-            nodes,
+            plan.nodes,
         )
 
     return obj
 
 
-def read_value(nodes: List[TypeTreeNode], reader: EndianBinaryReader, i: c_uint32):
-    node = nodes[i.value]
-    typ = node.m_Type
-    align = (node.m_MetaFlag & kAlignBytes) != 0
+def read_program_value(
+    program: List[Tuple[int, str, bool, int]],
+    i: int,
+    reader: EndianBinaryReader,
+    funcs: List[Callable],
+):
+    op, _, align, end = program[i]
 
-    if typ == "SInt8":
-        value = reader.read_byte()
-    elif typ in ["UInt8", "char"]:
-        value = reader.read_u_byte()
-    elif typ in ["short", "SInt16"]:
-        value = reader.read_short()
-    elif typ in ["UInt16", "unsigned short"]:
-        value = reader.read_u_short()
-    elif typ in ["int", "SInt32"]:
-        value = reader.read_int()
-    elif typ in ["UInt32", "unsigned int", "Type*"]:
-        value = reader.read_u_int()
-    elif typ in ["long long", "SInt64"]:
-        value = reader.read_long()
-    elif typ in ["UInt64", "unsigned long long", "FileSize"]:
-        value = reader.read_u_long()
-    elif typ == "float":
-        value = reader.read_float()
-    elif typ == "double":
-        value = reader.read_double()
-    elif typ == "bool":
-        value = reader.read_boolean()
-    elif typ == "string":
-        value = reader.read_aligned_string()
-        i.value += 3  # Array, Size, Data(typ)
-    elif typ == "map":  # map == MultiDict
-        if (nodes[i.value + 1].m_MetaFlag & kAlignBytes) != 0:
-            align = True
-        map_ = get_nodes(nodes, i.value)
-        i.value += len(map_) - 1
-        first = get_nodes(map_, 4)
-        second = get_nodes(map_, 4 + len(first))
-        size = reader.read_int()
+    if op < OP_VECTOR:
+        value = funcs[op]()
+    elif op == OP_VECTOR:
+        size = funcs[OP_SINT32]()
+        data = i + 3  # skip self, Array, size
+        data_op, _, data_align, _ = program[data]
+        if data_op <= OP_BOOL and not data_align and funcs[OP_VECTOR]:
+            value = funcs[OP_VECTOR](size, data_op)
+        elif data_op < OP_VECTOR and not data_align:
+            func = funcs[data_op]
+            value = [func() for _ in range(size)]
+        else:
+            value = [
+                read_program_value(program, data, reader, funcs) for _ in range(size)
+            ]
+    elif op == OP_MAP:
+        size = funcs[OP_SINT32]()
+        first = i + 4  # skip self, Array, size, pair
+        second = program[first][3]
         value = [None] * size
         for j in range(size):
-            key = read_value(first, reader, c_uint32(0))
-            value[j] = (key, read_value(second, reader, c_uint32(0)))
-    elif typ == "TypelessData":
-        size = reader.read_int()
-        value = reader.read_bytes(size)
-        i.value += 2  # Size == int, Data(typ) == char/uint8
-    else:
-        # Vector
-        if i.value < len(nodes) - 1 and nodes[i.value + 1].m_Type == "Array":
-            if (nodes[i.value + 1].m_MetaFlag & kAlignBytes) != 0:
-                align = True
-            vector = get_nodes(nodes, i.value)
-            i.value += len(vector) - 1
-            size = reader.read_int()
-            value = [read_value(vector, reader, c_uint32(3)) for _ in range(size)]
-        else:  # Class
-            clz = get_nodes(nodes, i.value)
-            i.value += len(clz) - 1
-            value = {}
-            j = c_uint32(1)
-            while j.value < len(clz):
-                clz_node = clz[j.value]
-                value[clz_node.m_Name] = read_value(clz, reader, j)
-                j.value += 1
+            key = read_program_value(program, first, reader, funcs)
+            value[j] = (key, read_program_value(program, second, reader, funcs))
+    elif funcs[OP_CLASS]:
+        values = []
+        j = i + 1
+        while j < end:
+            values.append(read_program_value(program, j, reader, funcs))
+            j = program[j][3]
+        value = funcs[OP_CLASS](i, values)
+    else:  # Class
+        value = {}
+        j = i + 1
+        while j < end:
+            value[program[j][1]] = read_program_value(program, j, reader, funcs)
+            j = program[j][3]
+
+    if align:
+        reader.align_stream()
+    return value
+
+
+def read_program_fields(
+    program: List[Tuple[int, str, bool, int]],
+    sizes: List[int],
+    i: int,
+    reader: EndianBinaryReader,
+    funcs: List[Callable],
+    fields: dict,
+    root: bool = False,
+) -> dict:
+    _, _, align, end = program[i]
+    value = {}
+    remaining = len(fields)
+    j = i + 1
+    while j < end:
+        name = program[j][1]
+        if name in fields:
+            sub_fields = fields[name]
+            if sub_fields is None or program[j][0] != OP_CLASS:
+                value[name] = read_program_value(program, j, reader, funcs)
+            else:
+                value[name] = read_program_fields(
+                    program, sizes, j, reader, funcs, sub_fields
+                )
+            remaining -= 1
+            if root and remaining == 0:
+                return value
+        else:
+            skip_program_value(program, sizes, j, reader, funcs)
+        j = program[j][3]
 
     if align:
         reader.align_stream()
     return value
 
 
+def skip_program_value(
+    program: List[Tuple[int, str, bool, int]],
+    sizes: List[int],
+    i: int,
+    reader: EndianBinaryReader,
+    funcs: List[Callable],
+):
+    op, _, align, end = program[i]
+
+    if sizes[i] >= 0:
+        reader.Position += sizes[i]
+    elif op == OP_STRING or op == OP_TYPELESSDATA:
+        size = funcs[OP_SINT32]()
+        reader.Position += size
+        if op == OP_STRING:
+            reader.align_stream()
+    elif op == OP_VECTOR:
+        size = funcs[OP_SINT32]()
+        data = i + 3  # skip self, Array, size
+        if sizes[data] >= 0 and not program[data][2]:
+            reader.Position += size * sizes[data]
+        else:
+            for _ in range(size):
+                skip_program_value(program, sizes, data, reader, funcs)
+    elif op == OP_MAP:
+        size = funcs[OP_SINT32]()
+        first = i + 4  # skip self, Array, size, pair
+        second = program[first][3]
+        for _ in range(size):
+            skip_program_value(program, sizes, first, reader, funcs)
+            skip_program_value(program, sizes, second, reader, funcs)
+    else:  # Class
+        j = i + 1
+        while j < end:
+            skip_program_value(program, sizes, j, reader, funcs)
+            j = program[j][3]
+
+    if align:
+        reader.align_stream()
+
+
+def get_field_offsets(
+    nodes: List[Union[dict, TypeTreeNode]],
+    data: bytes,
+    endian: str,
+    plan: TypeTreeReadPlan = None,
+) -> Dict[str, Tuple[int, str]]:
+    """Determines the byte offset of each field of the typetree within the data.
+
+    Parameters
+    ----------
+    nodes : list
+        List of nodes/nodes
+    data : bytes
+        The raw data of the object
+    endian : str
+        The endianness of the data
+    plan : TypeTreeReadPlan, optional
+        The compiled nodes, compiled on the fly if not given
+
+    Returns
+    -------
+    dict
+        path -> (offset, type) of the fields,
+        e.g. "m_Name" or "data.items[3].x", the items of maps are "first" and "second",
+        the elements of primitive vectors are stored once as "path[]" -> (offset, type, count),
+        see get_field_offset
+    """
+    if plan is None:
+        plan = TypeTreeReadPlan(nodes)
+    reader = EndianBinaryReader(data, endian)
+    offsets = {}
+    read_program_offsets(plan.program, plan.nodes, 0, reader, "", offsets)
+    if reader.Position != len(data):
+        raise TypeTreeError(
+            f"Error while read type, read {reader.Position} bytes but expected {len(data)} bytes",
+            plan.nodes,
+        )
+    return offsets
+
+
+def get_field_ranges(
+    nodes: List[Union[dict, TypeTreeNode]],
+    data: bytes,
+    endian: str,
+    plan: TypeTreeReadPlan = None,
+) -> List[Tuple[int, int, int]]:
+    """Determines the byte ranges of the fields of the root struct within the data.
+
+    Parameters
+    ----------
+    nodes : list
+        List of nodes/nodes
+    data : bytes
+        The raw data of the object
+    endian : str
+        The endianness of the data
+    plan : TypeTreeReadPlan, optional
+        The compiled nodes, compiled on the fly if not given
+
+    Returns
+    -------
+    list
+        (index, start, end) of the fields, index is the index of the field's node,
+        the range includes the alignment of the field
+    """
+    if plan is None:
+        plan = TypeTreeReadPlan(nodes)
+    program = plan.program
+    sizes = plan.sizes
+    reader = EndianBinaryReader(data, endian)
+    funcs = [getattr(reader, name) for name in READ_FUNCTIONS]
+    ranges = []
+    i = 1
+    while i < program[0][3]:
+        start = reader.Position
+        skip_program_value(program, sizes, i, reader, funcs)
+        ranges.append((i, start, reader.Position))
+        i = program[i][3]
+    if program[0][2]:
+        reader.align_stream()
+    if reader.Position != len(data):
+        raise TypeTreeError(
+            f"Error while read type, read {reader.Position} bytes but expected {len(data)} bytes",
+            plan.nodes,
+        )
+    return ranges
+
+
+def read_program_offsets(
+    program: List[Tuple[int, str, bool, int]],
+    nodes: List[TypeTreeNode],
+    i: int,
+    reader: EndianBinaryReader,
+    path: str,
+    offsets: Dict[str, Tuple[int, str]],
+):
+    op, _, align, end = program[i]
+    if path:
+        offsets[path] = (reader.Position, nodes[i].m_Type)
+
+    if op < OP_STRING:
+        reader.Position += PRIMITIVE_SIZES[op]
+    elif op == OP_STRING or op == OP_TYPELESSDATA:
+        size = reader.read_int()
+        reader.Position += size
+        if op == OP_STRING:
+            reader.align_stream()
+    elif op == OP_VECTOR:
+        size = reader.read_int()
+        data = i + 3  # skip self, Array, size
+        data_op, _, data_align, _ = program[data]
+        if data_op < OP_STRING and not data_align:
+            # the offsets of the elements are calculated on demand
+            offsets[f"{path}[]"] = (reader.Position, nodes[data].m_Type, size)
+            reader.Position += size * PRIMITIVE_SIZES[data_op]
+        else:
+            for j in range(size):
+                read_program_offsets(
+                    program, nodes, data, reader, f"{path}[{j}]", offsets
+                )
+    elif op == OP_MAP:
+        size = reader.read_int()
+        first = i + 4  # skip self, Array, size, pair
+        second = program[first][3]
+        for j in range(size):
+            read_program_offsets(
+                program, nodes, first, reader, f"{path}[{j}].first", offsets
+            )
+            read_program_offsets(
+                program, nodes, second, reader, f"{path}[{j}].second", offsets
+            )
+    else:  # Class
+        j = i + 1
+        while j < end:
+            name = program[j][1]
+            read_program_offsets(
+                program,
+                nodes,
+                j,
+                reader,
+                f"{path}.{name}" if path else name,
+                offsets,
+            )
+            j = program[j][3]
+
+    if align:
+        reader.align_stream()
+
+
+def get_field_offset(
+    offsets: Dict[str, Tuple[int, str]], path: str
+) -> Optional[Tuple[int, str]]:
+    """Returns the (offset, type) of the field with the given path,
+    including the elements of primitive vectors.
+
+    Parameters
+    ----------
+    offsets : dict
+        The field offsets of the data, see get_field_offsets
+    path : str
+        The path of the field, e.g. "data.items[3]"
+
+    Returns
+    -------
+    Optional[Tuple[int, str]]
+        The offset and type of the field, or None if there is no such field
+    """
+    entry = offsets.get(path)
+    if entry is not None:
+        return entry
+    # an element of a primitive vector
+    vector, bracket, index = path.rpartition("[")
+    if not bracket or not index.endswith("]") or not index[:-1].isdigit():
+        return None
+    entry = offsets.get(f"{vector}[]")
+    index = int(index[:-1])
+    if entry is None or index >= entry[2]:
+        return None
+    offset, typ, _ = entry
+    return offset + index * PRIMITIVE_SIZES[OPCODES[typ]], typ
+
+
+def patch_fields(
+    data: bytes,
+    endian: str,
+    offsets: Dict[str, Tuple[int, str]],
+    values: Dict[str, Any],
+) -> bytes:
+    """Overwrites fixed-size primitive fields in a copy of the data.
+
+    Parameters
+    ----------
+    data : bytes
+        The raw data of the object
+    endian : str
+        The endianness of the data
+    offsets : dict
+        The field offsets of the data, see get_field_offsets
+    values : dict
+        path -> new value of the fields to patch
+
+    Returns
+    -------
+    bytes
+        The patched data
+    """
+    data = bytearray(data)
+    for path, value in values.items():
+        entry = get_field_offset(offsets, path)
+        if entry is None:
+            raise KeyError(f"Unknown field {path}")
+        offset, typ = entry
+        op = OPCODES.get(typ)
+        if op is None or op >= OP_STRING:
+            raise TypeError(f"{path} of type {typ} isn't a fixed-size primitive")
+        pack_into(f"{endian}{ARRAY_TYPECODES[op]}", data, offset, value)
+    return bytes(data)
+
+
 def read_typetree_str(
-    sb: List[str], nodes: List[Union[dict, TypeTreeNode]], reader: EndianBinaryReader
+    sb: List[str],
+    nodes: List[Union[dict, TypeTreeNode]],
+    reader: EndianBinaryReader,
+    plan: TypeTreeReadPlan = None,
 ) -> list:
     """Reads the typetree of the object contained in the reader via the node list and dumps it as string.
 
@@ -252,6 +889,8 @@ def read_typetree_str(
         List of nodes/nodes
     reader : EndianBinaryReader
         Reader of the object to be parsed
+    plan : TypeTreeReadPlan, optional
+        The compiled nodes, compiled on the fly if not given
 
     Returns
     -------
@@ -259,6 +898,21 @@ def read_typetree_str(
         The sb given as input
     """
     # reader.reset()
+    if read_typetree_str_c:
+        if plan is None:
+            plan = TypeTreeReadPlan(nodes)
+        remaining = reader.byte_size - (reader.Position - reader.byte_start)
+        text, read = read_typetree_str_c(
+            plan.program_c, plan.nodes, reader.read_bytes(remaining), reader.endian
+        )
+        sb.append(text)
+        if read != remaining:
+            raise TypeTreeError(
+                f"Error while read type, read {reader.byte_size - remaining + read} bytes but expected {reader.byte_size} bytes",
+                plan.nodes,
+            )
+        return sb
+
     nodes = check_nodes(nodes)
 
     i = c_uint32(0)
@@ -420,7 +1074,10 @@ def dump_typetree(nodes: List[TypeTreeNode]) -> str:
 
 
 def write_typetree(
-    obj: dict, nodes: List[Union[dict, TypeTreeNode]], writer: EndianBinaryWriter = None
+    obj: dict,
+    nodes: List[Union[dict, TypeTreeNode]],
+    writer: EndianBinaryWriter = None,
+    plan: TypeTreeReadPlan = None,
 ) -> EndianBinaryWriter:
     """Writes the data of the object via the given typetree of the object into the writer.
 
@@ -432,6 +1089,8 @@ def write_typetree(
         List of nodes/nodes
     writer : EndianBinaryWriter
         Writer of the object to be saved
+    plan : TypeTreeReadPlan, optional
+        The compiled nodes, compiled on the fly if not given
 
     Returns
     -------
@@ -443,6 +1102,13 @@ def write_typetree(
 
     nodes = check_nodes(nodes)
 
+    # the C implementation serializes into its own buffer,
+    # so the alignment is only correct if the writer is aligned as well
+    if write_typetree_c and writer.Position % 4 == 0:
+        program = plan.program_c if plan is not None else nodes
+        writer.write(write_typetree_c(obj, program, writer.endian))
+        return writer
+
     i = c_uint32(1)
     while i.value < len(nodes):
         value = obj[nodes[i.value].m_Name]
@@ -509,8 +1175,12 @@ def write_value(
             vector = get_nodes(nodes, i.value)
             i.value += len(vector) - 1
             writer.write_int(len(value))
-            for val in value:
-                write_value(val, vector, writer, c_uint32(3))
+            data = pack_array(value, vector[3], writer.endian)
+            if data is not None:
+                writer.write_bytes(data)
+            else:
+                for val in value:
+                    write_value(val, vector, writer, c_uint32(3))
         else:  # Class
             clz = get_nodes(nodes, i.value)
             i.value += len(clz) - 1
@@ -0,0 +1,169 @@
+import io
+from bisect import bisect_right
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, List
+
+
+class BlockStorage:
+    """Random access to the uncompressed data of a block compressed stream.
+
+    Only the blocks that are touched by a read are decompressed.
+    The most recently used blocks are kept in a LRU cache.
+    """
+
+    reader: "EndianBinaryReader"
+    blocks_info: list
+    decompress: Callable
+    cache_size: int
+    starts: List[int]
+    compressed_starts: List[int]
+    size: int
+
+    def __init__(
+        self,
+        reader,
+        blocks_info: list,
+        offset: int,
+        decompress: Callable,
+        cache_size: int = 16,
+    ):
+        """
+        Parameters
+        ----------
+        reader : EndianBinaryReader
+            The reader of the compressed data.
+        blocks_info : list
+            List of BlockInfo(uncompressedSize, compressedSize, flags).
+        offset : int
+            Position of the first compressed block in the reader.
+        decompress : Callable
+            decompress(compressed_data, uncompressed_size, flags, index) -> bytes
+        cache_size : int
+            Number of decompressed blocks that are kept in memory.
+        """
+        self.reader = reader
+        self.blocks_info = blocks_info
+        self.decompress = decompress
+        self.cache_size = max(1, cache_size)
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+        # start offsets of the blocks,
+        # the last entry is the end of the last block
+        self.starts = [0]
+        self.compressed_starts = [offset]
+        for block_info in blocks_info:
+            self.starts.append(self.starts[-1] + block_info.uncompressedSize)
+            self.compressed_starts.append(
+                self.compressed_starts[-1] + block_info.compressedSize
+            )
+        self.size = self.starts[-1]
+
+    def get_block(self, index: int) -> bytes:
+        """Returns the uncompressed data of the block with the given index."""
+        with self._lock:
+            data = self._cache.get(index)
+            if data is not None:
+                self._cache.move_to_end(index)
+                return data
+
+            block_info = self.blocks_info[index]
+            self.reader.Position = self.compressed_starts[index]
+            data = self.decompress(
+                self.reader.read_bytes(block_info.compressedSize),
+                block_info.uncompressedSize,
+                block_info.flags,
+                index,
+            )
+
+            self._cache[index] = data
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return data
+
+    def read(self, offset: int, size: int) -> bytes:
+        """Reads size bytes starting at the given uncompressed offset."""
+        end = min(offset + size, self.size)
+        if offset >= end:
+            return b""
+
+        index = bisect_right(self.starts, offset) - 1
+        block_start = self.starts[index]
+        # fast path - read within a single block
+        if end <= self.starts[index + 1]:
+            return bytes(
+                self.get_block(index)[offset - block_start : end - block_start]
+            )
+
+        ret = bytearray()
+        while offset < end:
+            block_end = self.starts[index + 1]
+            ret += self.get_block(index)[
+                offset - block_start : min(end, block_end) - block_start
+            ]
+            offset = block_end
+            block_start = block_end
+            index += 1
+        return bytes(ret)
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+
+class BlockStream(io.RawIOBase):
+    """A read-only file-like window on the data of a BlockStorage."""
+
+    storage: BlockStorage
+    offset: int
+    size: int
+
+    def __init__(self, storage: BlockStorage, offset: int = 0, size: int = None):
+        super().__init__()
+        self.storage = storage
+        self.offset = offset
+        self.size = storage.size - offset if size is None else size
+        self._pos = 0
+
+    def window(self, offset: int, size: int) -> "BlockStream":
+        """Returns a new stream for the given range of this stream."""
+        return BlockStream(self.storage, self.offset + offset, size)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence ({whence})")
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.size - self._pos
+        size = min(size, self.size - self._pos)
+        if size <= 0:
+            return b""
+        ret = self.storage.read(self.offset + self._pos, size)
+        self._pos += len(ret)
+        return ret
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
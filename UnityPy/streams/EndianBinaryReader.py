@@ -1,4 +1,5 @@
 import sys
+from mmap import mmap
 from struct import Struct, unpack
 import re
 from typing import List, Union
@@ -43,11 +44,11 @@ class EndianBinaryReader:
 
     def __new__(
         cls,
-        item: Union[bytes, bytearray, memoryview, BytesIO, str],
+        item: Union[bytes, bytearray, memoryview, mmap, BytesIO, str],
         endian: str = ">",
         offset: int = 0,
     ):
-        if isinstance(item, (bytes, bytearray, memoryview)):
+        if isinstance(item, (bytes, bytearray, memoryview, mmap)):
             obj = super(EndianBinaryReader, cls).__new__(EndianBinaryReader_Memoryview)
         elif isinstance(item, (IOBase, BufferedIOBase)):
             obj = super(EndianBinaryReader, cls).__new__(EndianBinaryReader_Streamable)
@@ -259,7 +260,9 @@ class EndianBinaryReader_Memoryview(EndianBinaryReader):
     def __init__(self, view, endian=">", offset=0):
         self._endian = ""
         super().__init__(view, endian=endian, offset=offset)
-        self.view = memoryview(view)
+        # read-only, as the data may be shared, e.g. the decompressed blocks of a bundle,
+        # which also keeps the read bytes hashable
+        self.view = memoryview(view).toreadonly()
         self.Length = len(view)
 
     @property
@@ -455,7 +458,9 @@ class EndianBinaryReader_Streamable(EndianBinaryReader):
         return self.stream.tell()
 
     def set_position(self, value):
-        self.stream.seek(value + self.BaseOffset)
+        # like for the memoryview version, the BaseOffset is only
+        # the real offset of the stream's start, see real_offset
+        self.stream.seek(value)
 
     @property
     def endian(self):
@@ -478,7 +483,7 @@ class EndianBinaryReader_Streamable(EndianBinaryReader):
     @property
     def Length(self):
         pos = self.Position
-        length = self.stream.seek(0, 2) - self.BaseOffset
+        length = self.stream.seek(0, 2)
         self.Position = pos
         return length
 
@@ -496,6 +501,24 @@ class EndianBinaryReader_Streamable(EndianBinaryReader):
         self.stream.close()
         pass
 
+    def read_string_to_null(self, max_length=32767) -> str:
+        # read in chunks instead of byte by byte,
+        # as each read call on the stream is expensive
+        start = self.Position
+        ret = b""
+        while len(ret) < max_length:
+            chunk = self.read(min(256, max_length - len(ret)))
+            if not chunk:
+                break
+            end = chunk.find(b"\0")
+            if end != -1:
+                ret += chunk[:end]
+                self.Position = start + len(ret) + 1
+                return ret.decode("utf8", "surrogateescape")
+            ret += chunk
+        self.Position = start + len(ret)
+        return ret.decode("utf8", "surrogateescape")
+
 
 class EndianBinaryReader_Streamable_LittleEndian(EndianBinaryReader_Streamable):
     def read_u_short(self):
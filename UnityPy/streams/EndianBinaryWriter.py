@@ -1,85 +1,123 @@
 import io
-from struct import pack
+import sys
+from array import array
+from struct import Struct, calcsize
+from typing import Sequence, Union
 
 from ..math import Color, Matrix4x4, Quaternion, Vector2, Vector3, Vector4, Rectangle
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SYS_ENDIAN = "<" if sys.byteorder == "little" else ">"
+
+# precompiled structs of the written primitives and math types per endian
+STRUCT_FORMATS = ("b", "B", "h", "H", "i", "I", "q", "Q", "e", "f", "d", "?")
+STRUCT_FORMATS += ("2f", "3f", "4f", "16f")
+STRUCTS = {
+    endian: {fmt: Struct(f"{endian}{fmt}") for fmt in STRUCT_FORMATS}
+    for endian in ("<", ">")
+}
+# array typecodes of the primitives which can be packed via array.array,
+# only the ones whose item size matches the struct size on this platform
+ARRAY_TYPECODES = {
+    fmt: fmt
+    for fmt in ("b", "B", "h", "H", "i", "I", "q", "Q", "f", "d")
+    if array(fmt).itemsize == calcsize(f"<{fmt}")
+}
+
 
 class EndianBinaryWriter:
     endian: str
     Length: int
     Position: int
-    stream: io.BufferedReader
 
-    def __init__(self, input_=b"", endian=">"):
+    def __new__(cls, input_=b"", endian=">"):
+        if cls is not EndianBinaryWriter:
+            return super(EndianBinaryWriter, cls).__new__(cls)
         if isinstance(input_, (bytes, bytearray)):
-            self.stream = io.BytesIO(input_)
-            self.stream.seek(0, 2)
+            return super(EndianBinaryWriter, cls).__new__(EndianBinaryWriter_Bytearray)
         elif isinstance(input_, io.IOBase):
-            self.stream = input_
+            return super(EndianBinaryWriter, cls).__new__(EndianBinaryWriter_Streamable)
         else:
             raise ValueError("Invalid input type - %s." % type(input_))
+
+    def __init__(self, input_=b"", endian=">"):
         self.endian = endian
-        self.Position = self.stream.tell()
+
+    @property
+    def endian(self) -> str:
+        return self._endian
+
+    @endian.setter
+    def endian(self, value: str):
+        self._endian = value
+        structs = STRUCTS.get(value)
+        if structs is None:
+            structs = {fmt: Struct(f"{value}{fmt}") for fmt in STRUCT_FORMATS}
+        self._structs = structs
 
     @property
     def bytes(self):
-        self.stream.seek(0)
-        return self.stream.read()
+        # implemented by Bytearray and Streamable versions
+        return b""
 
     @property
     def Length(self) -> int:
-        pos = self.stream.tell()
-        self.stream.seek(0, 2)
-        l = self.stream.tell()
-        self.stream.seek(pos)
-        return l
+        # implemented by Bytearray and Streamable versions
+        return 0
 
     def dispose(self):
-        self.stream.close()
         pass
 
     def write(self, *args):
-        if self.Position != self.stream.tell():
-            self.stream.seek(self.Position)
-        ret = self.stream.write(*args)
-        self.Position = self.stream.tell()
-        return ret
+        # implemented by Bytearray and Streamable versions
+        return 0
+
+    def write_struct(self, struct: Struct, *values):
+        """Writes the values packed by the given precompiled struct."""
+        return self.write(struct.pack(*values))
 
     def write_byte(self, value: int):
-        self.write(pack(self.endian + "b", value))
+        self.write_struct(self._structs["b"], value)
 
     def write_u_byte(self, value: int):
-        self.write(pack(self.endian + "B", value))
+        self.write_struct(self._structs["B"], value)
 
     def write_bytes(self, value: bytes):
         return self.write(value)
 
     def write_short(self, value: int):
-        self.write(pack(self.endian + "h", value))
+        self.write_struct(self._structs["h"], value)
 
     def write_int(self, value: int):
-        self.write(pack(self.endian + "i", value))
+        self.write_struct(self._structs["i"], value)
 
     def write_long(self, value: int):
-        self.write(pack(self.endian + "q", value))
+        self.write_struct(self._structs["q"], value)
 
     def write_u_short(self, value: int):
-        self.write(pack(self.endian + "H", value))
+        self.write_struct(self._structs["H"], value)
 
     def write_u_int(self, value: int):
-        self.write(pack(self.endian + "I", value))
+        self.write_struct(self._structs["I"], value)
 
     def write_u_long(self, value: int):
-        self.write(pack(self.endian + "Q", value))
+        self.write_struct(self._structs["Q"], value)
+
+    def write_half(self, value: float):
+        self.write_struct(self._structs["e"], value)
 
     def write_float(self, value: float):
-        self.write(pack(self.endian + "f", value))
+        self.write_struct(self._structs["f"], value)
 
     def write_double(self, value: float):
-        self.write(pack(self.endian + "d", value))
+        self.write_struct(self._structs["d"], value)
 
     def write_boolean(self, value: bool):
-        self.write(pack(self.endian + "?", value))
+        self.write_struct(self._structs["?"], value)
 
     def write_string_to_null(self, value: str):
         self.write(value.encode("utf8", "surrogateescape"))
@@ -92,36 +130,25 @@ class EndianBinaryWriter:
         self.align_stream(4)
 
     def align_stream(self, alignment=4):
-        pos = self.stream.tell()
-        align = (alignment - pos % alignment) % alignment
+        align = (alignment - self.Position % alignment) % alignment
         self.write(b"\0" * align)
 
     def write_quaternion(self, value: Quaternion):
-        self.write_float(value.X)
-        self.write_float(value.Y)
-        self.write_float(value.Z)
-        self.write_float(value.W)
+        self.write_struct(self._structs["4f"], value.X, value.Y, value.Z, value.W)
 
     def write_vector2(self, value: Vector2):
-        self.write_float(value.X)
-        self.write_float(value.Y)
+        self.write_struct(self._structs["2f"], value.X, value.Y)
 
     def write_vector3(self, value: Vector3):
-        self.write_float(value.X)
-        self.write_float(value.Y)
-        self.write_float(value.Z)
+        self.write_struct(self._structs["3f"], value.X, value.Y, value.Z)
 
     def write_vector4(self, value: Vector4):
-        self.write_float(value.X)
-        self.write_float(value.Y)
-        self.write_float(value.Z)
-        self.write_float(value.W)
+        self.write_struct(self._structs["4f"], value.X, value.Y, value.Z, value.W)
 
     def write_rectangle_f(self, value: Rectangle):
-        self.write_float(value.x)
-        self.write_float(value.y)
-        self.write_float(value.width)
-        self.write_float(value.height)
+        self.write_struct(
+            self._structs["4f"], value.x, value.y, value.width, value.height
+        )
 
     def write_color_uint(self, value: Color):
         self.write_u_byte(value.R * 255)
@@ -130,14 +157,10 @@ class EndianBinaryWriter:
         self.write_u_byte(value.A * 255)
 
     def write_color4(self, value: Color):
-        self.write_float(value.R)
-        self.write_float(value.G)
-        self.write_float(value.B)
-        self.write_float(value.A)
+        self.write_struct(self._structs["4f"], value.R, value.G, value.B, value.A)
 
     def write_matrix(self, value: Matrix4x4):
-        for val in value.M:
-            self.write_float(val)
+        self.write_struct(self._structs["16f"], *value.M)
 
     def write_array(self, command, value: list, write_length: bool = True):
         if write_length:
@@ -145,24 +168,83 @@ class EndianBinaryWriter:
         for val in value:
             command(val)
 
+    def pack_array(self, fmt: str, value: Union[Sequence, array]) -> bytes:
+        """Packs all elements of a primitive array at once.
+
+        Parameters
+        ----------
+        fmt : str
+            The struct format character of the elements, e.g. "i"
+        value : Sequence | array.array | np.ndarray
+            The elements
+
+        Returns
+        -------
+        bytes
+            The elements packed in the endianness of the writer
+        """
+        endian = self.endian
+        if np is not None and isinstance(value, np.ndarray):
+            return value.astype(np.dtype(fmt).newbyteorder(endian), copy=False).tobytes()
+        code = ARRAY_TYPECODES.get(fmt)
+        if code is None:
+            return Struct(f"{endian}{len(value)}{fmt}").pack(*value)
+        swap = endian != SYS_ENDIAN and calcsize(fmt) > 1
+        # the array of the caller is copied instead of being byteswapped
+        if swap or not isinstance(value, array) or value.typecode != code:
+            value = array(code, value)
+        if swap:
+            value.byteswap()
+        return value.tobytes()
+
+    def write_primitive_array(
+        self, fmt: str, value: Union[Sequence, array], write_length: bool = True
+    ):
+        """Writes all elements of a primitive array in one call.
+
+        Parameters
+        ----------
+        fmt : str
+            The struct format character of the elements, e.g. "i"
+        value : Sequence | array.array | np.ndarray
+            The elements
+        write_length : bool
+            If the number of elements is written in front of them
+        """
+        if write_length:
+            self.write_int(len(value))
+        return self.write(self.pack_array(fmt, value))
+
     def write_byte_array(self, value: bytes):
         self.write_int(len(value))
         self.write(value)
 
     def write_boolean_array(self, value: list):
-        self.write_array(self.write_boolean, value)
+        self.write_primitive_array("?", value)
+
+    def write_short_array(self, value: list, write_length: bool = False):
+        return self.write_primitive_array("h", value, write_length)
 
     def write_u_short_array(self, value: list):
-        self.write_array(self.write_u_short, value)
+        self.write_primitive_array("H", value)
 
     def write_int_array(self, value: list, write_length: bool = False):
-        return self.write_array(self.write_int, value, write_length)
+        return self.write_primitive_array("i", value, write_length)
 
     def write_u_int_array(self, value: list, write_length: bool = False):
-        return self.write_array(self.write_u_int, value, write_length)
+        return self.write_primitive_array("I", value, write_length)
+
+    def write_long_array(self, value: list, write_length: bool = False):
+        return self.write_primitive_array("q", value, write_length)
+
+    def write_u_long_array(self, value: list, write_length: bool = False):
+        return self.write_primitive_array("Q", value, write_length)
 
     def write_float_array(self, value: list, write_length: bool = False):
-        return self.write_array(self.write_float, value, write_length)
+        return self.write_primitive_array("f", value, write_length)
+
+    def write_double_array(self, value: list, write_length: bool = False):
+        return self.write_primitive_array("d", value, write_length)
 
     def write_string_array(self, value: list):
         self.write_array(self.write_aligned_string, value)
@@ -175,3 +257,147 @@ class EndianBinaryWriter:
 
     def write_matrix_array(self, value: list):
         self.write_array(self.write_matrix, value)
+
+
+class EndianBinaryWriter_Bytearray(EndianBinaryWriter):
+    """Writes into a growable bytearray.
+    The buffer is over-allocated, so that the primitives can be packed
+    directly into it via Struct.pack_into."""
+
+    buffer: bytearray
+
+    def __init__(self, input_=b"", endian=">"):
+        super().__init__(input_, endian)
+        self.buffer = bytearray(input_)
+        self._length = len(self.buffer)
+        self.Position = self._length
+
+    @property
+    def endian(self) -> str:
+        return self._endian
+
+    @endian.setter
+    def endian(self, value: str):
+        EndianBinaryWriter.endian.fset(self, value)
+        self.__class__ = BYTEARRAY_WRITER_CLASSES.get(
+            value, EndianBinaryWriter_Bytearray
+        )
+
+    @property
+    def bytes(self):
+        if len(self.buffer) != self._length:
+            del self.buffer[self._length :]
+        return bytes(self.buffer)
+
+    @property
+    def Length(self) -> int:
+        return self._length
+
+    def dispose(self):
+        self.buffer = bytearray()
+        self._length = self.Position = 0
+
+    def reserve(self, end: int):
+        """Grows the buffer, so that it can hold the data up to end."""
+        size = len(self.buffer)
+        if end > size:
+            self.buffer.extend(bytes(max(end, size * 2) - size))
+        if end > self._length:
+            self._length = end
+
+    def write(self, data):
+        if not isinstance(data, (bytes, bytearray)):
+            data = memoryview(data).cast("B")
+        pos = self.Position
+        end = pos + len(data)
+        if end > self._length:
+            self.reserve(end)
+        self.buffer[pos:end] = data
+        self.Position = end
+        return len(data)
+
+    def write_struct(self, struct: Struct, *values):
+        pos = self.Position
+        end = pos + struct.size
+        if end > self._length:
+            self.reserve(end)
+        struct.pack_into(self.buffer, pos, *values)
+        self.Position = end
+        return struct.size
+
+
+def create_write_function(struct: Struct):
+    """Creates a write function for the primitive which packs it
+    via the given struct directly into the buffer of the writer."""
+    pack_into = struct.pack_into
+    size = struct.size
+
+    def write(self, value):
+        pos = self.Position
+        end = pos + size
+        if end > self._length:
+            self.reserve(end)
+        pack_into(self.buffer, pos, value)
+        self.Position = end
+
+    return write
+
+
+# generate the bytearray writers with the primitive write functions of the endians
+WRITE_FUNCTION_FORMATS = (
+    ("byte", "b"),
+    ("u_byte", "B"),
+    ("short", "h"),
+    ("u_short", "H"),
+    ("int", "i"),
+    ("u_int", "I"),
+    ("long", "q"),
+    ("u_long", "Q"),
+    ("half", "e"),
+    ("float", "f"),
+    ("double", "d"),
+    ("boolean", "?"),
+)
+BYTEARRAY_WRITER_CLASSES = {
+    endian: type(
+        f"EndianBinaryWriter_Bytearray_{name}",
+        (EndianBinaryWriter_Bytearray,),
+        {
+            f"write_{typ}": create_write_function(STRUCTS[endian][fmt])
+            for typ, fmt in WRITE_FUNCTION_FORMATS
+        },
+    )
+    for endian, name in (("<", "LittleEndian"), (">", "BigEndian"))
+}
+
+
+class EndianBinaryWriter_Streamable(EndianBinaryWriter):
+    stream: io.IOBase
+
+    def __init__(self, input_, endian=">"):
+        super().__init__(input_, endian)
+        self.stream = input_
+        self.Position = self.stream.tell()
+
+    @property
+    def bytes(self):
+        self.stream.seek(0)
+        return self.stream.read()
+
+    @property
+    def Length(self) -> int:
+        pos = self.stream.tell()
+        self.stream.seek(0, 2)
+        l = self.stream.tell()
+        self.stream.seek(pos)
+        return l
+
+    def dispose(self):
+        self.stream.close()
+
+    def write(self, *args):
+        if self.Position != self.stream.tell():
+            self.stream.seek(self.Position)
+        ret = self.stream.write(*args)
+        self.Position = self.stream.tell()
+        return ret
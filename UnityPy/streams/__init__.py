@@ -1,2 +1,3 @@
 from .EndianBinaryReader import EndianBinaryReader
 from .EndianBinaryWriter import EndianBinaryWriter
+from .BlockStream import BlockStorage, BlockStream
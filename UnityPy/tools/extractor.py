@@ -1,7 +1,9 @@
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 import os
 import json
 import UnityPy
+from UnityPy.environment import reSplit
 from UnityPy.classes import (
     Object,
     PPtr,
@@ -15,8 +17,10 @@ from UnityPy.classes import (
     AudioClip,
     GameObject,
 )
+from UnityPy.classes.Object import NodeHelper
 from UnityPy.enums.ClassIDType import ClassIDType
-from typing import Union, List, Dict, Callable
+from UnityPy.files import SerializedFile
+from typing import Union, List, Dict, Callable, Tuple
 from pathlib import Path
 
 
@@ -69,30 +73,48 @@ def export_obj(
 
 
 def extract_assets(
-    src: Union[Path, BytesIO, bytes, bytearray],
+    src: Union[Path, BytesIO, bytes, bytearray, UnityPy.Environment],
     dst: Path,
     use_container: bool = True,
     ignore_first_container_dirs: int = 0,
     append_path_id: bool = False,
     export_unknown_as_typetree: bool = False,
     asset_filter: Callable[[Object], bool] = None,
-) -> List[int]:
+    workers: int = 1,
+) -> List[Tuple[Union[SerializedFile, str], int]]:
     """Extracts some or all assets from the given source.
 
     Args:
-        src (Union[Path, BytesIO, bytes, bytearray]): [description]
+        src (Union[Path, BytesIO, bytes, bytearray, Environment]): [description]
         dst (Path): [description]
         use_container (bool, optional): [description]. Defaults to True.
         ignore_first_container_dirs (int, optional): [description]. Defaults to 0.
         append_path_id (bool, optional): [description]. Defaults to False.
         export_unknown_as_typetree (bool, optional): [description]. Defaults to False.
         asset_filter (func(object)->bool, optional): Determines whether to export an object. Defaults to all objects.
+        workers (int, optional): Number of processes used to extract the assets, if src is a path. Defaults to 1.
+            The files are distributed across the processes, so each process only loads the files it extracts.
+            The asset_filter has to be picklable (e.g. a module level function) in this case,
+            and the assets_file of the returned keys is the name of the file instead of the file itself.
 
     Returns:
-        List[int]: [description]
+        List[Tuple[Union[SerializedFile, str], int]]: The (assets_file, path_id) keys of the exported objects,
+            the assets_file is the name of the file if the assets were extracted with multiple workers.
     """
+    if workers > 1 and isinstance(src, (str, Path)):
+        return extract_assets_parallel(
+            src,
+            dst,
+            workers,
+            use_container=use_container,
+            ignore_first_container_dirs=ignore_first_container_dirs,
+            append_path_id=append_path_id,
+            export_unknown_as_typetree=export_unknown_as_typetree,
+            asset_filter=asset_filter,
+        )
+
     # load source
-    env = UnityPy.load(src)
+    env = src if isinstance(src, UnityPy.Environment) else UnityPy.load(src)
     exported = []
 
     export_types_keys = list(EXPORT_TYPES.keys())
@@ -104,8 +126,10 @@ def extract_assets(
             return 999
 
     if use_container:
+        # sorted by path as well, so that the same object wins if paths collide
         container = sorted(
-            env.container.items(), key=lambda x: defaulted_export_index(x[1].type)
+            env.container.items(),
+            key=lambda x: (defaulted_export_index(x[1].type), x[0]),
         )
         for obj_path, obj in container:
             # The filter here can only access metadata. The same filter may produce a different result later in extract_obj after obj.read()
@@ -114,7 +138,7 @@ def extract_assets(
             # the check of the various sub directories is required to avoid // in the path
             obj_dest = os.path.join(
                 dst,
-                *(x for x in obj_path.split("/")[:ignore_first_container_dirs] if x),
+                *(x for x in obj_path.split("/")[ignore_first_container_dirs:] if x),
             )
             os.makedirs(os.path.dirname(obj_dest), exist_ok=True)
             exported.extend(
@@ -128,7 +152,10 @@ def extract_assets(
             )
 
     else:
-        objects = sorted(env.objects, key=lambda x: defaulted_export_index(x.type))
+        objects = sorted(
+            env.objects, key=lambda x: (defaulted_export_index(x.type), x.path_id)
+        )
+        os.makedirs(dst, exist_ok=True)
         for obj in objects:
             if asset_filter is not None and not asset_filter(obj):
                 continue
@@ -147,6 +174,61 @@ def extract_assets(
     return exported
 
 
+def extract_assets_parallel(
+    src: Path, dst: Path, workers: int, **kwargs
+) -> List[Tuple[str, int]]:
+    """Extracts the assets of the given file or directory with a pool of processes.
+
+    Each file (or group of .split files) is extracted by its own task,
+    which loads the file into a new Environment.
+    References to objects in other files are resolved via the dependency loading.
+
+    Args:
+        src (Path): A file or directory.
+        dst (Path): The output directory.
+        workers (int): Number of processes.
+        **kwargs: The arguments of extract_assets.
+
+    Returns:
+        List[Tuple[str, int]]: The (assets_file name, path_id) keys of the exported objects,
+            in the order of the sorted files.
+    """
+    src = str(src)
+    if os.path.isdir(src):
+        paths = sorted(
+            os.path.join(root, f) for root, dirs, files in os.walk(src) for f in files
+        )
+    else:
+        paths = [src]
+
+    # the parts of split files have to be loaded together
+    shards = {}
+    for path in paths:
+        split_match = reSplit.match(path)
+        shards.setdefault(split_match[1] if split_match else path, []).append(path)
+
+    tasks = [(files, src, dst, kwargs) for files in shards.values()]
+    if not tasks:
+        return []
+    exported = []
+    with ProcessPoolExecutor(min(workers, len(tasks))) as executor:
+        for keys in executor.map(_extract_assets_task, tasks):
+            exported.extend(keys)
+    return exported
+
+
+def _extract_assets_task(task) -> List[Tuple[str, int]]:
+    files, src, dst, kwargs = task
+    env = UnityPy.Environment()
+    # used to look up the dependencies
+    env.path = src if os.path.isdir(src) else os.path.dirname(src)
+    env.load_files(files)
+    return [
+        (getattr(assets_file, "name", assets_file), path_id)
+        for assets_file, path_id in extract_assets(env, dst, **kwargs)
+    ]
+
+
 ###############################################################################
 #                      EXPORT FUNCTIONS                                       #
 ###############################################################################
@@ -323,7 +405,7 @@ def crawl_obj(obj: Object, ret: dict = None) -> Dict[int, Union[Object, PPtr]]:
     # while Object denotes that the class of the object isn't implemented yet
     if isinstance(obj, (MonoBehaviour, Object)):
         obj.read_typetree()
-        data = obj.type_tree.__dict__.values()
+        data = NodeHelper.values(obj.type_tree)
     else:
         data = obj.__dict__.values()
 
@@ -3,6 +3,9 @@
 #include <Python.h>
 #include "structmember.h"
 #include "TypeTreeHelper.h"
+#include <float.h>
+#include <limits.h>
+#include <math.h>
 #include <stdio.h>
 #include <string.h>
 #include "swap.h"
@@ -14,9 +17,57 @@ typedef struct
     char *dataEnd;
     char swap;
     PyObject *obj;
+    // memoryview of the data and the converter of primitive vectors for as_numpy
+    PyObject *view;
+    PyObject *as_array;
+    // the factories of the structs, one per instruction, and their first argument
+    PyObject *node_factories;
+    PyObject *context;
 } Reader;
 typedef PyObject *(*read_type)(Reader *);
 
+// the opcodes of the compiled node list,
+// the primitive ones are the indices of their read functions
+enum
+{
+    OP_SInt8,
+    OP_UInt8,
+    OP_SInt16,
+    OP_UInt16,
+    OP_SInt32,
+    OP_UInt32,
+    OP_SInt64,
+    OP_UInt64,
+    OP_float,
+    OP_double,
+    OP_bool,
+    OP_string,
+    OP_TypelessData,
+    OP_vector,
+    OP_map,
+    OP_class
+};
+
+// a node compiled into an instruction,
+// the sub-nodes of a node are the instructions between it and its end
+typedef struct
+{
+    unsigned char op;
+    char align;
+    Py_ssize_t end;
+    // the size of the fixed-size instructions without their own alignment, else -1
+    Py_ssize_t size;
+    PyObject *name;
+} Instruction;
+
+typedef struct
+{
+    Py_ssize_t count;
+    Instruction instructions[];
+} Program;
+
+#define PROGRAM_CAPSULE_NAME "UnityPyBoost.TypeTreeProgram"
+
 #define kAlignBytesFlag 1 << 14
 #define kAnyChildUsesAlignBytesFlag 1 << 15
 
@@ -69,13 +120,16 @@ static PyObject *read_bool(Reader *reader);
 static PyObject *read_string(Reader *reader);
 static PyObject *read_TypelessData(Reader *reader);
 
-static read_type getReadFunction(int hash_value, int *index);
-static PyObject *getSubNodes(PyObject *nodes, int *index);
-
-static PyObject *TypeTreeHelper_ReadValue(PyObject *nodes, Reader *reader, int *index);
-static PyObject *TypeTreeHelper_ReadValueVector(PyObject *nodes, Reader *reader, int *index);
+static Program *Program_Compile(PyObject *nodes);
+static PyObject *Program_ReadValue(Program *program, Py_ssize_t index, Reader *reader);
+static PyObject *Program_ReadFields(Program *program, Py_ssize_t index, Reader *reader, PyObject *fields, char root);
+static int Program_SkipValue(Program *program, Py_ssize_t index, Reader *reader);
 
+PyObject *compile_typetree(PyObject *self, PyObject *args);
 PyObject *read_typetree(PyObject *self, PyObject *args);
+PyObject *write_typetree(PyObject *self, PyObject *args);
+
+extern PyTypeObject TypeTreeNodeType;
 
 /* implementation */
 static inline uint32_t hash_str(const char *str)
@@ -87,20 +141,6 @@ static inline uint32_t hash_str(const char *str)
     return hash;
 }
 
-static inline void initReadFuncOrNodes(PyObject *nodes, int *index, PyObject **subnodes, read_type *func, char *subalign)
-{
-    TypeTreeNodeObject *node = (TypeTreeNodeObject *)PyList_GetItem(nodes, *index);
-    *func = getReadFunction(node->typehash, index);
-    if (*func == NULL)
-    {
-        *subnodes = getSubNodes(nodes, index);
-    }
-    else
-    {
-        *subalign = (node->m_MetaFlag & kAlignBytesFlag) ? 1 : 0;
-    }
-}
-
 static inline void align4(Reader *reader)
 {
     char mod = (reader->data - reader->dataStart) % 4;
@@ -230,7 +270,10 @@ static inline PyObject *read_float(Reader *reader)
     PyObject *ret = NULL;
     if (reader->swap)
     {
-        ret = PyFloat_FromDouble((float)bswap32(*(unsigned int *)reader->data));
+        unsigned int bits = bswap32(*(unsigned int *)reader->data);
+        float value;
+        memcpy(&value, &bits, 4);
+        ret = PyFloat_FromDouble(value);
     }
     else
     {
@@ -246,7 +289,10 @@ static inline PyObject *read_double(Reader *reader)
     PyObject *ret = NULL;
     if (reader->swap)
     {
-        ret = PyFloat_FromDouble((double)bswap64(*(unsigned long long *)reader->data));
+        unsigned long long bits = bswap64(*(unsigned long long *)reader->data);
+        double value;
+        memcpy(&value, &bits, 8);
+        ret = PyFloat_FromDouble(value);
     }
     else
     {
@@ -289,229 +335,497 @@ static inline PyObject *read_TypelessData(Reader *reader)
     return value;
 }
 
-static inline read_type getReadFunction(int hash_value, int *index)
+/* read program */
+
+static inline TypeTreeNodeObject *getNode(PyObject *nodes, Py_ssize_t index)
+{
+    return (TypeTreeNodeObject *)PyList_GET_ITEM(nodes, index);
+}
+
+static const Py_ssize_t PRIMITIVE_SIZES[] = {1, 1, 2, 2, 4, 4, 8, 8, 4, 8, 1};
+
+static read_type READ_FUNCTIONS[] = {
+    read_SInt8,
+    read_UInt8,
+    read_SInt16,
+    read_UInt16,
+    read_SInt32,
+    read_UInt32,
+    read_SInt64,
+    read_UInt64,
+    read_float,
+    read_double,
+    read_bool,
+    read_string,
+    read_TypelessData};
+
+static inline int getOpcode(unsigned int hash_value)
 {
     switch (hash_value)
     {
     case HASH_SInt8:
-        return read_SInt8;
+        return OP_SInt8;
     case HASH_UInt8:
     case HASH_char:
-        return read_UInt8;
+        return OP_UInt8;
     case HASH_SInt16:
     case HASH_short:
-        return read_SInt16;
+        return OP_SInt16;
     case HASH_UInt16:
     case HASH_unsigned_short:
-        return read_UInt16;
+        return OP_UInt16;
     case HASH_SInt32:
     case HASH_int:
-        return read_SInt32;
+        return OP_SInt32;
     case HASH_UInt32:
     case HASH_unsigned_int:
     case HASH_TypePtr: // Type*
-        return read_UInt32;
+        return OP_UInt32;
     case HASH_SInt64:
     case HASH_long_long:
-        return read_SInt64;
+        return OP_SInt64;
     case HASH_UInt64:
     case HASH_unsigned_long_long:
     case HASH_FileSize:
-        return read_UInt64;
+        return OP_UInt64;
     case HASH_float:
-        return read_float;
+        return OP_float;
     case HASH_double:
-        return read_double;
+        return OP_double;
     case HASH_bool:
-        return read_bool;
+        return OP_bool;
     case HASH_string:
-        *index += 3;
-        return read_string;
+        return OP_string;
     case HASH_TypelessData:
-        *index += 2;
-        return read_TypelessData;
+        return OP_TypelessData;
+    case HASH_map:
+        return OP_map;
     default:
-        return NULL;
+        return -1;
     }
 }
 
-static PyObject *getSubNodes(PyObject *nodes, int *index)
+static void Program_Free(Program *program)
 {
-    PyObject *result = NULL;
-    TypeTreeNodeObject *node = (TypeTreeNodeObject *)PyList_GetItem(nodes, *index);
-    unsigned short level = node->m_Level;
-    for (int i = *index + 1; i < PyList_Size(nodes); i++)
+    for (Py_ssize_t i = 0; i < program->count; i++)
+        Py_XDECREF(program->instructions[i].name);
+    PyMem_Free(program);
+}
+
+static void Program_CapsuleDestructor(PyObject *capsule)
+{
+    Program_Free((Program *)PyCapsule_GetPointer(capsule, PROGRAM_CAPSULE_NAME));
+}
+
+static Program *Program_Compile(PyObject *nodes)
+{
+    if (!PyList_Check(nodes) || PyList_GET_SIZE(nodes) == 0)
+    {
+        PyErr_SetString(PyExc_TypeError, "The nodes must be a non-empty list of TypeTreeNode objects");
+        return NULL;
+    }
+    Py_ssize_t count = PyList_GET_SIZE(nodes);
+    for (Py_ssize_t i = 0; i < count; i++)
     {
-        if (((TypeTreeNodeObject *)PyList_GetItem(nodes, i))->m_Level <= level)
+        if (!PyObject_TypeCheck(PyList_GET_ITEM(nodes, i), &TypeTreeNodeType))
         {
-            result = PyList_GetSlice(nodes, *index, i);
-            *index = i - 1;
-            return result;
+            PyErr_SetString(PyExc_TypeError, "The nodes must be a non-empty list of TypeTreeNode objects");
+            return NULL;
         }
     }
-    result = PyList_GetSlice(nodes, *index, PyList_Size(nodes));
-    *index = PyList_Size(nodes) - 1;
-    return result;
+
+    Program *program = PyMem_Calloc(1, sizeof(Program) + count * sizeof(Instruction));
+    if (program == NULL)
+    {
+        PyErr_NoMemory();
+        return NULL;
+    }
+    program->count = count;
+
+    // the end of the sub-tree of each node,
+    // determined via a stack of the nodes whose sub-tree is still open
+    Py_ssize_t *stack = PyMem_Malloc(count * sizeof(Py_ssize_t));
+    if (stack == NULL)
+    {
+        PyMem_Free(program);
+        PyErr_NoMemory();
+        return NULL;
+    }
+    Py_ssize_t depth = 0;
+    for (Py_ssize_t i = 0; i < count; i++)
+    {
+        unsigned char level = getNode(nodes, i)->m_Level;
+        while (depth > 0 && getNode(nodes, stack[depth - 1])->m_Level >= level)
+            program->instructions[stack[--depth]].end = i;
+        stack[depth++] = i;
+    }
+    while (depth > 0)
+        program->instructions[stack[--depth]].end = count;
+    PyMem_Free(stack);
+
+    for (Py_ssize_t i = 0; i < count; i++)
+    {
+        TypeTreeNodeObject *node = getNode(nodes, i);
+        Instruction *ins = &program->instructions[i];
+        ins->align = (node->m_MetaFlag & kAlignBytesFlag) ? 1 : 0;
+        int op = getOpcode(node->typehash);
+        if (op == OP_map || (op == -1 && i + 1 < count && strcmp(getNode(nodes, i + 1)->m_Type, "Array") == 0))
+        {
+            if (op == -1)
+                op = OP_vector;
+            // vector: self, Array, size, data
+            // map: self, Array, size, pair, first, second
+            // checked first, as the Array node is accessed below
+            Py_ssize_t data = i + (op == OP_map ? 4 : 3);
+            if (i + 1 >= count || data >= ins->end || (op == OP_map && program->instructions[data].end >= ins->end))
+            {
+                PyErr_Format(PyExc_ValueError, "Invalid %s node at index %zd", node->m_Type, i);
+                Program_Free(program);
+                return NULL;
+            }
+            if (getNode(nodes, i + 1)->m_MetaFlag & kAlignBytesFlag)
+                ins->align = 1;
+        }
+        else if (op == -1)
+        {
+            op = OP_class;
+        }
+        ins->op = (unsigned char)op;
+        ins->name = PyUnicode_DecodeUTF8(node->m_Name, strlen(node->m_Name), SURROGATEESCAPE);
+        if (ins->name == NULL)
+        {
+            Program_Free(program);
+            return NULL;
+        }
+        PyUnicode_InternInPlace(&ins->name);
+    }
+
+    for (Py_ssize_t i = count - 1; i >= 0; i--)
+    {
+        Instruction *ins = &program->instructions[i];
+        ins->size = -1;
+        if (ins->op < OP_string)
+        {
+            ins->size = PRIMITIVE_SIZES[ins->op];
+        }
+        else if (ins->op == OP_class)
+        {
+            // sub-instructions with an alignment make the size variable
+            Py_ssize_t size = 0;
+            for (Py_ssize_t j = i + 1; j < ins->end; j = program->instructions[j].end)
+            {
+                Instruction *sub = &program->instructions[j];
+                if (sub->size < 0 || sub->align)
+                {
+                    size = -1;
+                    break;
+                }
+                size += sub->size;
+            }
+            ins->size = size;
+        }
+    }
+    return program;
 }
 
-static inline int PyDict_SetItemString_Safe(PyObject *dict, const char *key, PyObject *value)
+static inline int reader_skip(Reader *reader, Py_ssize_t length)
 {
-    int ret = PyDict_SetItemString(dict, key, value);
-    // SetItemString increases the ref count
-    // so we have to decrease it here again
-    // so that the value will be destroyed with the dict
-    Py_XDECREF(value);
-    return ret;
+    if (length < 0 || reader->data + length > reader->dataEnd)
+    {
+        PyErr_Format(PyExc_ValueError, "Can't skip %zd bytes at position %zd of %zd", length, (Py_ssize_t)(reader->data - reader->dataStart), (Py_ssize_t)(reader->dataEnd - reader->dataStart));
+        return -1;
+    }
+    reader->data += length;
+    return 0;
 }
 
-static inline int PyList_SetItem_Safe(PyObject *list, int i, PyObject *value)
+static inline int reader_skip_length(Reader *reader, int *length)
 {
-    int ret = PyList_SetItem(list, i, value);
-    // SetItem increases the ref count
-    // so we have to decrease it here again
-    // so that the value will be destroyed with the list
-    // Py_XDECREF(value);
-    return ret;
+    if (reader->data + 4 > reader->dataEnd)
+    {
+        PyErr_Format(PyExc_ValueError, "Can't read 4 bytes at position %zd of %zd", (Py_ssize_t)(reader->data - reader->dataStart), (Py_ssize_t)(reader->dataEnd - reader->dataStart));
+        return -1;
+    }
+    *length = read_length(reader);
+    if (*length < 0)
+    {
+        PyErr_Format(PyExc_ValueError, "Invalid length %d", *length);
+        return -1;
+    }
+    return 0;
 }
 
-static PyObject *TypeTreeHelper_ReadValue(PyObject *nodes, Reader *reader, int *index)
+// reads a vector of primitives as array via the as_array converter,
+// the array is created from a memoryview of the data
+static PyObject *read_array(Reader *reader, int size, unsigned char op)
 {
-    if (*index >= PyList_Size(nodes))
-    {
-        PyErr_SetString(PyExc_RuntimeError, "index out of range");
+    Py_ssize_t start = reader->data - reader->dataStart;
+    Py_ssize_t length = size * PRIMITIVE_SIZES[op];
+    if (reader_skip(reader, length) < 0)
         return NULL;
-    }
-    TypeTreeNodeObject *node = (TypeTreeNodeObject *)PyList_GetItem(nodes, *index);
-    PyObject *value = NULL;
-    int sub_index = 0;
+    PyObject *data = PySequence_GetSlice(reader->view, start, start + length);
+    if (data == NULL)
+        return NULL;
+    PyObject *value = PyObject_CallFunction(reader->as_array, "Oi", data, (int)op);
+    Py_DECREF(data);
+    return value;
+}
 
-    char align = (node->m_MetaFlag & kAlignBytesFlag) ? 1 : 0;
-    // printf("RVa: %d\t%lld\t%s\t%s\t%d\t%d\n", *index, (reader->data - reader->dataStart), node->m_Name, node->m_Type, align, node->m_MetaFlag);
+static PyObject *Program_ReadValue(Program *program, Py_ssize_t index, Reader *reader)
+{
+    Instruction *ins = &program->instructions[index];
+    PyObject *value = NULL;
 
-    int hash_value = node->typehash;
-    read_type func = getReadFunction(hash_value, index);
-    if (func)
+    if (ins->op < OP_vector)
+    {
+        value = READ_FUNCTIONS[ins->op](reader);
+        if (value == NULL)
+            return NULL;
+    }
+    else if (ins->op == OP_class && reader->node_factories != NULL && PyTuple_GET_ITEM(reader->node_factories, index) != Py_None)
+    {
+        // the struct is created via factory(context, *values)
+        Py_ssize_t count = 1;
+        Py_ssize_t j = index + 1;
+        while (j < ins->end)
+        {
+            count++;
+            j = program->instructions[j].end;
+        }
+        PyObject *args = PyTuple_New(count);
+        if (args == NULL)
+            return NULL;
+        Py_INCREF(reader->context);
+        PyTuple_SET_ITEM(args, 0, reader->context);
+        count = 1;
+        j = index + 1;
+        while (j < ins->end)
+        {
+            PyObject *j_value = Program_ReadValue(program, j, reader);
+            if (j_value == NULL)
+            {
+                Py_DECREF(args);
+                return NULL;
+            }
+            PyTuple_SET_ITEM(args, count++, j_value);
+            j = program->instructions[j].end;
+        }
+        value = PyObject_Call(PyTuple_GET_ITEM(reader->node_factories, index), args, NULL);
+        Py_DECREF(args);
+        if (value == NULL)
+            return NULL;
+    }
+    else if (ins->op == OP_class)
     {
-        value = func(reader);
+        value = PyDict_New();
+        if (value == NULL)
+            return NULL;
+        Py_ssize_t j = index + 1;
+        while (j < ins->end)
+        {
+            PyObject *j_value = Program_ReadValue(program, j, reader);
+            if (j_value == NULL || PyDict_SetItem(value, program->instructions[j].name, j_value) < 0)
+            {
+                Py_XDECREF(j_value);
+                Py_DECREF(value);
+                return NULL;
+            }
+            Py_DECREF(j_value);
+            j = program->instructions[j].end;
+        }
     }
     else
     {
-        if (hash_value == HASH_map)
-        {
-            TypeTreeNodeObject *node2 = (TypeTreeNodeObject *)PyList_GetItem(nodes, *index + 1);
-            if (node2->m_MetaFlag & kAlignBytesFlag)
-                align = 1;
-
-            CHECK_LENGTH(reader, 4);
-            int size = read_length(reader);
-
-            *index += 4; // skip self, Array, size, pair
-            PyObject *first_nodes = NULL;
-            read_type first_func = NULL;
-            char firstalign = 0;
-            initReadFuncOrNodes(nodes, index, &first_nodes, &first_func, &firstalign);
-            *index += 1; // move to start of second
-            PyObject *second_nodes = NULL;
-            read_type second_func = NULL;
-            char secondalign = 0;
-            initReadFuncOrNodes(nodes, index, &second_nodes, &second_func, &secondalign);
-
-            value = PyList_New(size);
-            PyObject *first;
-            PyObject *second;
+        CHECK_LENGTH(reader, 4);
+        int size = read_length(reader);
+        if (size < 0)
+        {
+            PyErr_Format(PyExc_ValueError, "Invalid %s size %d", ins->op == OP_map ? "map" : "vector", size);
+            return NULL;
+        }
+        if (ins->op == OP_vector && reader->as_array)
+        {
+            Instruction *data_ins = &program->instructions[index + 3];
+            if (data_ins->op <= OP_bool && !data_ins->align)
+            {
+                value = read_array(reader, size, data_ins->op);
+                if (value == NULL)
+                    return NULL;
+                if (ins->align)
+                    align4(reader);
+                return value;
+            }
+        }
+        value = PyList_New(size);
+        if (value == NULL)
+            return NULL;
+
+        if (ins->op == OP_vector)
+        {
+            Py_ssize_t data = index + 3; // skip self, Array, size
+            Instruction *data_ins = &program->instructions[data];
+            // primitive elements are read directly
+            read_type func = (data_ins->op < OP_vector) ? READ_FUNCTIONS[data_ins->op] : NULL;
             for (int i = 0; i < size; i++)
             {
-                sub_index = 0;
-                first = (first_func) ? first_func(reader) : TypeTreeHelper_ReadValue(first_nodes, reader, &sub_index);
-                if (first == NULL)
+                PyObject *item = (func) ? func(reader) : Program_ReadValue(program, data, reader);
+                if (item == NULL)
                 {
-                    Py_XDECREF(value);
+                    Py_DECREF(value);
                     return NULL;
                 }
-                if (firstalign)
+                if (func && data_ins->align)
                     align4(reader);
-                sub_index = 0;
-                second = (second_func) ? second_func(reader) : TypeTreeHelper_ReadValue(second_nodes, reader, &sub_index);
-                if (second == NULL)
+                PyList_SET_ITEM(value, i, item);
+            }
+        }
+        else // map
+        {
+            Py_ssize_t first = index + 4; // skip self, Array, size, pair
+            Py_ssize_t second = program->instructions[first].end;
+            for (int i = 0; i < size; i++)
+            {
+                PyObject *first_value = Program_ReadValue(program, first, reader);
+                if (first_value == NULL)
                 {
-                    Py_XDECREF(first);
-                    Py_XDECREF(second);
+                    Py_DECREF(value);
                     return NULL;
                 }
-                if (secondalign)
-                    align4(reader);
-                PyList_SetItem(value, i, PyTuple_Pack(2, first, second));
-                Py_XDECREF(first);
-                Py_XDECREF(second);
+                PyObject *second_value = Program_ReadValue(program, second, reader);
+                if (second_value == NULL)
+                {
+                    Py_DECREF(first_value);
+                    Py_DECREF(value);
+                    return NULL;
+                }
+                PyObject *pair = PyTuple_Pack(2, first_value, second_value);
+                Py_DECREF(first_value);
+                Py_DECREF(second_value);
+                if (pair == NULL)
+                {
+                    Py_DECREF(value);
+                    return NULL;
+                }
+                PyList_SET_ITEM(value, i, pair);
             }
-            Py_XDECREF(first_nodes);
-            Py_XDECREF(second_nodes);
+        }
+    }
+
+    if (ins->align)
+        align4(reader);
+    return value;
+}
+
+static int Program_SkipValue(Program *program, Py_ssize_t index, Reader *reader)
+{
+    Instruction *ins = &program->instructions[index];
+    int size = 0;
+
+    if (ins->size >= 0)
+    {
+        if (reader_skip(reader, ins->size) < 0)
+            return -1;
+    }
+    else if (ins->op == OP_string || ins->op == OP_TypelessData)
+    {
+        if (reader_skip_length(reader, &size) < 0 || reader_skip(reader, size) < 0)
+            return -1;
+        if (ins->op == OP_string)
+            align4(reader);
+    }
+    else if (ins->op == OP_vector)
+    {
+        if (reader_skip_length(reader, &size) < 0)
+            return -1;
+        Py_ssize_t data = index + 3; // skip self, Array, size
+        Instruction *data_ins = &program->instructions[data];
+        if (data_ins->size >= 0 && !data_ins->align)
+        {
+            if (reader_skip(reader, size * data_ins->size) < 0)
+                return -1;
         }
         else
         {
-            if (*index+1 >= PyList_Size(nodes))
-            {
-                // end of nodes reached,
-                // so an empty class is returned
-                return PyDict_New();
-            }
-            TypeTreeNodeObject *node2 = (TypeTreeNodeObject *)PyList_GetItem(nodes, *index + 1);
-            if (strcmp(node2->m_Type, "Array") == 0)
+            for (int i = 0; i < size; i++)
             {
-                if (node2->m_MetaFlag & kAlignBytesFlag)
-                    align = 1;
-                *index += 3; // skip self, Array, size
-                PyObject *vector_nodes = NULL;
-                read_type vector_func = NULL;
-                char subalign = 0;
-                initReadFuncOrNodes(nodes, index, &vector_nodes, &vector_func, &subalign);
-
-                int size = read_length(reader);
-                value = PyList_New(size);
-                for (int i = 0; i < size; i++)
-                {
-                    int sub_index = 0;
-                    PyObject *vector_value = (vector_func) ? vector_func(reader) : TypeTreeHelper_ReadValue(vector_nodes, reader, &sub_index);
-                    if (vector_value == NULL)
-                    {
-                        Py_XDECREF(value);
-                        return NULL;
-                    }
-                    if (subalign)
-                        align4(reader);
-                    PyList_SetItem_Safe(value, i, vector_value);
-                }
-                Py_XDECREF(vector_nodes);
+                if (Program_SkipValue(program, data, reader) < 0)
+                    return -1;
             }
-            else // Class
+        }
+    }
+    else if (ins->op == OP_map)
+    {
+        if (reader_skip_length(reader, &size) < 0)
+            return -1;
+        Py_ssize_t first = index + 4; // skip self, Array, size, pair
+        Py_ssize_t second = program->instructions[first].end;
+        for (int i = 0; i < size; i++)
+        {
+            if (Program_SkipValue(program, first, reader) < 0 || Program_SkipValue(program, second, reader) < 0)
+                return -1;
+        }
+    }
+    else // class
+    {
+        for (Py_ssize_t j = index + 1; j < ins->end; j = program->instructions[j].end)
+        {
+            if (Program_SkipValue(program, j, reader) < 0)
+                return -1;
+        }
+    }
+
+    if (ins->align)
+        align4(reader);
+    return 0;
+}
+
+// reads only the given fields of a class,
+// fields is a dict of name -> dict of the sub-fields or None for the whole field
+static PyObject *Program_ReadFields(Program *program, Py_ssize_t index, Reader *reader, PyObject *fields, char root)
+{
+    Instruction *ins = &program->instructions[index];
+    Py_ssize_t remaining = PyDict_GET_SIZE(fields);
+    PyObject *value = PyDict_New();
+    if (value == NULL)
+        return NULL;
+
+    for (Py_ssize_t j = index + 1; j < ins->end; j = program->instructions[j].end)
+    {
+        Instruction *sub = &program->instructions[j];
+        PyObject *sub_fields = PyDict_GetItemWithError(fields, sub->name);
+        if (sub_fields == NULL)
+        {
+            if (PyErr_Occurred() || Program_SkipValue(program, j, reader) < 0)
             {
-                PyObject *cls_nodes = getSubNodes(nodes, index);
-                int j = 1;
-                value = PyDict_New();
-                char *j_name = NULL;
-                while (j < PyList_Size(cls_nodes))
-                {
-                    j_name = ((TypeTreeNodeObject *)PyList_GetItem(cls_nodes, j))->m_Name;
-                    PyObject *j_value = TypeTreeHelper_ReadValue(cls_nodes, reader, &j);
-                    if (j_value == NULL)
-                    {
-                        Py_XDECREF(value);
-                        return NULL;
-                    }
-                    PyDict_SetItemString_Safe(value, j_name, j_value);
-                    j++;
-                }
-                Py_XDECREF(cls_nodes);
+                Py_DECREF(value);
+                return NULL;
             }
+            continue;
+        }
+
+        PyObject *j_value = NULL;
+        if (sub->op == OP_class && PyDict_Check(sub_fields))
+            j_value = Program_ReadFields(program, j, reader, sub_fields, 0);
+        else
+            j_value = Program_ReadValue(program, j, reader);
+        if (j_value == NULL || PyDict_SetItem(value, sub->name, j_value) < 0)
+        {
+            Py_XDECREF(j_value);
+            Py_DECREF(value);
+            return NULL;
         }
+        Py_DECREF(j_value);
+        // the rest of the object doesn't have to be read
+        if (--remaining == 0 && root)
+            return value;
     }
 
-    if (align)
+    if (ins->align)
         align4(reader);
     return value;
 }
 
-static PyObject *TypeTreeHelper_ReadTypeTree(PyObject *nodes, PyObject *buf, char swap)
+static PyObject *TypeTreeHelper_ReadTypeTree(Program *program, PyObject *buf, char swap, PyObject *fields, PyObject *as_array, PyObject *node_factories, PyObject *context)
 {
     Py_buffer view;
     if (Py_TYPE(buf)->tp_as_buffer && Py_TYPE(buf)->tp_as_buffer->bf_releasebuffer)
@@ -542,47 +856,70 @@ static PyObject *TypeTreeHelper_ReadTypeTree(PyObject *nodes, PyObject *buf, cha
         .dataStart = (char *)view.buf,
         .dataEnd = (char *)view.buf + view.len,
         .swap = swap,
-        .obj = buf};
+        .obj = buf,
+        .view = NULL,
+        .as_array = as_array,
+        .node_factories = node_factories,
+        .context = context};
 
     PyBuffer_Release(&view);
 
-    int index = 0;
-    PyObject *result = TypeTreeHelper_ReadValue(nodes, &reader, &index);
+    if (as_array != NULL)
+    {
+        // the arrays are read-only views on the data,
+        // as the data may be shared with other objects
+        PyObject *view_obj = PyMemoryView_FromObject(buf);
+        if (view_obj == NULL)
+        {
+            Py_DECREF(buf);
+            return NULL;
+        }
+        reader.view = PyObject_CallMethod(view_obj, "toreadonly", NULL);
+        Py_DECREF(view_obj);
+        if (reader.view == NULL)
+        {
+            Py_DECREF(buf);
+            return NULL;
+        }
+    }
+
+    PyObject *result = NULL;
+    if (fields != NULL && program->instructions[0].op == OP_class)
+        result = Program_ReadFields(program, 0, &reader, fields, 1);
+    else
+        result = Program_ReadValue(program, 0, &reader);
 
+    Py_XDECREF(reader.view);
     Py_DECREF(buf);
 
     return result;
 }
 
-PyObject *read_typetree(PyObject *self, PyObject *args)
+static int parse_endian(PyObject *endian_obj, char *swap)
 {
-    PyObject *nodes = PyTuple_GetItem(args, 0);
-    PyObject *buf = PyTuple_GetItem(args, 1);
-    PyObject *swap_obj = PyTuple_GetItem(args, 2);
-    char swap = 0;
-
-    if (!PyUnicode_Check(swap_obj))
+    *swap = 0;
+    if (!PyUnicode_Check(endian_obj))
     {
         PyErr_SetString(PyExc_TypeError,
                         "The endian attribute value must be a string");
-        return NULL;
+        return -1;
     }
-    if (PyUnicode_GET_LENGTH(swap_obj) != 1)
+    if (PyUnicode_GET_LENGTH(endian_obj) != 1)
     {
         PyErr_SetString(PyExc_TypeError,
                         "The endian attribute value must be a string of size 1");
-        return NULL;
+        return -1;
     }
-    char endian = *(char *)PyUnicode_DATA(swap_obj);
+    char endian = *(char *)PyUnicode_DATA(endian_obj);
     switch (endian)
     {
     case '<':
         if (IS_LITTLE_ENDIAN == 0)
-            swap = 1;
+            *swap = 1;
         break;
     case '>':
         if (IS_LITTLE_ENDIAN == 1)
-            swap = 1;
+            *swap = 1;
         break;
     case '=':
     case '|':
@@ -591,10 +928,988 @@ PyObject *read_typetree(PyObject *self, PyObject *args)
     {
         PyErr_SetString(PyExc_TypeError,
                         "The endian attribute value must be one of '>', '<', '=', '|'");
+        return -1;
+    }
+    }
+    return 0;
+}
+
+PyObject *compile_typetree(PyObject *self, PyObject *args)
+{
+    PyObject *nodes = NULL;
+    if (!PyArg_ParseTuple(args, "O", &nodes))
+        return NULL;
+
+    Program *program = Program_Compile(nodes);
+    if (program == NULL)
+        return NULL;
+    PyObject *capsule = PyCapsule_New(program, PROGRAM_CAPSULE_NAME, Program_CapsuleDestructor);
+    if (capsule == NULL)
+        Program_Free(program);
+    return capsule;
+}
+
+PyObject *read_typetree(PyObject *self, PyObject *args)
+{
+    PyObject *nodes = NULL;
+    PyObject *buf = NULL;
+    PyObject *swap_obj = NULL;
+    PyObject *fields = Py_None;
+    PyObject *as_array = Py_None;
+    PyObject *node_factories = Py_None;
+    PyObject *context = Py_None;
+    char swap = 0;
+
+    if (!PyArg_ParseTuple(args, "OOO|OOOO", &nodes, &buf, &swap_obj, &fields, &as_array, &node_factories, &context))
+        return NULL;
+    if (parse_endian(swap_obj, &swap) < 0)
+        return NULL;
+    // the parsed field paths of a projected read
+    if (fields == Py_None)
+    {
+        fields = NULL;
+    }
+    else if (!PyDict_Check(fields))
+    {
+        PyErr_SetString(PyExc_TypeError, "The fields must be a dict of the field names and their sub-fields");
+        return NULL;
+    }
+    // the converter of primitive vectors into arrays
+    if (as_array == Py_None)
+    {
+        as_array = NULL;
+    }
+    else if (!PyCallable_Check(as_array))
+    {
+        PyErr_SetString(PyExc_TypeError, "as_array must be callable");
+        return NULL;
+    }
+    // the factories of the structs, checked against the program below
+    if (node_factories == Py_None)
+    {
+        node_factories = NULL;
+    }
+    else if (!PyTuple_Check(node_factories))
+    {
+        PyErr_SetString(PyExc_TypeError, "The node factories must be a tuple");
         return NULL;
     }
+
+    // either a program compiled via compile_typetree or the node list
+    Program *program = NULL;
+    int compiled = PyCapsule_IsValid(nodes, PROGRAM_CAPSULE_NAME);
+    if (compiled)
+        program = (Program *)PyCapsule_GetPointer(nodes, PROGRAM_CAPSULE_NAME);
+    else
+    {
+        program = Program_Compile(nodes);
+        if (program == NULL)
+            return NULL;
+    }
+
+    PyObject *result = NULL;
+    if (node_factories != NULL && PyTuple_GET_SIZE(node_factories) != program->count)
+        PyErr_SetString(PyExc_ValueError, "The node factories don't match the nodes");
+    else
+        result = TypeTreeHelper_ReadTypeTree(program, buf, swap, fields, as_array, node_factories, context);
+
+    if (!compiled)
+        Program_Free(program);
+    return result;
+}
+
+/* writer */
+
+typedef struct
+{
+    char *data;
+    Py_ssize_t size;
+    Py_ssize_t capacity;
+    char swap;
+} Writer;
+
+static int writer_reserve(Writer *writer, Py_ssize_t length)
+{
+    if (writer->size + length <= writer->capacity)
+        return 0;
+    Py_ssize_t capacity = writer->capacity ? writer->capacity : 256;
+    while (capacity < writer->size + length)
+        capacity *= 2;
+    char *data = PyMem_Realloc(writer->data, capacity);
+    if (data == NULL)
+    {
+        PyErr_NoMemory();
+        return -1;
     }
-    return TypeTreeHelper_ReadTypeTree(nodes, buf, swap);
+    writer->data = data;
+    writer->capacity = capacity;
+    return 0;
+}
+
+static inline int writer_write(Writer *writer, const void *value, Py_ssize_t length)
+{
+    if (writer_reserve(writer, length) < 0)
+        return -1;
+    memcpy(writer->data + writer->size, value, length);
+    writer->size += length;
+    return 0;
+}
+
+static inline int writer_align4(Writer *writer)
+{
+    Py_ssize_t pad = (4 - writer->size % 4) % 4;
+    if (pad == 0)
+        return 0;
+    if (writer_reserve(writer, pad) < 0)
+        return -1;
+    memset(writer->data + writer->size, 0, pad);
+    writer->size += pad;
+    return 0;
+}
+
+static inline int write_u16(Writer *writer, unsigned short value)
+{
+    if (writer->swap)
+        value = bswap16(value);
+    return writer_write(writer, &value, 2);
+}
+
+static inline int write_u32(Writer *writer, unsigned int value)
+{
+    if (writer->swap)
+        value = bswap32(value);
+    return writer_write(writer, &value, 4);
+}
+
+static inline int write_u64(Writer *writer, unsigned long long value)
+{
+    if (writer->swap)
+        value = bswap64(value);
+    return writer_write(writer, &value, 8);
+}
+
+static int write_integer(Writer *writer, PyObject *value, unsigned char op)
+{
+    if (op == OP_UInt64)
+    {
+        unsigned long long v = PyLong_AsUnsignedLongLong(value);
+        if (v == (unsigned long long)-1 && PyErr_Occurred())
+            return -1;
+        return write_u64(writer, v);
+    }
+
+    long long v = PyLong_AsLongLong(value);
+    if (v == -1 && PyErr_Occurred())
+        return -1;
+
+    long long min, max;
+    switch (op)
+    {
+    case OP_SInt8:
+        min = -128, max = 127;
+        break;
+    case OP_UInt8:
+        min = 0, max = 255;
+        break;
+    case OP_SInt16:
+        min = -32768, max = 32767;
+        break;
+    case OP_UInt16:
+        min = 0, max = 65535;
+        break;
+    case OP_SInt32:
+        min = -2147483648LL, max = 2147483647LL;
+        break;
+    case OP_UInt32:
+        min = 0, max = 4294967295LL;
+        break;
+    default: // SInt64
+        min = LLONG_MIN, max = LLONG_MAX;
+        break;
+    }
+    int size = (int)PRIMITIVE_SIZES[op];
+    if (v < min || v > max)
+    {
+        PyErr_Format(PyExc_OverflowError, "%lld is out of range for a %d byte value", v, size);
+        return -1;
+    }
+    switch (size)
+    {
+    case 1:
+    {
+        char c = (char)v;
+        return writer_write(writer, &c, 1);
+    }
+    case 2:
+        return write_u16(writer, (unsigned short)v);
+    case 4:
+        return write_u32(writer, (unsigned int)v);
+    default:
+        return write_u64(writer, (unsigned long long)v);
+    }
+}
+
+static int write_length(Writer *writer, Py_ssize_t length)
+{
+    if (length > INT_MAX)
+    {
+        PyErr_SetString(PyExc_OverflowError, "length is too big for an int");
+        return -1;
+    }
+    return write_u32(writer, (unsigned int)length);
+}
+
+static int write_string(Writer *writer, PyObject *value)
+{
+    if (!PyUnicode_Check(value))
+    {
+        PyErr_Format(PyExc_TypeError, "string value expected, got %s", Py_TYPE(value)->tp_name);
+        return -1;
+    }
+    PyObject *encoded = PyUnicode_AsEncodedString(value, "utf-8", SURROGATEESCAPE);
+    if (encoded == NULL)
+        return -1;
+    Py_ssize_t length = PyBytes_GET_SIZE(encoded);
+    int ret = (write_length(writer, length) < 0 ||
+               writer_write(writer, PyBytes_AS_STRING(encoded), length) < 0 ||
+               writer_align4(writer) < 0)
+                  ? -1
+                  : 0;
+    Py_DECREF(encoded);
+    return ret;
+}
+
+static int write_TypelessData(Writer *writer, PyObject *value)
+{
+    Py_buffer view;
+    if (PyObject_GetBuffer(value, &view, PyBUF_SIMPLE) < 0)
+        return -1;
+    int ret = (write_length(writer, view.len) < 0 ||
+               writer_write(writer, view.buf, view.len) < 0)
+                  ? -1
+                  : 0;
+    PyBuffer_Release(&view);
+    return ret;
+}
+
+// checks if the buffer format matches the primitive opcode,
+// only the native byte order is accepted
+static int format_matches(const char *format, int op)
+{
+    if (format == NULL)
+        format = "B";
+    switch (*format)
+    {
+    case '@':
+    case '=':
+        format++;
+        break;
+    case '<':
+        if (IS_LITTLE_ENDIAN == 0)
+            return 0;
+        format++;
+        break;
+    case '>':
+    case '!':
+        if (IS_LITTLE_ENDIAN == 1)
+            return 0;
+        format++;
+        break;
+    }
+    if (format[0] == '\0' || format[1] != '\0')
+        return 0;
+    switch (op)
+    {
+    case OP_SInt8:
+    case OP_SInt16:
+    case OP_SInt32:
+    case OP_SInt64:
+        return strchr("bhilqn", format[0]) != NULL;
+    case OP_UInt8:
+    case OP_UInt16:
+    case OP_UInt32:
+    case OP_UInt64:
+        return strchr("BHILQN", format[0]) != NULL;
+    case OP_float:
+    case OP_double:
+        return strchr("fd", format[0]) != NULL;
+    case OP_bool:
+        return format[0] == '?';
+    default:
+        return 0;
+    }
+}
+
+// writes a vector of primitives from an object supporting the buffer protocol,
+// e.g. a NumPy array or a typed memoryview, at once
+// returns 1 if it was written, 0 if the elements have to be written one by one and -1 on errors
+static int write_array(Writer *writer, PyObject *value, Instruction *ins)
+{
+    unsigned char op = ins->op;
+    if (op > OP_bool || ins->align || !PyObject_CheckBuffer(value))
+        return 0;
+
+    Py_buffer view;
+    if (PyObject_GetBuffer(value, &view, PyBUF_FORMAT | PyBUF_C_CONTIGUOUS) < 0)
+    {
+        PyErr_Clear();
+        return 0;
+    }
+    Py_ssize_t itemsize = PRIMITIVE_SIZES[op];
+    if (view.ndim != 1 || view.itemsize != itemsize || !format_matches(view.format, op))
+    {
+        PyBuffer_Release(&view);
+        return 0;
+    }
+
+    Py_ssize_t start = writer->size;
+    if (write_length(writer, view.shape[0]) < 0 || writer_write(writer, view.buf, view.len) < 0)
+    {
+        PyBuffer_Release(&view);
+        return -1;
+    }
+    PyBuffer_Release(&view);
+
+    if (writer->swap && itemsize > 1)
+    {
+        for (char *item = writer->data + start + 4; item < writer->data + writer->size; item += itemsize)
+        {
+            switch (itemsize)
+            {
+            case 2:
+            {
+                unsigned short v;
+                memcpy(&v, item, 2);
+                v = bswap16(v);
+                memcpy(item, &v, 2);
+                break;
+            }
+            case 4:
+            {
+                unsigned int v;
+                memcpy(&v, item, 4);
+                v = bswap32(v);
+                memcpy(item, &v, 4);
+                break;
+            }
+            default:
+            {
+                unsigned long long v;
+                memcpy(&v, item, 8);
+                v = bswap64(v);
+                memcpy(item, &v, 8);
+                break;
+            }
+            }
+        }
+    }
+    return 1;
+}
+
+static int Program_WriteValue(Program *program, Py_ssize_t index, PyObject *value, Writer *writer);
+
+// writes the fields of a struct, the instructions in [start, end) are its fields
+static int Program_WriteClass(Program *program, Py_ssize_t start, Py_ssize_t end, PyObject *value, Writer *writer)
+{
+    for (Py_ssize_t j = start; j < end; j = program->instructions[j].end)
+    {
+        PyObject *item = PyObject_GetItem(value, program->instructions[j].name);
+        if (item == NULL)
+            return -1;
+        int ret = Program_WriteValue(program, j, item, writer);
+        Py_DECREF(item);
+        if (ret < 0)
+            return -1;
+    }
+    return 0;
+}
+
+static int Program_WriteValue(Program *program, Py_ssize_t index, PyObject *value, Writer *writer)
+{
+    Instruction *ins = &program->instructions[index];
+
+    switch (ins->op)
+    {
+    case OP_SInt8:
+    case OP_UInt8:
+    case OP_SInt16:
+    case OP_UInt16:
+    case OP_SInt32:
+    case OP_UInt32:
+    case OP_SInt64:
+    case OP_UInt64:
+        if (write_integer(writer, value, ins->op) < 0)
+            return -1;
+        break;
+    case OP_float:
+    {
+        double d = PyFloat_AsDouble(value);
+        if (d == -1.0 && PyErr_Occurred())
+            return -1;
+        if (isfinite(d) && fabs(d) > FLT_MAX)
+        {
+            PyErr_SetString(PyExc_OverflowError, "float too large to pack with f format");
+            return -1;
+        }
+        float f = (float)d;
+        unsigned int v;
+        memcpy(&v, &f, 4);
+        if (write_u32(writer, v) < 0)
+            return -1;
+        break;
+    }
+    case OP_double:
+    {
+        double d = PyFloat_AsDouble(value);
+        if (d == -1.0 && PyErr_Occurred())
+            return -1;
+        unsigned long long v;
+        memcpy(&v, &d, 8);
+        if (write_u64(writer, v) < 0)
+            return -1;
+        break;
+    }
+    case OP_bool:
+    {
+        int truth = PyObject_IsTrue(value);
+        if (truth < 0)
+            return -1;
+        char c = (char)truth;
+        if (writer_write(writer, &c, 1) < 0)
+            return -1;
+        break;
+    }
+    case OP_string:
+        if (write_string(writer, value) < 0)
+            return -1;
+        break;
+    case OP_TypelessData:
+        if (write_TypelessData(writer, value) < 0)
+            return -1;
+        break;
+    case OP_map:
+    {
+        // skip self, Array, size, pair
+        Py_ssize_t first = index + 4;
+        Py_ssize_t second = program->instructions[first].end;
+
+        PyObject *seq = PySequence_Fast(value, "map value must be a sequence of pairs");
+        if (seq == NULL)
+            return -1;
+        Py_ssize_t size = PySequence_Fast_GET_SIZE(seq);
+        if (write_length(writer, size) < 0)
+        {
+            Py_DECREF(seq);
+            return -1;
+        }
+        for (Py_ssize_t i = 0; i < size; i++)
+        {
+            PyObject *pair = PySequence_Fast(PySequence_Fast_GET_ITEM(seq, i), "map item must be a pair");
+            if (pair == NULL)
+            {
+                Py_DECREF(seq);
+                return -1;
+            }
+            if (PySequence_Fast_GET_SIZE(pair) != 2)
+            {
+                PyErr_SetString(PyExc_ValueError, "map item must be a pair");
+                Py_DECREF(pair);
+                Py_DECREF(seq);
+                return -1;
+            }
+            int ret = Program_WriteValue(program, first, PySequence_Fast_GET_ITEM(pair, 0), writer);
+            if (ret == 0)
+                ret = Program_WriteValue(program, second, PySequence_Fast_GET_ITEM(pair, 1), writer);
+            Py_DECREF(pair);
+            if (ret < 0)
+            {
+                Py_DECREF(seq);
+                return -1;
+            }
+        }
+        Py_DECREF(seq);
+        break;
+    }
+    case OP_vector:
+    {
+        // skip self, Array, size
+        Py_ssize_t data = index + 3;
+        // arrays of primitives are written at once
+        int written = write_array(writer, value, &program->instructions[data]);
+        if (written < 0)
+            return -1;
+        if (!written)
+        {
+            PyObject *seq = PySequence_Fast(value, "vector value must be a sequence");
+            if (seq == NULL)
+                return -1;
+            Py_ssize_t size = PySequence_Fast_GET_SIZE(seq);
+            if (write_length(writer, size) < 0)
+            {
+                Py_DECREF(seq);
+                return -1;
+            }
+            for (Py_ssize_t i = 0; i < size; i++)
+            {
+                if (Program_WriteValue(program, data, PySequence_Fast_GET_ITEM(seq, i), writer) < 0)
+                {
+                    Py_DECREF(seq);
+                    return -1;
+                }
+            }
+            Py_DECREF(seq);
+        }
+        break;
+    }
+    default: // class
+        if (Program_WriteClass(program, index + 1, ins->end, value, writer) < 0)
+            return -1;
+        break;
+    }
+
+    if (ins->align && writer_align4(writer) < 0)
+        return -1;
+    return 0;
+}
+
+PyObject *write_typetree(PyObject *self, PyObject *args)
+{
+    PyObject *value = NULL;
+    PyObject *nodes = NULL;
+    PyObject *endian = NULL;
+    if (!PyArg_ParseTuple(args, "OOO", &value, &nodes, &endian))
+        return NULL;
+
+    Writer writer = {
+        .data = NULL,
+        .size = 0,
+        .capacity = 0,
+        .swap = 0};
+    if (parse_endian(endian, &writer.swap) < 0)
+        return NULL;
+
+    // either a program compiled via compile_typetree or the node list
+    Program *program = NULL;
+    int compiled = PyCapsule_IsValid(nodes, PROGRAM_CAPSULE_NAME);
+    if (compiled)
+        program = (Program *)PyCapsule_GetPointer(nodes, PROGRAM_CAPSULE_NAME);
+    else
+    {
+        program = Program_Compile(nodes);
+        if (program == NULL)
+            return NULL;
+    }
+
+    // the root node is the class of the value
+    PyObject *result = NULL;
+    if (Program_WriteClass(program, 1, program->count, value, &writer) == 0)
+        result = PyBytes_FromStringAndSize(writer.data, writer.size);
+    PyMem_Free(writer.data);
+    if (!compiled)
+        Program_Free(program);
+    return result;
+}
+
+/* string dump */
+
+static int dump_indent(Writer *writer, int level)
+{
+    if (writer_reserve(writer, level) < 0)
+        return -1;
+    memset(writer->data + writer->size, '\t', level);
+    writer->size += level;
+    return 0;
+}
+
+static inline int dump_str(Writer *writer, const char *str)
+{
+    return writer_write(writer, str, strlen(str));
+}
+
+// {indent}{type} {name}
+static int dump_header(Writer *writer, int level, const char *type, const char *name)
+{
+    if (dump_indent(writer, level) < 0 || dump_str(writer, type) < 0 || writer_write(writer, " ", 1) < 0 || dump_str(writer, name) < 0)
+        return -1;
+    return 0;
+}
+
+// {indent}{type} {name}\r\n
+static int dump_line(Writer *writer, int level, const char *type, const char *name)
+{
+    if (dump_header(writer, level, type, name) < 0 || writer_write(writer, "\r\n", 2) < 0)
+        return -1;
+    return 0;
+}
+
+// {indent}{type} {name} = {value}\r\n
+static int dump_value_line(Writer *writer, int level, const char *type, const char *name, const char *value)
+{
+    if (dump_header(writer, level, type, name) < 0 || writer_write(writer, " = ", 3) < 0 || dump_str(writer, value) < 0 || writer_write(writer, "\r\n", 2) < 0)
+        return -1;
+    return 0;
+}
+
+// formats a primitive value like str() does for the values of read_typetree
+static int dump_primitive(Reader *reader, unsigned char op, char *buf, size_t buf_size)
+{
+    static const int sizes[] = {1, 1, 2, 2, 4, 4, 8, 8, 4, 8, 1};
+    if (reader->data + sizes[op] > reader->dataEnd)
+    {
+        PyErr_Format(PyExc_ValueError, "Can't read %d bytes at position %zd of %zd", sizes[op], (Py_ssize_t)(reader->data - reader->dataStart), (Py_ssize_t)(reader->dataEnd - reader->dataStart));
+        return -1;
+    }
+    uint16_t u16;
+    uint32_t u32;
+    uint64_t u64;
+    switch (op)
+    {
+    case OP_SInt8:
+        snprintf(buf, buf_size, "%d", *(signed char *)reader->data);
+        break;
+    case OP_UInt8:
+        snprintf(buf, buf_size, "%u", *(unsigned char *)reader->data);
+        break;
+    case OP_bool:
+        snprintf(buf, buf_size, "%s", *reader->data ? "True" : "False");
+        break;
+    case OP_SInt16:
+    case OP_UInt16:
+        memcpy(&u16, reader->data, 2);
+        if (reader->swap)
+            u16 = bswap16(u16);
+        if (op == OP_SInt16)
+            snprintf(buf, buf_size, "%d", (int16_t)u16);
+        else
+            snprintf(buf, buf_size, "%u", u16);
+        break;
+    case OP_SInt32:
+    case OP_UInt32:
+    case OP_float:
+        memcpy(&u32, reader->data, 4);
+        if (reader->swap)
+            u32 = bswap32(u32);
+        if (op == OP_SInt32)
+            snprintf(buf, buf_size, "%d", (int32_t)u32);
+        else if (op == OP_UInt32)
+            snprintf(buf, buf_size, "%u", u32);
+        else
+        {
+            float value;
+            memcpy(&value, &u32, 4);
+            char *repr = PyOS_double_to_string((double)value, 'r', 0, Py_DTSF_ADD_DOT_0, NULL);
+            if (repr == NULL)
+                return -1;
+            snprintf(buf, buf_size, "%s", repr);
+            PyMem_Free(repr);
+        }
+        break;
+    default: // 64 bit
+        memcpy(&u64, reader->data, 8);
+        if (reader->swap)
+            u64 = bswap64(u64);
+        if (op == OP_SInt64)
+            snprintf(buf, buf_size, "%lld", (long long)(int64_t)u64);
+        else if (op == OP_UInt64)
+            snprintf(buf, buf_size, "%llu", (unsigned long long)u64);
+        else
+        {
+            double value;
+            memcpy(&value, &u64, 8);
+            char *repr = PyOS_double_to_string(value, 'r', 0, Py_DTSF_ADD_DOT_0, NULL);
+            if (repr == NULL)
+                return -1;
+            snprintf(buf, buf_size, "%s", repr);
+            PyMem_Free(repr);
+        }
+        break;
+    }
+    reader->data += sizes[op];
+    return 0;
+}
+
+// dumps the value in the format of TypeTreeHelper.read_typetree_str
+static int Program_DumpValue(Program *program, PyObject *nodes, Py_ssize_t index, Reader *reader, Writer *writer)
+{
+    Instruction *ins = &program->instructions[index];
+    TypeTreeNodeObject *node = getNode(nodes, index);
+    int level = node->m_Level;
+    char buf[64];
+    int size = 0;
+
+    if (ins->op <= OP_bool)
+    {
+        if (dump_primitive(reader, ins->op, buf, sizeof(buf)) < 0 || dump_value_line(writer, level, node->m_Type, node->m_Name, buf) < 0)
+            return -1;
+    }
+    else if (ins->op == OP_string)
+    {
+        if (reader_skip_length(reader, &size) < 0)
+            return -1;
+        char *data = reader->data;
+        if (reader_skip(reader, size) < 0)
+            return -1;
+        align4(reader);
+        // the raw bytes are decoded together with the rest of the dump
+        if (dump_header(writer, level, node->m_Type, node->m_Name) < 0 || writer_write(writer, " = \"", 4) < 0 || writer_write(writer, data, size) < 0 || writer_write(writer, "\"\r\n", 3) < 0)
+            return -1;
+    }
+    else if (ins->op == OP_TypelessData)
+    {
+        if (reader_skip_length(reader, &size) < 0 || reader_skip(reader, size) < 0)
+            return -1;
+        snprintf(buf, sizeof(buf), "%d", size);
+        if (dump_line(writer, level, node->m_Type, node->m_Name) < 0 || dump_value_line(writer, level, "int", "size", buf) < 0)
+            return -1;
+    }
+    else if (ins->op == OP_vector || ins->op == OP_map)
+    {
+        if (reader_skip_length(reader, &size) < 0)
+            return -1;
+        snprintf(buf, sizeof(buf), "%d", size);
+        if (dump_line(writer, level, node->m_Type, node->m_Name) < 0 || dump_line(writer, level + 1, "Array", "Array") < 0 || dump_value_line(writer, level + 1, "int", "size", buf) < 0)
+            return -1;
+        Py_ssize_t first = index + (ins->op == OP_vector ? 3 : 4); // skip self, Array, size(, pair)
+        Py_ssize_t second = program->instructions[first].end;
+        for (int i = 0; i < size; i++)
+        {
+            snprintf(buf, sizeof(buf), "[%d]\r\n", i);
+            if (dump_indent(writer, level + 2) < 0 || dump_str(writer, buf) < 0)
+                return -1;
+            if (ins->op == OP_vector)
+            {
+                if (Program_DumpValue(program, nodes, first, reader, writer) < 0)
+                    return -1;
+            }
+            else if (dump_line(writer, level + 2, "pair", "data") < 0 || Program_DumpValue(program, nodes, first, reader, writer) < 0 || Program_DumpValue(program, nodes, second, reader, writer) < 0)
+                return -1;
+        }
+    }
+    else // class
+    {
+        if (dump_line(writer, level, node->m_Type, node->m_Name) < 0)
+            return -1;
+        for (Py_ssize_t j = index + 1; j < ins->end; j = program->instructions[j].end)
+        {
+            if (Program_DumpValue(program, nodes, j, reader, writer) < 0)
+                return -1;
+        }
+    }
+
+    if (ins->align)
+        align4(reader);
+    return 0;
+}
+
+PyObject *read_typetree_str(PyObject *self, PyObject *args)
+{
+    // dumps the typetree of the data as text, returns (text, size of the read data)
+    PyObject *capsule = NULL;
+    PyObject *nodes = NULL;
+    PyObject *endian = NULL;
+    Py_buffer view;
+
+    if (!PyArg_ParseTuple(args, "OO!y*O", &capsule, &PyList_Type, &nodes, &view, &endian))
+        return NULL;
+
+    Writer writer = {.data = NULL, .size = 0, .capacity = 0, .swap = 0};
+    Reader reader = {
+        .data = (char *)view.buf,
+        .dataStart = (char *)view.buf,
+        .dataEnd = (char *)view.buf + view.len};
+    PyObject *result = NULL;
+
+    Program *program = PyCapsule_GetPointer(capsule, PROGRAM_CAPSULE_NAME);
+    if (program != NULL && parse_endian(endian, &reader.swap) == 0)
+    {
+        if (PyList_GET_SIZE(nodes) != program->count)
+            PyErr_SetString(PyExc_ValueError, "The nodes don't match the program");
+        else if (Program_DumpValue(program, nodes, 0, &reader, &writer) == 0)
+        {
+            PyObject *text = PyUnicode_DecodeUTF8(writer.data, writer.size, SURROGATEESCAPE);
+            if (text != NULL)
+            {
+                result = Py_BuildValue("(Nn)", text, (Py_ssize_t)(reader.data - reader.dataStart));
+            }
+        }
+    }
+
+    PyMem_Free(writer.data);
+    PyBuffer_Release(&view);
+    return result;
+}
+
+/* legacy typetree */
+
+PyObject *TypeTreeNode_new(PyTypeObject *type, PyObject *args, PyObject *kwds);
+
+// reads a null-terminated string, returns 0 if the data ends before its end
+static int legacy_read_string(Reader *reader, char **value)
+{
+    char *end = memchr(reader->data, 0, reader->dataEnd - reader->data);
+    if (end == NULL)
+        return 0;
+    size_t length = end - reader->data + 1;
+    char *str = PyMem_Malloc(length);
+    if (str == NULL)
+    {
+        PyErr_NoMemory();
+        return -1;
+    }
+    memcpy(str, reader->data, length);
+    PyMem_Free(*value);
+    *value = str;
+    reader->data = end + 1;
+    return 1;
+}
+
+// reads an int, returns 0 if the data ends before it
+static inline int legacy_read_int(Reader *reader, int *value)
+{
+    if (reader->data + 4 > reader->dataEnd)
+        return 0;
+    uint32_t raw;
+    memcpy(&raw, reader->data, 4);
+    *value = (int)(reader->swap ? bswap32(raw) : raw);
+    reader->data += 4;
+    return 1;
+}
+
+// reads a node of the legacy typetree and the count of its children,
+// returns 0 if the data ends before the node, -1 on errors
+static int legacy_read_node(Reader *reader, TypeTreeNodeObject *node, int version, int *children_count)
+{
+    int ret = legacy_read_string(reader, &node->m_Type);
+    if (ret <= 0)
+        return ret;
+    node->typehash = hash_str(node->m_Type);
+    ret = legacy_read_string(reader, &node->m_Name);
+    if (ret <= 0)
+        return ret;
+    int version_ = 0;
+    if (!legacy_read_int(reader, &node->m_ByteSize))
+        return 0;
+    if (version == 2 && !legacy_read_int(reader, &node->m_VariableCount))
+        return 0;
+    if (version != 3 && !legacy_read_int(reader, &node->m_Index))
+        return 0;
+    if (!legacy_read_int(reader, &node->m_TypeFlags) || !legacy_read_int(reader, &version_))
+        return 0;
+    node->m_Version = (short)version_;
+    if (version != 3 && !legacy_read_int(reader, &node->m_MetaFlag))
+        return 0;
+    if (!legacy_read_int(reader, children_count))
+        return 0;
+    return 1;
+}
+
+PyObject *read_typetree_legacy(PyObject *self, PyObject *args)
+{
+    // parses the nested typetree of the serialized files with version < 12 (except 10)
+    // into the flat node list, returns (nodes, size) or None if the data ends before the typetree
+    Py_buffer view;
+    PyObject *swap_obj = NULL;
+    int version = 0;
+    char swap = 0;
+
+    if (!PyArg_ParseTuple(args, "y*Oi", &view, &swap_obj, &version))
+        return NULL;
+    if (parse_endian(swap_obj, &swap) < 0)
+    {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+
+    Reader reader = {
+        .data = (char *)view.buf,
+        .dataStart = (char *)view.buf,
+        .dataEnd = (char *)view.buf + view.len,
+        .swap = swap};
+
+    PyObject *nodes = PyList_New(0);
+    // the levels of the nodes that still have unread children and their remaining count
+    Py_ssize_t capacity = 16;
+    Py_ssize_t depth = 1;
+    int *levels = PyMem_Malloc(capacity * sizeof(int));
+    int *counts = PyMem_Malloc(capacity * sizeof(int));
+    int ret = 1;
+    if (nodes == NULL || levels == NULL || counts == NULL)
+    {
+        if (nodes != NULL)
+            PyErr_NoMemory();
+        ret = -1;
+    }
+    else
+    {
+        levels[0] = 0;
+        counts[0] = 1;
+    }
+
+    while (ret > 0 && depth > 0)
+    {
+        int level = levels[depth - 1];
+        if (counts[depth - 1] == 1)
+            depth--;
+        else
+            counts[depth - 1]--;
+
+        TypeTreeNodeObject *node = (TypeTreeNodeObject *)TypeTreeNode_new(&TypeTreeNodeType, NULL, NULL);
+        if (node == NULL)
+        {
+            ret = -1;
+            break;
+        }
+        node->m_Level = (unsigned char)level;
+        int children_count = 0;
+        ret = legacy_read_node(&reader, node, version, &children_count);
+        if (ret > 0 && PyList_Append(nodes, (PyObject *)node) < 0)
+            ret = -1;
+        Py_DECREF(node);
+        if (ret <= 0)
+            break;
+
+        if (children_count < 0)
+        {
+            PyErr_Format(PyExc_ValueError, "Invalid children count %d of the typetree node", children_count);
+            ret = -1;
+        }
+        else if (children_count > 0)
+        {
+            if (depth == capacity)
+            {
+                capacity *= 2;
+                int *new_levels = PyMem_Realloc(levels, capacity * sizeof(int));
+                if (new_levels != NULL)
+                    levels = new_levels;
+                int *new_counts = PyMem_Realloc(counts, capacity * sizeof(int));
+                if (new_counts != NULL)
+                    counts = new_counts;
+                if (new_levels == NULL || new_counts == NULL)
+                {
+                    PyErr_NoMemory();
+                    ret = -1;
+                    break;
+                }
+            }
+            levels[depth] = level + 1;
+            counts[depth] = children_count;
+            depth++;
+        }
+    }
+
+    PyMem_Free(levels);
+    PyMem_Free(counts);
+    PyObject *result = NULL;
+    if (ret > 0)
+        result = Py_BuildValue("(On)", nodes, (Py_ssize_t)(reader.data - reader.dataStart));
+    else if (ret == 0)
+    {
+        Py_INCREF(Py_None);
+        result = Py_None;
+    }
+    Py_XDECREF(nodes);
+    PyBuffer_Release(&view);
+    return result;
 }
 
 static void
@@ -28,4 +28,12 @@ typedef struct TypeTreeNodeObject{
 
 int add_typetreenode_to_module(PyObject *m);
 
-PyObject* read_typetree(PyObject *self, PyObject *args);
\ No newline at end of file
+PyObject* compile_typetree(PyObject *self, PyObject *args);
+
+PyObject* read_typetree(PyObject *self, PyObject *args);
+
+PyObject* write_typetree(PyObject *self, PyObject *args);
+
+PyObject* read_typetree_legacy(PyObject *self, PyObject *args);
+
+PyObject* read_typetree_str(PyObject *self, PyObject *args);
\ No newline at end of file
@@ -21,10 +21,26 @@ static struct PyMethodDef method_table[] = {
      (PyCFunction)unpack_vertexdata,
      METH_VARARGS,
      "replacement for VertexData to ComponentData in Mesh.ReadVertexData"},
+    {"compile_typetree",
+     (PyCFunction)compile_typetree,
+     METH_VARARGS,
+     "compiles the node list into a program for read_typetree"},
     {"read_typetree",
      (PyCFunction)read_typetree,
      METH_VARARGS,
      "replacement for TypeTreeHelper.read_typetree"},
+    {"write_typetree",
+     (PyCFunction)write_typetree,
+     METH_VARARGS,
+     "replacement for TypeTreeHelper.write_typetree"},
+    {"read_typetree_legacy",
+     (PyCFunction)read_typetree_legacy,
+     METH_VARARGS,
+     "replacement for SerializedFile.read_type_tree"},
+    {"read_typetree_str",
+     (PyCFunction)read_typetree_str,
+     METH_VARARGS,
+     "replacement for TypeTreeHelper.read_typetree_str"},
     {"switch_deswizzle",
      (PyCFunction)switch_deswizzle,
      METH_VARARGS,
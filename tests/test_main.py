@@ -79,6 +79,374 @@ def test_read_typetree():
         obj.read_typetree()
 
 
+def test_read_typetree_plan(monkeypatch):
+    from UnityPy.helpers import TypeTreeHelper
+
+    env = UnityPy.load(SAMPLES)
+    for obj in env.objects:
+        plan = obj.get_typetree_read_plan()
+        # compiled once per type
+        assert obj.get_typetree_read_plan() is plan
+        tree = obj.read_typetree()
+        with monkeypatch.context() as m:
+            m.setattr(TypeTreeHelper, "read_typetree_c", None)
+            assert obj.read_typetree() == tree
+            assert obj.read_typetree(plan.nodes) == tree
+
+
+def test_read_typetree_fields(monkeypatch):
+    from UnityPy.helpers import TypeTreeHelper
+
+    env = UnityPy.load(SAMPLES)
+    for read_typetree_c in (TypeTreeHelper.read_typetree_c, None):
+        monkeypatch.setattr(TypeTreeHelper, "read_typetree_c", read_typetree_c)
+        for obj in env.objects:
+            tree = obj.read_typetree()
+            last = list(tree)[-1]
+            fields, expected = [last], {last: tree[last]}
+            for key, value in tree.items():
+                if key != last and isinstance(value, dict) and value:
+                    sub_key = list(value)[-1]
+                    fields.append(f"{key}.{sub_key}")
+                    expected[key] = {sub_key: value[sub_key]}
+                    break
+            assert obj.read_typetree(fields=fields) == expected
+
+
+def test_read_typetree_as_numpy():
+    from UnityPy.helpers import TypeTreeHelper
+    from UnityPy.streams import EndianBinaryWriter
+
+    def compare(value, wanted):
+        if isinstance(value, dict):
+            return all(compare(value[key], val) for key, val in wanted.items())
+        if isinstance(value, list) or isinstance(wanted, tuple):
+            return all(compare(val, want) for val, want in zip(value, wanted))
+        if not isinstance(wanted, list):
+            return value == wanted
+        # numpy array or typed memoryview
+        return value.tolist() == wanted
+
+    env = UnityPy.load(SAMPLES)
+    for obj in env.objects:
+        tree = obj.read_typetree(as_numpy=True)
+        assert compare(tree, obj.read_typetree())
+        writer = TypeTreeHelper.write_typetree(
+            tree, obj.get_typetree_nodes(), EndianBinaryWriter(endian=obj.reader.endian)
+        )
+        assert writer.bytes == obj.get_raw_data()
+
+
+def test_read_typetree_as_numpy_readonly(monkeypatch):
+    from UnityPy.helpers import TypeTreeHelper
+
+    def find_arrays(value):
+        if isinstance(value, dict):
+            value = value.values()
+        elif not isinstance(value, (list, tuple)):
+            if hasattr(value, "tolist") and len(value):
+                yield value
+            return
+        for val in value:
+            yield from find_arrays(val)
+
+    env = UnityPy.load(SAMPLES)
+    for read_typetree_c in (TypeTreeHelper.read_typetree_c, None):
+        monkeypatch.setattr(TypeTreeHelper, "read_typetree_c", read_typetree_c)
+        checked = 0
+        for obj in env.objects:
+            raw = bytes(obj.get_raw_data())
+            for values in find_arrays(obj.read_typetree(as_numpy=True)):
+                try:
+                    values[0] = values[0]
+                except (TypeError, ValueError):
+                    checked += 1
+                else:
+                    assert False, "the array is writable"
+            assert obj.get_raw_data() == raw
+        assert checked
+
+
+def test_read_typetree_wrap(monkeypatch):
+    from UnityPy.classes import Object, PPtr
+    from UnityPy.classes.Object import NodeHelper
+    from UnityPy.helpers import TypeTreeHelper
+
+    env = UnityPy.load(SAMPLES)
+    for read_typetree_c in (TypeTreeHelper.read_typetree_c, None):
+        monkeypatch.setattr(TypeTreeHelper, "read_typetree_c", read_typetree_c)
+        for obj in env.objects:
+            tree = obj.read_typetree()
+            node = obj.read_typetree(wrap=True)
+            assert node.to_dict() == NodeHelper(tree, obj.assets_file).to_dict()
+            # one generated class per struct
+            assert type(node) is type(NodeHelper(tree, obj.assets_file))
+            for key, value in node.items():
+                assert getattr(node, key) is value
+                if isinstance(value, PPtr):
+                    assert value.path_id == tree[key]["m_PathID"]
+            data = obj.read()
+            if type(data) is Object:
+                raw_data = obj.get_raw_data()
+                data.type_tree = node
+                data.save_typetree()
+                assert obj.get_raw_data() == raw_data
+
+
+def test_type_registry():
+    env = UnityPy.load(SAMPLES)
+    types = [typ for assets_file in env.assets for typ in assets_file.types]
+    shared = {}
+    for typ in types:
+        # identical types share their nodes and read plan
+        plan = shared.setdefault(id(typ.nodes), typ.read_plan)
+        assert typ.read_plan is plan
+    assert len(env.type_registry) == len({id(typ.nodes) for typ in types})
+    assert len(env.type_registry) < len(types)
+
+
+def test_tpk_nodes_cache(tmp_path, monkeypatch):
+    from UnityPy.helpers import Tpk
+
+    def dump(nodes):
+        return [tuple(getattr(node, key) for key in Tpk.NODE_KEYS) for node in nodes]
+
+    monkeypatch.setattr(UnityPy.config, "TPK_NODES_CACHE_PATH", str(tmp_path / "tpk.db"))
+    monkeypatch.setattr(Tpk, "NODES_CACHE", {})
+    nodes = Tpk.get_typetree_nodes(1, (2020, 3, 0, 0))
+    assert [node.m_Index for node in nodes] == list(range(len(nodes)))
+    # restored from the cache without loading the tpk
+    monkeypatch.setattr(Tpk, "NODES_CACHE", {})
+    monkeypatch.setattr(Tpk, "TPKTYPETREE", None)
+    assert dump(Tpk.get_typetree_nodes(1, (2020, 3, 0, 0))) == dump(nodes)
+    assert Tpk.TPKTYPETREE is None
+    monkeypatch.setattr(Tpk, "NODES_DB", None)
+
+
+def test_read_type_tree_legacy(monkeypatch):
+    from importlib import import_module
+    from io import BytesIO
+    from types import SimpleNamespace
+    from UnityPy.streams import EndianBinaryReader, EndianBinaryWriter
+
+    # (type, name, children) of a nested legacy typetree
+    tree = ("Base", "Base", [
+        ("int", "a", []),
+        ("vector", "b", [("Array", "Array", [("int", "size", []), ("float", "data", [])])]),
+        ("string", "c", []),
+    ])  # fmt: skip
+
+    def write(writer, node, version):
+        typ, name, children = node
+        writer.write_string_to_null(typ)
+        writer.write_string_to_null(name)
+        writer.write_int(4)
+        if version == 2:
+            writer.write_int(1)
+        if version != 3:
+            writer.write_int(2)
+        writer.write_int(0)
+        writer.write_int(1)
+        if version != 3:
+            writer.write_int(0x4000)
+        writer.write_int(len(children))
+        for child in children:
+            write(writer, child, version)
+
+    SerializedFile = import_module("UnityPy.files.SerializedFile")
+
+    def dump(nodes):
+        return [(n.m_Level, n.m_Type, n.m_Name, n.m_ByteSize, n.m_Version) for n in nodes]
+
+    for version in (2, 3, 9):
+        for endian in ("<", ">"):
+            writer = EndianBinaryWriter(endian=endian)
+            write(writer, tree, version)
+            data = writer.bytes + b"\x01\x02"
+            results = []
+            for read_typetree_legacy_c in (SerializedFile.read_typetree_legacy_c, None):
+                monkeypatch.setattr(
+                    SerializedFile, "read_typetree_legacy_c", read_typetree_legacy_c
+                )
+                for item in (data, BytesIO(data)):
+                    f = SerializedFile.SerializedFile.__new__(SerializedFile.SerializedFile)
+                    f.reader = EndianBinaryReader(item, endian)
+                    f.header = SimpleNamespace(version=version)
+                    results.append(dump(f.read_type_tree()))
+                    assert f.reader.Position == len(data) - 2
+            assert results[0][1] == (1, "int", "a", 4, 1)
+            assert [node[0] for node in results[0]] == [0, 1, 1, 2, 3, 3, 1]
+            assert all(result == results[0] for result in results)
+
+
+def test_dump_typetree(monkeypatch):
+    from UnityPy.helpers import TypeTreeHelper
+
+    env = UnityPy.load(SAMPLES)
+    dumps = [obj.dump_typetree() for obj in env.objects]
+    monkeypatch.setattr(TypeTreeHelper, "read_typetree_str_c", None)
+    for obj, dump in zip(env.objects, dumps):
+        assert dump == obj.dump_typetree()
+        assert dump.startswith(f"{obj.get_typetree_nodes()[0].m_Type} Base\r\n")
+
+
+def test_compile_typetree_invalid():
+    import pytest
+    from UnityPy.helpers import TypeTreeHelper
+
+    if TypeTreeHelper.compile_typetree_c is None:
+        pytest.skip("UnityPyBoost isn't available")
+
+    def create_nodes(*nodes):
+        return [
+            TypeTreeHelper.TypeTreeNode(
+                m_Level=level, m_Type=typ, m_Name=name, m_Index=i, m_ByteSize=-1, m_MetaFlag=0
+            )
+            for i, (level, typ, name) in enumerate(nodes)
+        ]
+
+    # maps without the sub-nodes, at the end of the nodes as well
+    for nodes in (
+        create_nodes((0, "Base", "Base"), (1, "map", "m_Map")),
+        create_nodes((0, "Base", "Base"), (1, "map", "m_Map"), (2, "Array", "Array")),
+    ):
+        with pytest.raises(ValueError, match="Invalid map node"):
+            TypeTreeHelper.compile_typetree_c(nodes)
+
+def test_patch_fields():
+    import pytest
+    from UnityPy.helpers import TypeTreeHelper
+    from UnityPy.streams import EndianBinaryWriter
+
+    env = UnityPy.load(SAMPLES)
+    patched = vectors = 0
+    for obj in env.objects:
+        offsets = obj.get_field_offsets()
+        assert obj.get_field_offsets() is offsets
+        tree = obj.read_typetree()
+        fields = [
+            path
+            for path, (_, typ, *_) in offsets.items()
+            if path in tree and typ in ("int", "unsigned int", "float")
+        ]
+        if not fields:
+            continue
+        values = {path: tree[path] + 1 for path in fields}
+        tree.update(values)
+        # the offsets of the elements of primitive vectors are computed on demand
+        for path, entry in offsets.items():
+            name = path[:-2]
+            if path.endswith("[]") and name in tree and entry[1] == "UInt8" and entry[2]:
+                offset, typ, count = entry
+                last = TypeTreeHelper.get_field_offset(offsets, f"{name}[{count - 1}]")
+                assert last == (offset + count - 1, typ)
+                assert TypeTreeHelper.get_field_offset(offsets, f"{name}[{count}]") is None
+                values[f"{name}[0]"] = tree[name][0] = (tree[name][0] + 1) % 256
+                vectors += 1
+        writer = TypeTreeHelper.write_typetree(
+            tree, obj.get_typetree_nodes(), EndianBinaryWriter(endian=obj.reader.endian)
+        )
+        assert obj.patch_fields(values) == writer.bytes == obj.data
+        patched += 1
+        with pytest.raises(TypeError):
+            obj.patch_fields({"m_Name": "name"})
+    assert patched
+    assert vectors
+
+
+def test_save_typetree_changes():
+    from UnityPy.classes import Object
+    from UnityPy.classes.Object import class_to_dict
+    from UnityPy.helpers import TypeTreeHelper
+    from UnityPy.streams import EndianBinaryWriter
+
+    env = UnityPy.load(SAMPLES)
+    saved = 0
+    for obj in env.objects:
+        # read as generic object via its typetree
+        data = Object(obj)
+        raw_data = obj.get_raw_data()
+        # unchanged objects aren't serialized again
+        assert data.save_typetree() == raw_data
+        assert not obj.data
+        tree = data.type_tree
+        lists = [key for key, val in tree.items() if isinstance(val, list)]
+        data.m_Name = "changed name"
+        assert tree.m_Name == "changed name"
+        if lists:
+            getattr(tree, lists[-1]).clear()
+        expected = TypeTreeHelper.write_typetree(
+            class_to_dict(tree),
+            obj.get_typetree_nodes(),
+            EndianBinaryWriter(endian=obj.reader.endian),
+        ).bytes
+        assert data.save_typetree() == expected == obj.data
+        assert obj.get_field_ranges() == TypeTreeHelper.get_field_ranges(
+            obj.get_typetree_nodes(), expected, obj.reader.endian
+        )
+        # the changes were saved
+        assert data.save_typetree() is obj.data
+        saved += 1
+    assert saved
+
+
+def test_save_typetree_changes_aligned_root(monkeypatch):
+    from types import SimpleNamespace
+
+    from UnityPy.classes import Object
+    from UnityPy.classes.Object import class_to_dict
+    from UnityPy.helpers import TypeTreeHelper
+    from UnityPy.helpers.TypeTreeHelper import TypeTreeReadPlan, check_nodes
+    from UnityPy.streams import EndianBinaryWriter
+
+    env = UnityPy.load(SAMPLES)
+    obj = next(obj for obj in env.objects if obj.type.name == "Mesh")
+    # an aligned root whose last field isn't aligned by itself
+    keys = ("m_Version", "m_Level", "m_TypeFlags", "m_ByteSize", "m_Index", "m_MetaFlag")
+    keys += ("m_Type", "m_Name", "m_TypeStrOffset", "m_NameStrOffset", "m_RefTypeHash")
+    nodes = [
+        {key: getattr(node, key) for key in keys if hasattr(node, key)}
+        for node in obj.get_typetree_nodes()
+    ]
+    last = max(i for i, node in enumerate(nodes) if node["m_Level"] == 1)
+    nodes[0]["m_MetaFlag"] |= 0x4000
+    for node in nodes[last:]:
+        node["m_MetaFlag"] &= ~0x4000
+    nodes = check_nodes(nodes)
+    monkeypatch.setattr(
+        obj, "serialized_type", SimpleNamespace(nodes=nodes, read_plan=TypeTreeReadPlan(nodes))
+    )
+
+    data = Object(obj)
+    name = nodes[last].m_Name
+    for value in ([1], [1, 2, 3, 4, 5], []):
+        data.m_Name = data.m_Name + "x"
+        setattr(data, name, value)
+        writer = TypeTreeHelper.write_typetree(
+            class_to_dict(data.type_tree), nodes, EndianBinaryWriter(endian=obj.reader.endian)
+        )
+        writer.align_stream(4)
+        assert data.save_typetree() == writer.bytes
+
+
+def test_write_typetree(monkeypatch):
+    from UnityPy.helpers import TypeTreeHelper
+    from UnityPy.streams import EndianBinaryWriter
+
+    env = UnityPy.load(SAMPLES)
+    objects = [
+        (obj.read_typetree(), obj.get_typetree_nodes(), obj.reader.endian, obj.get_raw_data())
+        for obj in env.objects
+    ]
+    for write_typetree_c in (TypeTreeHelper.write_typetree_c, None):
+        monkeypatch.setattr(TypeTreeHelper, "write_typetree_c", write_typetree_c)
+        for tree, nodes, endian, raw_data in objects:
+            writer = TypeTreeHelper.write_typetree(
+                tree, nodes, EndianBinaryWriter(endian=endian)
+            )
+            assert writer.bytes == raw_data
+
+
 def test_save():
     env = UnityPy.load(SAMPLES)
     # TODO - check against original
@@ -92,6 +460,287 @@ def test_save():
         assert save1 == save2
 
 
+def test_save_compressed_blocks(monkeypatch):
+    env = UnityPy.load(os.path.join(SAMPLES, "char_118_yuki.ab"))
+    monkeypatch.setattr(UnityPy.config, "BUNDLE_FILE_BLOCK_SIZE", 0x1000)
+    saves = []
+    for workers in (1, 4):
+        monkeypatch.setattr(UnityPy.config, "BUNDLE_FILE_COMPRESSION_WORKERS", workers)
+        saves.append(env.file.save(packer="lz4"))
+    assert saves[0] == saves[1]
+    env_saved = UnityPy.load(saves[0])
+    blocks_info = env_saved.file._fs_info[0]
+    assert len(blocks_info) > 1
+    assert all(block_info.uncompressedSize <= 0x1000 for block_info in blocks_info)
+    for obj, obj_saved in zip(env.objects, env_saved.objects):
+        assert bytes(obj.get_raw_data()) == bytes(obj_saved.get_raw_data())
+
+
+def test_save_compressed_blocks_error(monkeypatch):
+    from UnityPy.files.BundleFile import BlockWriter
+
+    env = UnityPy.load(os.path.join(SAMPLES, "char_118_yuki.ab"))
+    monkeypatch.setattr(UnityPy.config, "BUNDLE_FILE_BLOCK_SIZE", 0x1000)
+    monkeypatch.setattr(UnityPy.config, "BUNDLE_FILE_COMPRESSION_WORKERS", 4)
+    block_writers = []
+
+    def write_original_data(block_writer, *args):
+        block_writers.append(block_writer)
+        raise ValueError("write failed")
+
+    # the unchanged files are written via write_original_data on incremental saving
+    monkeypatch.setattr(env.file, "write_original_data", write_original_data)
+    try:
+        env.file.save(packer="lz4", incremental=True)
+    except ValueError:
+        pass
+    assert isinstance(block_writers[0], BlockWriter)
+    assert block_writers[0].executor is None
+
+def test_pack_object_info():
+    from UnityPy.files.SerializedFile import ObjectInfoTable
+    from UnityPy.streams import EndianBinaryWriter
+
+    env = UnityPy.load(SAMPLES)
+    for assets_file in env.assets:
+        objects = list(assets_file.objects.values())
+        objects[0].set_raw_data(b"\x01" * 5)
+        for position in range(4):
+            writer = EndianBinaryWriter(b"\x00" * position, endian=assets_file.header.endian)
+            data_writer = EndianBinaryWriter()
+            for obj in objects:
+                obj.write(assets_file.header, writer, data_writer)
+                data_writer.align_stream(8)
+            table, data_size = ObjectInfoTable.pack(assets_file, objects, position)
+            assert bytes(table) == writer.bytes[position:]
+            assert data_size == data_writer.Length
+
+
+def test_change_path_id():
+    env = UnityPy.load(os.path.join(SAMPLES, "char_118_yuki.ab"))
+    assets_file = next(iter(env.assets))
+    path_id, obj = next(iter(assets_file.objects.items()))
+    raw = bytes(obj.get_raw_data())
+    new_path_id = max(assets_file.objects) + 1
+    obj.path_id = new_path_id
+    assert obj.path_id == new_path_id
+    del assets_file.objects[path_id]
+    assets_file.objects[new_path_id] = obj
+
+    env_saved = UnityPy.load(env.file.save())
+    objects = next(iter(env_saved.assets)).objects
+    assert path_id not in objects
+    assert objects[new_path_id].get_raw_data() == raw
+
+
+def test_save_to(tmp_path):
+    env = UnityPy.load(os.path.join(SAMPLES, "char_118_yuki.ab"))
+    for packer in ("none", "lz4", (193, 1)):
+        fp = tmp_path / "bundle"
+        with open(fp, "wb") as f:
+            size = env.file.save_to(f, packer)
+        with open(fp, "rb") as f:
+            data = f.read()
+        assert size == len(data)
+        assert data == env.file.save(packer)
+        env_saved = UnityPy.load(data)
+        for obj, obj_saved in zip(env.objects, env_saved.objects):
+            assert bytes(obj.get_raw_data()) == bytes(obj_saved.get_raw_data())
+
+
+def test_save_incremental():
+    fp = os.path.join(SAMPLES, "char_118_yuki.ab")
+    with open(fp, "rb") as f:
+        raw = f.read()
+    env = UnityPy.load(fp)
+    blocks_info = env.file._fs_info[0]
+    # unchanged bundles are copied as they are
+    assert env.file.save("original", incremental=True) == raw
+
+    objects = env.objects
+    raw_data = [bytes(obj.get_raw_data()) for obj in objects]
+    raw_data[0] += b"\x00" * 4
+    objects[0].set_raw_data(raw_data[0])
+    for packer in ("none", "lz4", "original"):
+        env_saved = UnityPy.load(env.file.save(packer, incremental=True))
+        assert [bytes(obj.get_raw_data()) for obj in env_saved.objects] == raw_data
+    # only the blocks of the changed file were compressed again
+    assert env_saved.file._fs_info[0][-4:] == blocks_info[-4:]
+
+
+def test_bundle_lazy_decompression(monkeypatch):
+    for f in os.listdir(SAMPLES):
+        fp = os.path.join(SAMPLES, f)
+        monkeypatch.setattr(UnityPy.config, "BUNDLE_FILE_LAZY_DECOMPRESSION", False)
+        env = UnityPy.load(fp)
+        monkeypatch.setattr(UnityPy.config, "BUNDLE_FILE_LAZY_DECOMPRESSION", True)
+        env_lazy = UnityPy.load(fp)
+        objects = env.objects
+        objects_lazy = env_lazy.objects
+        assert len(objects) == len(objects_lazy)
+        for obj, obj_lazy in zip(objects, objects_lazy):
+            assert obj.path_id == obj_lazy.path_id
+            assert bytes(obj.get_raw_data()) == bytes(obj_lazy.get_raw_data())
+            # the offsets within the bundle are the same
+            assert obj.byte_base_offset == obj_lazy.byte_base_offset
+            assert obj.byte_start_offset == obj_lazy.byte_start_offset
+            obj_lazy.read()
+
+
+def test_bundle_parallel_decompression(monkeypatch):
+    for f in os.listdir(SAMPLES):
+        fp = os.path.join(SAMPLES, f)
+        monkeypatch.setattr(UnityPy.config, "BUNDLE_FILE_DECOMPRESSION_WORKERS", 1)
+        env = UnityPy.load(fp)
+        monkeypatch.setattr(UnityPy.config, "BUNDLE_FILE_DECOMPRESSION_WORKERS", 4)
+        env_parallel = UnityPy.load(fp)
+        for obj, obj_parallel in zip(env.objects, env_parallel.objects):
+            assert bytes(obj.get_raw_data()) == bytes(obj_parallel.get_raw_data())
+            # the read data is an immutable view on the shared buffer
+            raw_data = obj_parallel.get_raw_data()
+            assert hash(raw_data) == hash(bytes(raw_data))
+
+
+def test_mmap(monkeypatch):
+    env = UnityPy.load(SAMPLES)
+    monkeypatch.setattr(UnityPy.config, "ENVIRONMENT_USE_MMAP", True)
+    env_mmap = UnityPy.load(SAMPLES)
+    for obj, obj_mmap in zip(env.objects, env_mmap.objects):
+        assert bytes(obj.get_raw_data()) == bytes(obj_mmap.get_raw_data())
+        obj_mmap.read()
+    env_mmap = UnityPy.load(os.path.join(SAMPLES, "char_118_yuki.ab"))
+    for obj in env_mmap.objects:
+        obj.read()
+
+
+def test_lazy_objects():
+    env = UnityPy.load(os.path.join(SAMPLES, "char_118_yuki.ab"))
+    for assets_file in env.assets:
+        objects = assets_file.objects
+        path_ids = list(objects.keys())
+        assert len(objects) == len(path_ids)
+        obj = objects[path_ids[0]]
+        assert obj.path_id == path_ids[0]
+        assert objects[path_ids[0]] is obj
+        assert type(obj).__dictoffset__ == 0  # __slots__ only
+        assert obj.byte_size == assets_file._object_info.byte_size[obj.row]
+        assert path_ids[0] in objects
+        del objects[path_ids[0]]
+        assert path_ids[0] not in objects
+        objects[path_ids[0]] = obj
+        assert list(objects.keys())[-1] == path_ids[0]
+        assert len(objects) == len(path_ids)
+
+
+def test_metadata_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(UnityPy.config, "METADATA_CACHE_PATH", str(tmp_path / "metadata.db"))
+    # cold load - parses the metadata and stores it
+    env = UnityPy.load(SAMPLES)
+    # the container isn't read just for the cache
+    assert all(f._container is None for f in env.assets)
+    # warm load - restores the metadata from the cache
+    env_cached = UnityPy.load(SAMPLES)
+    assert env_cached.metadata_cache.get(
+        os.path.join(SAMPLES, "char_118_yuki.ab")
+    )
+    assert sorted(env.container) == sorted(env_cached.container)
+    for obj, obj_cached in zip(env.objects, env_cached.objects):
+        assert obj.path_id == obj_cached.path_id
+        assert obj.type == obj_cached.type
+        assert bytes(obj.get_raw_data()) == bytes(obj_cached.get_raw_data())
+        obj_cached.read()
+    for name, f in env.files.items():
+        if isinstance(f, UnityPy.files.File):
+            assert f.save() == env_cached.files[name].save()
+
+
+def test_extract_assets_parallel(tmp_path):
+    from UnityPy.tools.extractor import extract_assets
+
+    exported = extract_assets(SAMPLES, tmp_path / "single")
+    exported_parallel = extract_assets(SAMPLES, tmp_path / "parallel", workers=2)
+    assert len(exported) == len(exported_parallel)
+
+    def list_files(path):
+        return sorted(
+            (os.path.relpath(fp, path), os.path.getsize(fp))
+            for root, _, files in os.walk(path)
+            for fp in (os.path.join(root, f) for f in files)
+        )
+
+    assert list_files(tmp_path / "single") == list_files(tmp_path / "parallel")
+
+    (tmp_path / "empty").mkdir()
+    assert extract_assets(tmp_path / "empty", tmp_path / "none", workers=2) == []
+
+
+def test_iter_objects():
+    from UnityPy.enums import ClassIDType
+
+    env = UnityPy.load(SAMPLES)
+    keys = sorted((obj.assets_file.name, obj.path_id) for obj in env.objects)
+    assert keys == sorted(
+        (obj.assets_file.name, obj.path_id) for obj in UnityPy.iter_objects(SAMPLES)
+    )
+
+    types = {ClassIDType.Texture2D, ClassIDType.Sprite}
+    objects = list(UnityPy.iter_objects(SAMPLES, types=types, cache_size=1))
+    assert len(objects) == sum(obj.type in types for obj in env.objects)
+    for obj in objects:
+        assert obj.type in types
+        obj.read()
+
+
+def test_only_types():
+    from UnityPy.enums import ClassIDType
+
+    types = {ClassIDType.Texture2D, ClassIDType.Sprite}
+    env = UnityPy.load(SAMPLES)
+    env_filtered = UnityPy.load(SAMPLES, only_types=types)
+    objects = env_filtered.objects
+    assert len(objects) == sum(obj.type in types for obj in env.objects)
+    for assets_file in env_filtered.assets:
+        # only the readers of the matching objects were created
+        assert all(
+            obj.type in types for obj in assets_file.objects._items.values()
+        )
+    for obj in objects:
+        assert obj.type in types
+        obj.read()
+
+
+def test_writer_arrays():
+    import io
+    from array import array
+    from struct import pack
+
+    from UnityPy.streams import EndianBinaryWriter
+
+    values = [1, -2, 3, 0x7FFFFFFF]
+    for endian in ("<", ">"):
+        expected = pack(f"{endian}I", 7) + pack(f"{endian}4i", *values)
+        for data in (values, tuple(values), array("i", values), array("q", values)):
+            writer = EndianBinaryWriter(endian=endian)
+            writer.write_u_int(7)
+            writer.write_int_array(data)
+            assert writer.bytes == expected
+        # the writer can be extended and patched after its bytes were taken
+        writer.write_float_array([0.5, 2.0], write_length=True)
+        writer.write_boolean_array([True, False])
+        writer.Position = 0
+        writer.write_u_int(8)
+        assert writer.Length == len(writer.bytes) == 38
+        assert writer.bytes == pack(f"{endian}I", 8) + expected[4:] + pack(
+            f"{endian}i2fi2?", 2, 0.5, 2.0, 2, True, False
+        )
+        # streams are still written through
+        stream = io.BytesIO()
+        stream_writer = EndianBinaryWriter(stream, endian=endian)
+        stream_writer.write_u_int(7)
+        stream_writer.write_int_array(array("i", values))
+        assert stream.getvalue() == expected
+
+
 if __name__ == "__main__":
     for x in list(locals()):
         if str(x)[:4] == "test":